@@ -1,18 +1,249 @@
 
+import copy
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
 
-def predict(data, approval_model, bank_model, bank_encoder, features_list):
+# Frontend (camelCase) key -> (Model feature name, default value)
+# Note: Keys must match what the Angular app sends (see user-eligibility).
+INPUT_FIELDS = {
+    'Age': ('age', 30),
+    'Gender': ('gender', 'Male'),
+    'Marital_Status': ('maritalStatus', 'Single'),
+    'Dependents': ('dependents', '0'),
+    'Education': ('education', 'Graduate'),
+    'Self_Employed': ('selfEmployed', 'No'),
+    'Work_Experience_Years': ('experience', 0),
+    'ApplicantIncome': ('applicantIncome', 0),
+    'CoapplicantIncome': ('coApplicantIncome', 0),
+    'Salary_Payment_Mode': ('salaryMode', 'Cash'),
+    'Existing_EMI': ('existingEmi', 0),
+    'Residential_Assets': ('assets', 'None'),
+    'Area': ('area', 'Urban'),
+    'Loan_Purpose': ('loanPurpose', 'Other'),
+    'LoanAmount': ('loanAmount', 0),
+    'Loan_Amount_Term': ('tenure', 12)
+}
+
+# We use standard Label Encoding logic (Alphabetical Order) to match training time behavior
+MAPPINGS = {
+    'Gender': {'Female': 0, 'Male': 1, 'Other': 2},
+    'Marital_Status': {'Single': 0, 'Married': 1},
+    'Education': {'Graduate': 0, 'Not Graduate': 1},
+    'Self_Employed': {'No': 0, 'Yes': 1},
+    'Area': {'Rural': 0, 'Semiurban': 1, 'Urban': 2},
+    'Salary_Payment_Mode': {'Bank Transfer': 0, 'Cash': 1, 'Cheque': 2},
+    'Residential_Assets': {'House + Land': 0, 'None': 1, 'Own House': 2},
+    'Loan_Purpose': {
+        'Asset Purchase': 0, 'Education': 1, 'Home Renovation': 2,
+        'Medical': 3, 'Other': 4, 'Wedding': 5
+    },
+    'Dependents': {'0': 0, '1': 1, '2': 2, '3+': 3}
+}
+
+# Fallback/Hardcoded Bank Mapping (Alphabetical Order as per LabelEncoder default)
+HARDCODED_BANKS = [
+    'Axis Bank',
+    'Bank of Baroda',
+    'Bank of India',
+    'HDFC Bank',
+    'ICICI Bank',
+    'IDFC FIRST Bank',
+    'IndusInd Bank',
+    'Kotak Mahindra Bank',
+    'State Bank of India (SBI)',
+    'YES Bank'
+]
+
+# Number of features listed in 'top_factors' of an explanation
+TOP_FACTORS = 5
+
+
+def to_number(val):
+    """Same coercion as pd.to_numeric(errors='coerce').fillna(0) for a single value."""
+    if val is None:
+        return 0.0
+    if isinstance(val, str):
+        val = val.strip()
+    try:
+        num = float(val)
+    except (TypeError, ValueError):
+        return 0.0
+    if num != num:  # NaN
+        return 0.0
+    return num
+
+
+def encode_row(data, features_list):
+    """
+    Encodes one frontend payload into the numeric feature vector the approval model expects.
+
+    Returns:
+        list: float values in the order of features_list (missing features are 0).
+    """
+    row = []
+    for feature in features_list:
+        if feature not in INPUT_FIELDS:
+            row.append(0.0)  # Fill missing features with 0
+            continue
+        key, default = INPUT_FIELDS[feature]
+        val = data.get(key, default)
+        if feature in MAPPINGS:
+            # Clean string input just in case
+            if isinstance(val, str):
+                val = val.strip()
+            # Map, default to 0 if not found to avoid crash
+            row.append(float(MAPPINGS[feature].get(str(val), 0)))
+        else:
+            row.append(to_number(val))
+    return row
+
+
+# --- Prediction / Explanation Cache ---
+
+class PredictionCache:
+    """Small thread-safe LRU keyed by (model versions + feature list, feature-vector hash)."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared = None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry
+        # Second tier shared with the other app instances (state_backend cache), if configured
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except Exception as e:
+                print(f"Shared cache read error: {e}")
+                entry = None
+            if entry is not None:
+                self._put_local(key, entry)
+                with self._lock:
+                    self.shared_hits += 1
+                return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self._put_local(key, entry)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry)
+            except Exception as e:
+                print(f"Shared cache write error: {e}")
+
+    def _put_local(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._data), 'hits': self.hits, 'shared_hits': self.shared_hits,
+                    'misses': self.misses, 'shared': self.shared is not None}
+
+
+prediction_cache = PredictionCache()
+
+_model_versions = weakref.WeakKeyDictionary()
+
+
+def model_version(model):
+    """
+    Stable identifier of a loaded model, used as part of the cache key.
+    A 'model_version' attribute wins, otherwise the serialized booster is hashed once per object.
+    """
+    if model is None:
+        return 'none'
+    version = getattr(model, 'model_version', None)
+    if version:
+        return str(version)
+    try:
+        return _model_versions[model]
+    except (KeyError, TypeError):
+        pass
+    try:
+        raw = model.get_booster().save_raw()
+        version = hashlib.sha1(bytes(raw)).hexdigest()[:16]
+    except Exception:
+        version = f"{type(model).__name__}-{id(model)}"
+    try:
+        _model_versions[model] = version
+    except TypeError:
+        pass
+    return version
+
+
+def row_hash(row):
+    return hashlib.sha1(np.asarray(row, dtype=np.float64).tobytes()).hexdigest()
+
+
+def feature_contributions(model, X, exact=False):
+    """
+    Per-feature contributions (log-odds for classifiers) from the tree model's native output.
+
+    By default XGBoost's fast path-attribution (approx_contribs) is used so explanations
+    stay cheap enough to return inline; exact=True runs full TreeSHAP.
+
+    Returns:
+        np.ndarray: shape (n_rows, n_features + 1), the last column is the bias/base value.
+    """
+    if hasattr(model, 'predict_contribs'):
+        # Compact tree format (compact_model.py) computes the same path attribution itself
+        return model.predict_contribs(X)
+    import xgboost as xgb
+    booster = model.get_booster()
+    return booster.predict(xgb.DMatrix(X), pred_contribs=True, approx_contribs=not exact)
+
+
+def build_explanation(features_list, contribs):
+    """Turns one row of contributions into the JSON shape returned to the frontend."""
+    values = {feat: float(round(contribs[i], 4)) for i, feat in enumerate(features_list)}
+    ranked = sorted(values.items(), key=lambda kv: abs(kv[1]), reverse=True)[:TOP_FACTORS]
+    return {
+        'base_value': float(round(contribs[-1], 4)),
+        'contributions': values,
+        'top_factors': [
+            {'feature': feat, 'contribution': val, 'effect': 'increases' if val > 0 else 'decreases'}
+            for feat, val in ranked if val != 0
+        ]
+    }
+
+
+def predict(data, approval_model, bank_model, bank_encoder, features_list, explain=False):
     """
     Predicts loan approval and recommends a bank.
-    
+
     Args:
         data (dict): Dictionary of input features from frontend.
         approval_model: Loaded XGBClassifier for approval.
         bank_model: Loaded model for bank recommendation.
         bank_encoder: LabelEncoder for bank names.
         features_list (list): Order of features expected by the model.
-        
+        explain (bool): Also return per-feature contributions under 'explanation'.
+
     Returns:
         dict: {
             'status': 'Approved' or 'Rejected',
@@ -21,170 +252,153 @@ def predict(data, approval_model, bank_model, bank_encoder, features_list):
             'approved': bool
         }
     """
-    
-    # 1. Map Frontend Keys to Model Feature Names
-    # Note: Keys must match what the Angular app sends.
-    # Assuming Angular sends camelCase keys as seen in user-eligibility.
-    
-    # Default values provided for safety
-    input_dict = {
-        'Age': data.get('age', 30),
-        'Gender': data.get('gender', 'Male'),
-        'Marital_Status': data.get('maritalStatus', 'Single'),
-        'Dependents': data.get('dependents', '0'),
-        'Education': data.get('education', 'Graduate'),
-        'Self_Employed': data.get('selfEmployed', 'No'),
-        'Work_Experience_Years': data.get('experience', 0),
-        'ApplicantIncome': data.get('applicantIncome', 0),
-        'CoapplicantIncome': data.get('coApplicantIncome', 0),
-        'Salary_Payment_Mode': data.get('salaryMode', 'Cash'),
-        'Existing_EMI': data.get('existingEmi', 0),
-        'Residential_Assets': data.get('assets', 'None'),
-        'Area': data.get('area', 'Urban'),
-        'Loan_Purpose': data.get('loanPurpose', 'Other'),
-        'LoanAmount': data.get('loanAmount', 0),
-        'Loan_Amount_Term': data.get('tenure', 12)
-    }
-    
-    df = pd.DataFrame([input_dict])
-    
-    # 2. Encoding Categorical Variables
-    # We use standard Label Encoding logic (Alphabetical Order) to match training time behavior
-    # If the user used a custom encoder for features, it should have been provided.
-    # We fallback to this convention.
-    
-    mappings = {
-        'Gender': {'Female': 0, 'Male': 1, 'Other': 2},
-        'Marital_Status': {'Single': 0, 'Married': 1},
-        'Education': {'Graduate': 0, 'Not Graduate': 1},
-        'Self_Employed': {'No': 0, 'Yes': 1},
-        'Area': {'Rural': 0, 'Semiurban': 1, 'Urban': 2},
-        'Salary_Payment_Mode': {'Bank Transfer': 0, 'Cash': 1, 'Cheque': 2},
-        'Residential_Assets': {'House + Land': 0, 'None': 1, 'Own House': 2},
-        'Loan_Purpose': {
-            'Asset Purchase': 0, 'Education': 1, 'Home Renovation': 2, 
-            'Medical': 3, 'Other': 4, 'Wedding': 5
-        },
-        'Dependents': {'0': 0, '1': 1, '2': 2, '3+': 3}
-    }
-    
-    # Apply mappings
-    for col, mapping in mappings.items():
-        if col in df.columns:
-            # Clean string input just in case
-            val = df.iloc[0][col]
-            if isinstance(val, str):
-                val = val.strip()
-            
-            # Map, default to 0 if not found to avoid crash
-            encoded_val = mapping.get(str(val), 0) 
-            df[col] = encoded_val
+    return predict_batch([data], approval_model, bank_model, bank_encoder, features_list, explain=explain)[0]
 
-    # Ensure all columns from features_list exist and are in order
-    final_df = pd.DataFrame()
-    for feature in features_list:
-        if feature in df.columns:
-            final_df[feature] = df[feature]
-        else:
-            final_df[feature] = 0 # Fill missing features with 0
-            
-    # Convert to numeric (handle inputs passed as strings)
-    final_df = final_df.apply(pd.to_numeric, errors='coerce').fillna(0)
-
-    # Fallback/Hardcoded Bank Mapping (Alphabetical Order as per LabelEncoder default)
-    HARDCODED_BANKS = [
-        'Axis Bank',
-        'Bank of Baroda',
-        'Bank of India',
-        'HDFC Bank',
-        'ICICI Bank',
-        'IDFC FIRST Bank',
-        'IndusInd Bank',
-        'Kotak Mahindra Bank',
-        'State Bank of India (SBI)',
-        'YES Bank'
-    ]
-
-    # 3. Prediction
-    try:
-        # Probability of Class 1 (Approved)
-        # XGBoost predict_proba returns [[prob_0, prob_1]]
-        probs = approval_model.predict_proba(final_df)[0]
-        approval_prob = probs[1]
-        
+
+def predict_batch(records, approval_model, bank_model, bank_encoder, features_list, explain=False, exact=False):
+    """
+    Batched version of predict(): one model call for all cache misses.
+
+    Results are cached together with their explanation by feature-vector hash and model version,
+    so repeated submissions of the same form are answered without touching the models.
+
+    Returns:
+        list: one result dict per record, in input order.
+    """
+    # 1. Encode every record and look it up in the cache
+    rows = [encode_row(data, features_list) for data in records]
+    # The feature order is part of the key: the same vector means something else under another list
+    features_hash = hashlib.sha1("\x1f".join(map(str, features_list)).encode()).hexdigest()[:16]
+    version = f"{model_version(approval_model)}:{model_version(bank_model)}:{features_hash}"
+    keys = [f"{version}:{row_hash(row)}" for row in rows]
+
+    entries = [prediction_cache.get(key) for key in keys]
+    todo = [i for i, entry in enumerate(entries)
+            if entry is None or (explain and entry.get('explanation') is None)]
+
+    # 2. Score the misses in one pass
+    if todo:
+        try:
+            computed = _score_rows(
+                [rows[i] for i in todo], approval_model, bank_model, bank_encoder,
+                features_list, explain, exact
+            )
+            for i, entry in zip(todo, computed):
+                prev = entries[i]
+                if prev is not None and entry.get('explanation') is None:
+                    entry['explanation'] = prev.get('explanation')
+                entries[i] = entry
+                prediction_cache.put(keys[i], entry)
+        except Exception as e:
+            print(f"Prediction Error: {e}")
+            error = {
+                'approved': False,
+                'status': 'Error',
+                'probability': 0,
+                'bank': None,
+                'error': str(e)
+            }
+            for i in todo:
+                entries[i] = {'result': error, 'explanation': None}
+
+    # 3. Hand out copies so callers can add fields (e.g. application_id) safely
+    results = []
+    for entry in entries:
+        result = copy.deepcopy(entry['result'])
+        if explain and entry.get('explanation') is not None:
+            result['explanation'] = copy.deepcopy(entry['explanation'])
+        results.append(result)
+    return results
+
+
+def _score_rows(rows, approval_model, bank_model, bank_encoder, features_list, explain, exact):
+    final_df = pd.DataFrame(rows, columns=list(features_list))
+
+    # Probability of Class 1 (Approved)
+    # XGBoost predict_proba returns [[prob_0, prob_1]]
+    approval_probs = approval_model.predict_proba(final_df)[:, 1]
+
+    contribs = None
+    if explain:
+        try:
+            contribs = feature_contributions(approval_model, final_df, exact=exact)
+        except Exception as e:
+            print(f"Explanation error: {e}")
+
+    # Helper to get bank name
+    def get_bank_name(idx):
+        if bank_encoder:
+            try:
+                return bank_encoder.inverse_transform([idx])[0]
+            except:
+                pass
+        if 0 <= idx < len(HARDCODED_BANKS):
+            return HARDCODED_BANKS[idx]
+        return f"Bank {idx}"
+
+    # Bank Recommendation (Only if approved) - one call for all approved rows
+    approved_idx = [i for i, p in enumerate(approval_probs) if p > 0.5]
+    bank_row = {i: j for j, i in enumerate(approved_idx)}
+    bank_probs = None
+    if approved_idx and hasattr(bank_model, 'predict_proba'):
+        try:
+            bank_probs = bank_model.predict_proba(final_df.iloc[approved_idx])
+        except Exception as b_err:
+            print(f"Bank probability error: {b_err}")
+
+    entries = []
+    for i, approval_prob in enumerate(approval_probs):
         # Threshold at 0.5
         is_approved = approval_prob > 0.5
-        
+
         result = {
             'approved': bool(is_approved),
             'status': 'Approved' if is_approved else 'Rejected',
             'probability': float(round(approval_prob * 100, 2)),
             'bank': 'N/A'
         }
-        
-        # 4. Bank Recommendation (Only if approved)
+
         result['bank_list'] = []
         if is_approved:
             display_banks = []
-            
-            # Helper to get bank name
-            def get_bank_name(idx):
-                if bank_encoder:
-                    try:
-                        return bank_encoder.inverse_transform([idx])[0]
-                    except:
-                        pass
-                if 0 <= idx < len(HARDCODED_BANKS):
-                    return HARDCODED_BANKS[idx]
-                return f"Bank {idx}"
-
-            # Try to get probabilities for all banks
-            if hasattr(bank_model, 'predict_proba'):
-                try:
-                    bank_probs = bank_model.predict_proba(final_df)[0]
-                    # Get indices of top 5
-                    top_indices = bank_probs.argsort()[-5:][::-1]
-                    
-                    for idx in top_indices:
-                        bank_name = get_bank_name(idx)
-                        prob = float(bank_probs[idx] * 100)
-                        
-                        risk = "Low"
-                        if prob < 75: risk = "Medium"
-                        if prob < 60: risk = "High"
-                        
-                        display_banks.append({
-                            'name': bank_name,
-                            'probability': round(prob, 1),
-                            'risk': risk
-                        })
-                except Exception as b_err:
-                    print(f"Bank probability error: {b_err}")
-            
+
+            if bank_probs is not None:
+                row_probs = bank_probs[bank_row[i]]
+                # Get indices of top 5
+                top_indices = row_probs.argsort()[-5:][::-1]
+
+                for idx in top_indices:
+                    bank_name = get_bank_name(idx)
+                    prob = float(row_probs[idx] * 100)
+
+                    risk = "Low"
+                    if prob < 75: risk = "Medium"
+                    if prob < 60: risk = "High"
+
+                    display_banks.append({
+                        'name': bank_name,
+                        'probability': round(prob, 1),
+                        'risk': risk
+                    })
+
             # Fallback if predict_proba fails or empty
             if not display_banks:
-                bank_idx = int(bank_model.predict(final_df)[0])
+                bank_idx = int(bank_model.predict(final_df.iloc[[i]])[0])
                 bank_name = get_bank_name(bank_idx)
-                
+
                 result['bank'] = bank_name # Primary recommendation
                 display_banks.append({
-                    'name': bank_name, 
-                    'probability': 90.0, 
+                    'name': bank_name,
+                    'probability': 90.0,
                     'risk': 'Low'
                 })
             else:
                 result['bank'] = display_banks[0]['name'] # Top one as primary
-                
+
             result['bank_list'] = display_banks
-                
-        return result
-
-    except Exception as e:
-        print(f"Prediction Error: {e}")
-        return {
-            'approved': False,
-            'status': 'Error',
-            'probability': 0,
-            'bank': None,
-            'error': str(e)
-        }
+
+        explanation = None
+        if contribs is not None:
+            explanation = build_explanation(features_list, contribs[i])
+        entries.append({'result': result, 'explanation': explanation})
+    return entries
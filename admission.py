@@ -0,0 +1,129 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from quantiles import P2Quantile
+
+# Admission control for the CPU-bound prediction routes.
+# A RouteLimiter bounds the number of requests running a route at once and lets only a
+# short queue wait for a slot; everything beyond that is rejected immediately (429) so a
+# burst cannot pile up model calls and starve the cheap routes. ClientRateLimiter is a
+# per-key token bucket; app.py keys it on the client address, the only identity /predict carries.
+
+
+class RouteLimiter:
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.Semaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.queued = 0
+        self.max_queue_ms = 0.0
+        self._queue_ms = {p: P2Quantile(p) for p in (0.5, 0.95, 0.99)}
+
+    def acquire(self):
+        """True when the caller may run; False means reject with 429."""
+        if self._slots.acquire(blocking=False):
+            with self._lock:
+                self.in_flight += 1
+                self.admitted += 1
+            return True
+
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                return False
+            self.waiting += 1
+
+        start = time.perf_counter()
+        ok = self._slots.acquire(timeout=self.queue_timeout)
+        waited = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.waiting -= 1
+            self.queued += 1
+            self.max_queue_ms = max(self.max_queue_ms, waited)
+            for est in self._queue_ms.values():
+                est.add(waited)
+            if not ok:
+                self.rejected_timeout += 1
+                return False
+            self.in_flight += 1
+            self.admitted += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def retry_after(self):
+        return max(1, math.ceil(self.queue_timeout))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+                'queue_ms': {
+                    'p50': self._queue_ms[0.5].value(),
+                    'p95': self._queue_ms[0.95].value(),
+                    'p99': self._queue_ms[0.99].value(),
+                    'max': self.max_queue_ms
+                }
+            }
+
+
+class ClientRateLimiter:
+    """Token bucket per client key; the least recently seen keys are evicted past max_keys."""
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def allow(self, key):
+        """Returns (allowed, retry_after_seconds)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                allowed, retry_after = True, 0
+                self.allowed += 1
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, max(1, math.ceil((1 - tokens) / self.rate))
+                self.limited += 1
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'tracked_clients': len(self._buckets),
+                'allowed': self.allowed,
+                'limited': self.limited
+            }
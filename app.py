@@ -1,13 +1,25 @@
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import startup_profile
+# Import / load timings on the way to serving (python app.py --profile-startup, /admin/startup)
+profile = startup_profile.StartupProfile()
+
 import pickle
 import os
 import sys
-import pandas as pd
 import json
 import uuid
 import glob
+import atexit
+import signal
+import copy
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+with profile.step('flask', 'import'):
+    from flask import Flask, request, jsonify, after_this_request
+    from flask_cors import CORS
 
 # Add "ML model" directory to path to import prediction_script
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,21 +28,34 @@ officer_dir = os.path.join(base_dir, "officer models")
 sys.path.append(ml_dir)
 sys.path.append(officer_dir)
 
-try:
-    import prediction_script
-except ImportError as e:
-    print(f"Error importing prediction_script: {e}")
-    # Fallback if import fails (unlikely)
-    prediction_script = None
+# The prediction modules pull in pandas / numpy / xgboost (over a second of imports) and the
+# models; they are imported by the warmup thread (see Startup below) so the server can answer
+# /health right away. Routes that need them wait for models_ready.
+prediction_script = None
+officer_prediction = None
+compact_model = None
+inference_pool = None
+shadow = None
+columnar = None
+neighbors = None
 
-try:
-    import prediction as officer_prediction
-except ImportError as e:
-    print(f"Error importing officer prediction module: {e}")
-    officer_prediction = None
+with profile.step('local modules', 'import'):
+    import drift_monitor
+    import admission
+    import write_behind
+    import idempotency
+    import archive
+    import state_backend
+    import rollups
+    import sync
+    import search_index
+    import fraud_links
 
-from flask_pymongo import PyMongo
-from bson.objectid import ObjectId
+with profile.step('flask_pymongo', 'import'):
+    from flask_pymongo import PyMongo
+    from bson.objectid import ObjectId
+    from pymongo import ReturnDocument
+    from pymongo.errors import BulkWriteError
 
 app = Flask(__name__)
 # Enable CORS for Angular App
@@ -39,21 +64,29 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 # MongoDB Configuration
 app.config["MONGO_URI"] = "mongodb://localhost:27017/loan_db"
 mongo = PyMongo(app)
+# 'connecting' until the background check below finishes, then 'connected' / 'unavailable'
+mongo_status = 'connecting'
 
-# Test MongoDB Connection immediately
-try:
-    mongo.cx.server_info() # Forces a connection attempt
-    print("\n" + "="*50)
-    print(" SUCCESS: Connected to Local MongoDB!")
-    print(f" Database: {app.config['MONGO_URI']}")
-    print("="*50 + "\n")
-except Exception as e:
-    print("\n" + "!"*50)
-    print(" WARNING: Cound NOT connect to MongoDB.")
-    print(" ensure the MongoDB Service is running.")
-    print(f" Error details: {e}")
-    print(" System will fall back to 'local_applications.json'")
-    print("!"*50 + "\n")
+def check_mongo_connection():
+    global mongo_status
+    try:
+        with profile.step('mongo server_info', 'connect'):
+            mongo.cx.server_info() # Forces a connection attempt
+        mongo_status = 'connected'
+        if reconciler:
+            reconciler.trigger() # move anything written locally during the last outage now
+        print("\n" + "="*50)
+        print(" SUCCESS: Connected to Local MongoDB!")
+        print(f" Database: {app.config['MONGO_URI']}")
+        print("="*50 + "\n")
+    except Exception as e:
+        mongo_status = 'unavailable'
+        print("\n" + "!"*50)
+        print(" WARNING: Cound NOT connect to MongoDB.")
+        print(" ensure the MongoDB Service is running.")
+        print(f" Error details: {e}")
+        print(" System will fall back to 'local_applications.json'")
+        print("!"*50 + "\n")
 
 # Global Variables for Models
 approval_model = None
@@ -61,29 +94,163 @@ bank_model = None
 bank_encoder = None
 approval_features = []
 
+# Load the slim *.compact.npz artifacts (compact_model.py) instead of the pickles when present
+# and compaction_report.json shows a gain for that model (see compact_model.worthwhile)
+app.config["USE_COMPACT_MODELS"] = os.environ.get("USE_COMPACT_MODELS", "0") == "1"
+
+def model_file_path(filename):
+    path = os.path.join(ml_dir, filename)
+    if (app.config["USE_COMPACT_MODELS"] and compact_model and os.path.exists(compact_model.compact_path(path))
+            and compact_model.compact_enabled(path)):
+        return compact_model.compact_path(path)
+    return path
+
+def load_model_file(filename):
+    path = model_file_path(filename)
+    with profile.step(os.path.relpath(path, base_dir), 'artifact'):
+        if path.endswith('.npz'):
+            print(f"Loading compact model: {path}")
+            return compact_model.CompactTreeModel.load(path)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+# --- Inference Worker Pool ---
+# INFERENCE_WORKERS=N scores all models in N worker processes with micro-batching
+# (see inference_pool.py); 0 keeps scoring on the request threads
+app.config["INFERENCE_WORKERS"] = int(os.environ.get("INFERENCE_WORKERS", 0))
+app.config["INFERENCE_MAX_BATCH"] = int(os.environ.get("INFERENCE_MAX_BATCH", 256))
+app.config["INFERENCE_BATCH_WINDOW_MS"] = float(os.environ.get("INFERENCE_BATCH_WINDOW_MS", 2.0))
+model_pool = None
+
+def init_inference_pool():
+    global model_pool, approval_model, bank_model
+    specs, local = {}, {}
+    for name, model, filename in (('approval_model', approval_model, "user_approval_model.pkl"),
+                                  ('bank_model', bank_model, "user_bank_recommendation_model.pkl")):
+        if model is not None:
+            specs[name], local[name] = model_file_path(filename), model
+    if officer_prediction:
+        for name, filename in officer_prediction.MODEL_FILES.items():
+            specs[name] = officer_prediction.model_path(filename)
+            local[name] = getattr(officer_prediction, name)
+    if not specs:
+        return
+    try:
+        model_pool = inference_pool.InferencePool(
+            specs,
+            workers=app.config["INFERENCE_WORKERS"],
+            max_batch=app.config["INFERENCE_MAX_BATCH"],
+            batch_window_ms=app.config["INFERENCE_BATCH_WINDOW_MS"]
+        )
+    except Exception as e:
+        print(f"Warning: inference pool disabled, scoring in-process: {e}")
+        return
+    atexit.register(model_pool.close)
+    print(f"Inference pool started with {app.config['INFERENCE_WORKERS']} workers.")
+
+    proxies = {name: inference_pool.PooledModel(model_pool, name, model) for name, model in local.items()}
+    approval_model = proxies.get('approval_model', approval_model)
+    bank_model = proxies.get('bank_model', bank_model)
+    if officer_prediction:
+        officer_prediction.set_models(**{name: proxies[name] for name in officer_prediction.MODEL_FILES})
+
+# Drift monitors for live traffic vs. the training datasets (see drift_monitor.py)
+app.config["DRIFT_REPORT_INTERVAL"] = int(os.environ.get("DRIFT_REPORT_INTERVAL", 60))
+user_drift = None
+officer_drift = None
+
+def init_drift_monitors():
+    global user_drift, officer_drift
+    try:
+        features = approval_features or list(prediction_script.INPUT_FIELDS)
+        user_drift = drift_monitor.create_monitor(
+            'user', drift_monitor.USER_DATASET, features, app.config["DRIFT_REPORT_INTERVAL"])
+        if officer_prediction:
+            officer_features = []
+            for feats in (officer_prediction.officer_approval_features,
+                          officer_prediction.fraud_features,
+                          officer_prediction.loan_amount_features):
+                officer_features += [f for f in feats if f not in officer_features]
+            officer_drift = drift_monitor.create_monitor(
+                'officer', drift_monitor.OFFICER_DATASET, officer_features, app.config["DRIFT_REPORT_INTERVAL"])
+    except Exception as e:
+        print(f"Warning: drift monitors disabled: {e}")
+
+# --- Shadow Scoring ---
+# A retrained model saved next to the live one as '<model>.candidate.pkl' (or given by
+# SHADOW_USER_MODEL / SHADOW_OFFICER_MODEL) is scored on a SHADOW_SAMPLE_RATE fraction of
+# live inputs after the response has gone out (see shadow.py); results at /admin/shadow
+app.config["SHADOW_SAMPLE_RATE"] = float(os.environ.get("SHADOW_SAMPLE_RATE", 0.1))
+app.config["SHADOW_USER_MODEL"] = os.environ.get(
+    "SHADOW_USER_MODEL", os.path.join(ml_dir, "user_approval_model.candidate.pkl"))
+app.config["SHADOW_OFFICER_MODEL"] = os.environ.get(
+    "SHADOW_OFFICER_MODEL", os.path.join(officer_dir, "officer_approval_model.candidate.pkl"))
+user_shadow = None
+officer_shadow = None
+
+def load_candidate(path):
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        print(f"Loading shadow candidate: {path}")
+        return compact_model.load_model(path)
+    except Exception as e:
+        print(f"Warning: shadow candidate {path} could not be loaded: {e}")
+        return None
+
+def init_shadow_scorers():
+    global user_shadow, officer_shadow
+    rate = app.config["SHADOW_SAMPLE_RATE"]
+    candidate = load_candidate(app.config["SHADOW_USER_MODEL"])
+    if candidate is not None and approval_model is not None:
+        features = approval_features or list(prediction_script.INPUT_FIELDS)
+        user_shadow = shadow.ShadowScorer('user_approval', lambda: approval_model, candidate, features, rate)
+    candidate = load_candidate(app.config["SHADOW_OFFICER_MODEL"])
+    if candidate is not None and officer_prediction:
+        officer_shadow = shadow.ShadowScorer(
+            'officer_approval', lambda: officer_prediction.officer_approval_model, candidate,
+            officer_prediction.officer_approval_features, rate)
+
+def run_after_response(fn):
+    """Runs fn() once the current response has been sent (errors are logged)."""
+    @after_this_request
+    def _register(response):
+        def _run():
+            try:
+                fn()
+            except Exception as e:
+                print(f"After-response task error: {e}")
+        response.call_on_close(_run)
+        return response
+
+def shadow_after_response(scorer, make_rows):
+    """Hands the rows from make_rows() to the shadow scorer once the response has been sent."""
+    if not scorer:
+        return
+    def _submit():
+        for row in make_rows():
+            scorer.submit(row)
+    run_after_response(_submit)
+
 def load_models():
     global approval_model, bank_model, bank_encoder, approval_features
     try:
         print("Loading models from:", ml_dir)
         
-        with open(os.path.join(ml_dir, "user_approval_model.pkl"), "rb") as f:
-            approval_model = pickle.load(f)
+        approval_model = load_model_file("user_approval_model.pkl")
             
-        with open(os.path.join(ml_dir, "user_bank_recommendation_model.pkl"), "rb") as f:
-            bank_model = pickle.load(f)
+        bank_model = load_model_file("user_bank_recommendation_model.pkl")
             
         # Try loading encoder
         try:
-            with open(os.path.join(ml_dir, "bank_label_encoder.pkl"), "rb") as f:
-                bank_encoder = pickle.load(f)
+            bank_encoder = load_model_file("bank_label_encoder.pkl")
         except Exception as e:
             print(f"Warning: Bank Encoder could not be loaded: {e}")
             bank_encoder = None
             
         # Try loading feature list
         try:
-            with open(os.path.join(ml_dir, "approval_features.pkl"), "rb") as f:
-                approval_features = pickle.load(f)
+            approval_features = load_model_file("approval_features.pkl")
         except Exception as e:
             print(f"Warning: Feature list could not be loaded, using default: {e}")
             # Fallback list based on previous inspection
@@ -98,114 +265,328 @@ def load_models():
     except Exception as e:
         print(f"CRITICAL ERROR: Failed to load models: {e}")
 
+    if officer_prediction:
+        # prediction.py times its own files; it loads lazily on first use if this is skipped
+        offset = profile.elapsed_ms()
+        for filename, ms in officer_prediction.load_models().items():
+            profile.record(os.path.join("officer models", filename), 'artifact', ms, offset)
+            offset += ms
+
+# --- Shared State ---
+# Blocked users, the fallback application store and the shared prediction cache live in a
+# state backend (see state_backend.py): 'file' = the local JSON files with locking, safe for
+# several instances on one host; 'redis' = REDIS_URL, for instances on several hosts
+# (REDIS_URL=memory:// uses an in-process stand-in)
+app.config["STATE_BACKEND"] = os.environ.get("STATE_BACKEND", "file")
+app.config["REDIS_URL"] = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+app.config["STATE_PREFIX"] = os.environ.get("STATE_PREFIX", "loan_app")
+app.config["SHARED_PREDICTION_CACHE"] = os.environ.get(
+    "SHARED_PREDICTION_CACHE", "1" if app.config["STATE_BACKEND"] == "redis" else "0") == "1"
+
+try:
+    state_store = state_backend.open_backend(
+        app.config["STATE_BACKEND"], app.config["REDIS_URL"], app.config["STATE_PREFIX"])
+except Exception as e:
+    print(f"WARNING: state backend '{app.config['STATE_BACKEND']}' unavailable, using local files: {e}")
+    state_store = state_backend.FileStateBackend()
+
+def attach_shared_caches():
+    if not app.config["SHARED_PREDICTION_CACHE"]:
+        return
+    if prediction_script:
+        prediction_script.prediction_cache.shared = state_store.cache('user_predictions')
+    if officer_prediction:
+        officer_prediction.prediction_cache.shared = state_store.cache('officer_predictions')
+
 # --- DB Helper Functions ---
-DB_FILE = os.path.join(base_dir, "local_applications.json")
+DB_FILE = state_backend.DB_FILE
 
 def read_local_db():
-    if not os.path.exists(DB_FILE):
-        return []
     try:
-        with open(DB_FILE, 'r') as f:
-            return json.load(f)
-    except:
+        return state_store.read_applications()
+    except Exception as e:
+        print(f"Error reading local DB: {e}")
         return []
 
 def save_local_db(data):
     try:
-        with open(DB_FILE, 'w') as f:
-            json.dump(data, f, default=str, indent=4)
+        state_store.write_applications(data)
+        return True
     except Exception as e:
         print(f"Error saving local DB: {e}")
+        return False
+
+def update_local_db(fn, touched=None):
+    """
+    Locked read-modify-write of the fallback store; fn(apps) returns (result, changed).
+    Records fn appends to `touched` are re-indexed for /admin/search.
+    """
+    return state_store.update_applications(fn, on_commit=lambda before, after: index_local_write(touched, before, after))
+
+def apply_update_fields(app, update_fields):
+    # Update nested keys like 'input.Name'
+    for key, val in update_fields.items():
+        if '.' in key:
+            parent, child = key.split('.')
+            if parent not in app: app[parent] = {}
+            if isinstance(app[parent], dict):
+                app[parent][child] = val
+        else:
+            app[key] = val
+
+# --- Write-Behind Inserts ---
+# WRITE_BEHIND=1: /predict assigns the _id, buffers the record and returns; a background
+# writer flushes with insert_many in batches (see write_behind.py)
+app.config["WRITE_BEHIND"] = os.environ.get("WRITE_BEHIND", "0") == "1"
+app.config["WRITE_BEHIND_BATCH"] = int(os.environ.get("WRITE_BEHIND_BATCH", 200))
+app.config["WRITE_BEHIND_INTERVAL"] = float(os.environ.get("WRITE_BEHIND_INTERVAL", 0.05))
+write_buffer = None
+
+def flush_applications(records):
+    try:
+        mongo.db.loan_applications.insert_many(records, ordered=False)
+        return
+    except BulkWriteError as e:
+        # Duplicate keys mean an earlier attempt already wrote those records
+        errors = e.details.get('writeErrors', [])
+        if errors and all(err.get('code') == 11000 for err in errors):
+            return
+        raise
+    except Exception as e:
+        print(f"Mongo bulk insert failed, using local JSON DB: {e}")
+
+    # One rewrite of the JSON file per batch
+    def append_new(apps):
+        known = {str(a.get('_id')) for a in apps}
+        added = 0
+        for record in records:
+            if str(record['_id']) in known:
+                continue
+            local = dict(record)
+            local['_id'] = str(local['_id'])
+            if hasattr(local.get('timestamp'), 'isoformat'):
+                local['timestamp'] = local['timestamp'].isoformat()
+            apps.append(local)
+            touched.append(local)
+            added += 1
+        return added, added > 0
+    touched = []
+    try:
+        update_local_db(append_new, touched)
+    except Exception as e:
+        raise IOError(f"local JSON DB could not be written: {e}")
+
+def init_write_behind():
+    global write_buffer
+    write_buffer = write_behind.WriteBehindBuffer(
+        flush_applications,
+        max_batch=app.config["WRITE_BEHIND_BATCH"],
+        flush_interval=app.config["WRITE_BEHIND_INTERVAL"]
+    )
+    # Flush everything still buffered on shutdown (SIGTERM goes through sys.exit -> atexit)
+    atexit.register(write_buffer.close)
+    try:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    except ValueError:
+        pass # not in the main thread
+
+if app.config["WRITE_BEHIND"]:
+    init_write_behind()
 
 def db_insert_application(record):
+    if write_buffer:
+        record.setdefault('_id', ObjectId())
+        write_buffer.add(record)
+        record_rollups(None, record)
+        return str(record['_id'])
+
     try:
         # Try Mongo first
         if mongo.db: # connection might technically be live object even if server down, but insert throws
             inserted = mongo.db.loan_applications.insert_one(record)
+            record_rollups(None, record)
             return str(inserted.inserted_id)
     except Exception:
         pass
     
     # Fallback/Primary JSON
     print("Using local JSON DB for insert.")
-    apps = read_local_db()
     if '_id' not in record:
         record['_id'] = str(uuid.uuid4())
     # Ensure timestamp is string
     if hasattr(record.get('timestamp'), 'isoformat'):
         record['timestamp'] = record['timestamp'].isoformat()
     
-    apps.append(record)
-    save_local_db(apps)
+    update_local_db(lambda apps: (apps.append(record), True), touched=[record])
+    record_rollups(None, record)
     return record['_id']
 
+# --- Idempotent /predict ---
+# IDEMPOTENT_PREDICT=1: a resubmitted form (same normalized input hash within the window)
+# updates and returns the existing application instead of inserting a new one. Only records
+# still at 'predicted' are reused: once applied for, a resubmission starts a new application
+app.config["IDEMPOTENT_PREDICT"] = os.environ.get("IDEMPOTENT_PREDICT", "0") == "1"
+app.config["IDEMPOTENCY_WINDOW"] = int(os.environ.get("IDEMPOTENCY_WINDOW", idempotency.DEFAULT_WINDOW))
+_input_hash_index_ready = False
+
+def db_upsert_application(record, window_seconds):
+    global _input_hash_index_ready
+    input_hash = record['input_hash']
+    cutoff = (datetime.now() - timedelta(seconds=window_seconds)).isoformat()
+    resubmit = {'prediction': record['prediction'], 'last_submitted_at': record['timestamp']}
+
+    def matches(app):
+        return (app.get('input_hash') == input_hash and app.get('status') == 'predicted'
+                and str(app.get('timestamp', '')) >= cutoff)
+
+    def resubmitted(app):
+        apply_update_fields(app, dict(resubmit, updated_at=datetime.now().isoformat()))
+        app['submit_count'] = app.get('submit_count', 1) + 1
+
+    # Still in the write-behind buffer (if it was flushed meanwhile, the Mongo upsert below finds it)
+    if write_buffer:
+        pending_id = write_buffer.find(matches)
+        if pending_id and write_buffer.update(pending_id, resubmitted):
+            return pending_id
+
+    # Mongo: single round trip upsert (find only when inserts are buffered)
+    try:
+        coll = mongo.db.loan_applications
+        if not _input_hash_index_ready:
+            coll.create_index([('input_hash', 1), ('timestamp', -1)])
+            _input_hash_index_ready = True
+        insert_fields = {k: v for k, v in record.items() if k not in resubmit and k not in ('input_hash', '_id')}
+        doc = coll.find_one_and_update(
+            {'input_hash': input_hash, 'status': 'predicted', 'timestamp': {'$gte': cutoff}},
+            {'$set': resubmit, '$inc': {'submit_count': 1}, '$setOnInsert': insert_fields},
+            sort=[('timestamp', -1)],
+            upsert=write_buffer is None,
+            return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            if doc.get('timestamp') == record['timestamp']:
+                record_rollups(None, doc) # inserted by this upsert
+            return str(doc['_id'])
+        return db_insert_application(record)
+    except Exception:
+        pass
+
+    # Local JSON: match and insert under one lock so concurrent instances cannot both insert
+    def upsert_local(apps):
+        for app in reversed(apps):
+            if matches(app):
+                resubmitted(app)
+                touched.append(app)
+                return str(app['_id']), True
+        if write_buffer:
+            return None, False
+        record.setdefault('_id', str(uuid.uuid4()))
+        apps.append(record)
+        inserted.append(record)
+        touched.append(record)
+        return str(record['_id']), True
+
+    inserted, touched = [], []
+    app_id = update_local_db(upsert_local, touched)
+    if inserted:
+        record_rollups(None, record)
+    if app_id:
+        return app_id
+    return db_insert_application(record)
+
 def db_update_application(app_id, update_fields):
+    # updated_at lets the JSON -> Mongo sync tell which copy of a record is newer
+    update_fields = dict(update_fields, updated_at=datetime.now().isoformat())
+
+    # Not flushed yet: update the buffered record in place
+    if write_buffer and write_buffer.update(app_id, lambda rec: apply_update_fields(rec, update_fields)):
+        return True
+
     success = False
-    # Try Mongo
+    # Try Mongo (ObjectId, or the UUID of a record synced from the JSON file)
     try:
         if mongo.db:
             try:
-                oid = ObjectId(app_id)
-                res = mongo.db.loan_applications.update_one({'_id': oid}, {'$set': update_fields})
+                res = mongo.db.loan_applications.update_one(sync.id_query(app_id), {'$set': update_fields})
                 if res.modified_count > 0:
                     success = True
             except:
-                pass # ID might be UUID, not ObjectId
+                pass
     except Exception:
         pass
         
     if success: return True
 
-    # Local JSON update
-    apps = read_local_db()
-    updated = False
-    for app in apps:
-        if str(app.get('_id')) == str(app_id):
-            # Update nested keys like 'input.Name'
-            for key, val in update_fields.items():
-                if '.' in key:
-                    parent, child = key.split('.')
-                    if parent not in app: app[parent] = {}
-                    if isinstance(app[parent], dict):
-                        app[parent][child] = val
-                else:
-                    app[key] = val
-            updated = True
-            break
-    if updated:
-        save_local_db(apps)
-        return True
-    return False
+    # Local JSON update (the record has to be synced again)
+    def update_local(apps):
+        for app in apps:
+            if str(app.get('_id')) == str(app_id):
+                apply_update_fields(app, update_fields)
+                for field in sync.SYNC_FIELDS:
+                    app.pop(field, None)
+                touched.append(app)
+                return True, True
+        return False, False
+    touched = []
+    return update_local_db(update_local, touched)
+
+def local_pending_applications():
+    """
+    Local records not synced to Mongo yet. The file is only parsed again when it has changed
+    (by any instance) since the last look, so with nothing pending a read is just a stat().
+    """
+    stamp = state_store.applications_stamp()
+    if stamp is not None and stamp == _local_pending['stamp']:
+        return _local_pending['records']
+    pending = [app for app in read_local_db() if not app.get('synced_at')]
+    _local_pending.update(stamp=stamp, records=pending)
+    return pending
 
-def db_get_applications(query_bank=None):
+_local_pending = {'stamp': None, 'records': []}
+
+def db_get_applications(query_bank=None, status=None, limit=50):
+    # limit=None returns every match (e.g. an officer's whole queue)
     results = []
+    mongo_ok = False
     # Try Mongo
     try:
         query = {}
         if query_bank:
             query['selected_bank'] = {'$regex': f'^{query_bank}$', '$options': 'i'}
-        apps = list(mongo.db.loan_applications.find(query).sort('timestamp', -1).limit(50))
+        if status:
+            query['status'] = status
+        cursor = mongo.db.loan_applications.find(query).sort('timestamp', -1)
+        apps = list(cursor.limit(limit) if limit else cursor)
         for app in apps:
             app['_id'] = str(app['_id'])
             results.append(app)
+        mongo_ok = True
     except Exception as e:
         print(f"Mongo Fetch Error: {e}")
 
-    # Local JSON
-    local_apps = read_local_db()
+    # Local JSON: only what the sync has not moved to Mongo yet, or everything while Mongo
+    # is down (+ records still waiting in the write-behind buffer). Local copies go first so
+    # they win the dedup below when they are newer than the synced version.
+    local_apps = local_pending_applications() if mongo_ok else read_local_db()
+    if write_buffer:
+        local_apps = write_buffer.list_pending() + local_apps
+    local_results = []
     for app in local_apps:
         # Filter
+        if status and app.get('status') != status:
+            continue
         if query_bank:
             if app.get('selected_bank') and query_bank.lower() in str(app.get('selected_bank')).lower():
-                results.append(app)
+                local_results.append(app)
         else:
-            results.append(app)
+            local_results.append(app)
+    results = local_results + results
             
-    # Dedup
+    # Dedup (a synced record carries its local UUID as legacy_id)
     seen = set()
     unique_results = []
     for r in results:
-        rid = str(r.get('_id'))
+        rid = str(r.get('legacy_id') or r.get('_id'))
         if rid not in seen:
             seen.add(rid)
             unique_results.append(r)
@@ -215,11 +596,21 @@ def db_get_applications(query_bank=None):
     return unique_results
 
 def db_get_application(app_id):
-    # Mongo
+    # Read-your-writes: records not flushed yet
+    if write_buffer:
+        pending = write_buffer.get(app_id)
+        if pending:
+            return pending
+
+    # Local edits not synced yet are newer than the Mongo copy
+    for app in local_pending_applications():
+        if str(app.get('_id')) == str(app_id):
+            return app
+
+    # Mongo (by ObjectId, or by the UUID of a record synced from the JSON file)
     try:
         try:
-            oid = ObjectId(app_id)
-            app = mongo.db.loan_applications.find_one({'_id': oid})
+            app = mongo.db.loan_applications.find_one(sync.id_query(app_id))
             if app:
                 app['_id'] = str(app['_id'])
                 return app
@@ -228,43 +619,329 @@ def db_get_application(app_id):
     except:
         pass
         
-    # Local JSON
+    # Local JSON (synced records within the retention period)
     apps = read_local_db()
     for app in apps:
         if str(app.get('_id')) == str(app_id):
             return app
-    return None
+
+    # Cold storage
+    return db_get_archived_application(app_id)
+
+# --- JSON -> Mongo Sync ---
+# Records that went to local_applications.json while Mongo was down are moved into Mongo by
+# a background reconciler every SYNC_INTERVAL seconds (0 = off; see sync.py), so reads can
+# stay on Mongo instead of merging both stores
+app.config["SYNC_INTERVAL"] = float(os.environ.get("SYNC_INTERVAL", sync.DEFAULT_INTERVAL))
+app.config["SYNC_BATCH"] = int(os.environ.get("SYNC_BATCH", sync.DEFAULT_BATCH))
+app.config["SYNC_RETENTION"] = float(os.environ.get("SYNC_RETENTION", sync.DEFAULT_RETENTION))
+reconciler = None
+
+def start_reconciler():
+    global reconciler
+    if app.config["SYNC_INTERVAL"] <= 0 or reconciler:
+        return
+    reconciler = sync.Reconciler(
+        state_store, lambda: mongo.db.loan_applications,
+        interval=app.config["SYNC_INTERVAL"],
+        batch_size=app.config["SYNC_BATCH"],
+        retention=app.config["SYNC_RETENTION"]
+    )
+
+# --- Cold Storage ---
+# Applications moved out by `python archive.py run` stay reachable through db_get_application
+app.config["ARCHIVE_TARGET"] = os.environ.get("ARCHIVE_TARGET", "files") # 'files' or 'mongo'
+app.config["ARCHIVE_DIR"] = os.environ.get("ARCHIVE_DIR", archive.ARCHIVE_DIR)
+application_archive = archive.open_archive(
+    app.config["ARCHIVE_TARGET"], app.config["ARCHIVE_DIR"], get_db=lambda: mongo.db)
+
+def db_get_archived_application(app_id):
+    try:
+        return application_archive.get(app_id)
+    except Exception as e:
+        print(f"Archive lookup error: {e}")
+        return None
 
 def db_get_all_applications():
     # Helper to get ALL applications without bank filter
     return db_get_applications()
 
-def get_blocked_users():
-    # Simple file-based blocked users
-    BLOCKED_FILE = os.path.join(base_dir, "blocked_users.json")
-    if not os.path.exists(BLOCKED_FILE):
-        return []
+# --- Daily Rollups ---
+# Per-day counters per status, bank and officer (see rollups.py), updated on every status
+# change so the admin stats answer date-range queries without scanning applications.
+# 'sqlite' = rollups.sqlite3 (instances on one host), 'mongo' = the daily_rollups collection
+app.config["ROLLUP_TARGET"] = os.environ.get("ROLLUP_TARGET", "sqlite")
+app.config["ROLLUP_FILE"] = os.environ.get("ROLLUP_FILE", rollups.ROLLUP_FILE)
+try:
+    rollup_store = rollups.open_rollups(app.config["ROLLUP_TARGET"], app.config["ROLLUP_FILE"], get_db=lambda: mongo.db)
+except Exception as e:
+    print(f"WARNING: rollups disabled: {e}")
+    rollup_store = None
+
+def record_rollups(before, after):
+    if not rollup_store:
+        return
     try:
-        with open(BLOCKED_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
+        rollup_store.add(rollups.diff(before, after))
+    except Exception as e:
+        print(f"Rollup update error: {e}")
+
+def db_update_application_tracked(app_id, update_fields):
+    """
+    db_update_application plus the rollup changes for the status / bank / officer it sets,
+    and fresh search keys when it changes the applicant's name or mobile.
+    """
+    before = db_get_application(app_id)
+    after = None
+    if before is not None:
+        after = copy.deepcopy(before)
+        apply_update_fields(after, update_fields)
+        if any(key.startswith('input.') for key in update_fields):
+            update_fields = dict(update_fields, search=search_index.search_fields(after.get('input')))
+    success = db_update_application(app_id, update_fields)
+    if success and before is not None:
+        record_rollups(before, after)
+        note_application_write(after)
+    return success
+
+def db_application_sources(projection=None, include_archive=False):
+    """Every stored application, as a list of iterables (local store, Mongo, write-behind, archive)."""
+    try:
+        remote = list(mongo.db.loan_applications.find({}, projection))
+        # Synced local copies can be older than Mongo's (decided since): only the unsynced ones
+        sources = [local_pending_applications(), remote]
+    except Exception as e:
+        print(f"Mongo unavailable, using local applications only: {e}")
+        sources = [read_local_db()]
+    if write_buffer:
+        sources.append(write_buffer.list_pending())
+    if include_archive:
+        sources.append(application_archive.iter_records())
+    return sources
+
+def rebuild_rollups():
+    sources = db_application_sources(include_archive=True)
+    counters = rollups.rebuild_counters(sources)
+    rollup_store.replace_all(counters)
+    return len(counters)
+
+def rollup_range():
+    """?from=YYYY-MM-DD&to=YYYY-MM-DD (both optional, inclusive)."""
+    start, end = request.args.get('from'), request.args.get('to')
+    for value in (start, end):
+        if value and rollups.day_of(value) != value:
+            raise ValueError(f"invalid date '{value}', expected YYYY-MM-DD")
+    return start, end
+
+def get_blocked_users():
+    return state_store.blocked_users()
 
 def save_blocked_user(user_identifier):
-    BLOCKED_FILE = os.path.join(base_dir, "blocked_users.json")
-    blocked = get_blocked_users()
-    if user_identifier not in blocked:
-        blocked.append(user_identifier)
-        with open(BLOCKED_FILE, 'w') as f:
-            json.dump(blocked, f)
+    state_store.add_blocked(user_identifier)
 
 def remove_blocked_user(user_identifier):
-    BLOCKED_FILE = os.path.join(base_dir, "blocked_users.json")
-    blocked = get_blocked_users()
-    if user_identifier in blocked:
-        blocked.remove(user_identifier)
-        with open(BLOCKED_FILE, 'w') as f:
-            json.dump(blocked, f)
+    state_store.remove_blocked(user_identifier)
+
+# --- Applicant Search ---
+# /admin/search?q= looks up applicants by name-word or mobile prefix (see search_index.py):
+# Mongo through its indexes on the 'search' fields, the local fallback store through an
+# in-memory index that update_local_db keeps current record by record. A write the index
+# did not see (another instance, the sync, a full rewrite) makes it rebuild on next use.
+applicant_index = search_index.ApplicantIndex()
+_search_indexes_ready = False
+
+def index_local_write(touched, before, after):
+    # Runs under the store lock: 'before' is exact, so the index knows whether it missed a write
+    with applicant_index.lock:
+        if before == after:
+            return
+        if touched is not None and before is not None and applicant_index.stamp == before:
+            for app in touched:
+                applicant_index.upsert(app)
+            applicant_index.stamp = after
+        else:
+            applicant_index.stamp = None
+
+def search_local(q, pending_only=False):
+    """Local matches; pending_only drops the copies already synced (Mongo has the current ones)."""
+    stamp = state_store.applications_stamp()
+    with applicant_index.lock:
+        if stamp is None or stamp != applicant_index.stamp:
+            applicant_index.rebuild(read_local_db(), stamp)
+        results = applicant_index.search(q)
+    if pending_only:
+        pending = {str(app.get('_id')) for app in local_pending_applications()}
+        results = [item for item in results if item['application_id'] in pending]
+    if write_buffer:
+        pending = search_index.ApplicantIndex()
+        pending.rebuild(write_buffer.list_pending())
+        results = pending.search(q) + results
+    return results
+
+def search_mongo(q, fetch):
+    """(first `fetch` matches, total) from Mongo; raises when Mongo is unavailable."""
+    global _search_indexes_ready
+    query = search_index.mongo_query(q)
+    if query is None:
+        return [], 0
+    coll = mongo.db.loan_applications
+    if not _search_indexes_ready:
+        search_index.ensure_mongo_indexes(coll)
+        _search_indexes_ready = True
+    projection = {'input.Name': 1, 'input.Mobile': 1, 'status': 1, 'selected_bank': 1, 'timestamp': 1, 'legacy_id': 1}
+    docs = list(coll.find(query, projection).sort(search_index.SORT).limit(fetch))
+    results = []
+    for doc in docs:
+        item = search_index.summary(doc)
+        item['legacy_id'] = doc.get('legacy_id')
+        results.append(item)
+    return results, coll.count_documents(query)
+
+# --- In-memory Application Views ---
+# Derived structures over all applications (fraud links, columnar snapshot). Each is built
+# on first use, rebuilt when older than its interval (to pick up other instances' writes)
+# and updated from /predict and the tracked updates in between.
+_view_rebuild_lock = threading.Lock()
+
+def refresh_view(view, interval, projection=None, force=False):
+    built_at = view.built_at
+    if not force and built_at is not None and time.time() - built_at < interval:
+        return
+    with _view_rebuild_lock:
+        if view.built_at != built_at:
+            return # another request rebuilt it meanwhile
+        sources = db_application_sources(projection)
+        view.rebuild(app for source in sources for app in source)
+
+def note_application_write(app):
+    # Before the first build there is nothing to extend; the build will include it
+    views = [(fraud_graph, fraud_graph.add)]
+    if columnar_snapshot is not None:
+        views.append((columnar_snapshot, columnar_snapshot.upsert))
+    if neighbor_index is not None:
+        views.append((neighbor_index, neighbor_index.add))
+    for view, update in views:
+        if view.built_at is None:
+            continue
+        try:
+            update(app)
+        except Exception as e:
+            print(f"{type(view).__name__} update error: {e}")
+
+# Fraud links: applications sharing a mobile, a normalized name or a bucketed form
+# fingerprint, grouped with union-find (see fraud_links.py)
+app.config["FRAUD_LINK_REBUILD_INTERVAL"] = float(os.environ.get("FRAUD_LINK_REBUILD_INTERVAL", 600))
+fraud_graph = fraud_links.FraudLinkGraph()
+
+def refresh_fraud_links(force=False):
+    projection = {'input': 1, 'selected_bank': 1, 'status': 1, 'timestamp': 1, 'legacy_id': 1}
+    refresh_view(fraud_graph, app.config["FRAUD_LINK_REBUILD_INTERVAL"], projection, force)
+
+# Columnar snapshot for /admin/query (see columnar.py); created by the warmup (numpy) with
+# the categorical codes of the predictor encodings
+app.config["COLUMNAR_REBUILD_INTERVAL"] = float(os.environ.get("COLUMNAR_REBUILD_INTERVAL", 600))
+columnar_snapshot = None
+
+def create_columnar_snapshot():
+    global columnar_snapshot
+    seed = None
+    if prediction_script is not None:
+        seed = columnar.dictionaries_from_mappings(prediction_script.MAPPINGS, prediction_script.INPUT_FIELDS)
+    columnar_snapshot = columnar.ColumnarSnapshot(seed)
+
+def refresh_columnar(force=False):
+    projection = {'input': 1, 'prediction.probability': 1, 'triage.scores': 1, 'status': 1, 'selected_bank': 1,
+                  'officer_id': 1, 'fraud_flag': 1, 'timestamp': 1, 'applied_at': 1, 'decided_at': 1, 'legacy_id': 1}
+    refresh_view(columnar_snapshot, app.config["COLUMNAR_REBUILD_INTERVAL"], projection, force)
+
+# Similar past cases for /officer/similar (see neighbors.py): the officer dataset plus the
+# decided applications, encoded like officer_predict; created by the warmup
+app.config["NEIGHBOR_REBUILD_INTERVAL"] = float(os.environ.get("NEIGHBOR_REBUILD_INTERVAL", 600))
+app.config["NEIGHBOR_NPROBE"] = int(os.environ.get("NEIGHBOR_NPROBE", 8))
+neighbor_index = None
+
+def create_neighbor_index():
+    global neighbor_index
+    if officer_prediction is not None:
+        neighbor_index = neighbors.NeighborIndex(officer_prediction.encode_row, app.config["NEIGHBOR_NPROBE"],
+                                                 officer_prediction.application_input)
+
+def refresh_neighbors(force=False):
+    projection = {'input': 1, 'selected_bank': 1, 'Hidden_CIBIL': 1, 'status': 1, 'fraud_flag': 1,
+                  'triage.scores': 1, 'legacy_id': 1}
+    refresh_view(neighbor_index, app.config["NEIGHBOR_REBUILD_INTERVAL"], projection, force)
+
+# --- Admission Control ---
+# Bounded concurrency + short wait queue per prediction route, and a token bucket per client on /predict
+cpu_count = os.cpu_count() or 2
+app.config["PREDICT_MAX_CONCURRENCY"] = int(os.environ.get("PREDICT_MAX_CONCURRENCY", cpu_count))
+app.config["PREDICT_MAX_QUEUE"] = int(os.environ.get("PREDICT_MAX_QUEUE", cpu_count * 2))
+app.config["PREDICT_QUEUE_TIMEOUT"] = float(os.environ.get("PREDICT_QUEUE_TIMEOUT", 0.5))
+app.config["CLIENT_RATE"] = float(os.environ.get("CLIENT_RATE", 1.0))  # requests / second
+app.config["CLIENT_BURST"] = int(os.environ.get("CLIENT_BURST", 5))
+# Behind a reverse proxy, rate-limit on the first X-Forwarded-For address instead of the proxy's
+app.config["TRUST_PROXY"] = os.environ.get("TRUST_PROXY", "0") == "1"
+
+route_limiters = {
+    name: admission.RouteLimiter(
+        name,
+        app.config["PREDICT_MAX_CONCURRENCY"],
+        app.config["PREDICT_MAX_QUEUE"],
+        app.config["PREDICT_QUEUE_TIMEOUT"]
+    )
+    for name in ('predict', 'officer_predict')
+}
+client_limiter = admission.ClientRateLimiter(app.config["CLIENT_RATE"], app.config["CLIENT_BURST"])
+
+def user_key(inp):
+    # Applicants are identified as "Name|Mobile" (same key /admin/users and /admin/block-user use)
+    inp = inp or {}
+    return f"{inp.get('Name', 'Unknown')}|{inp.get('Mobile', 'Unknown')}"
+
+def client_key():
+    # The /predict form carries no Name/Mobile, so the caller's address is what identifies it
+    if app.config["TRUST_PROXY"] and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+def admission_controlled(route_name, per_client=False):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if per_client:
+                allowed, retry_after = client_limiter.allow(client_key())
+                if not allowed:
+                    return jsonify({'error': 'Too many requests, please retry later'}), 429, \
+                        {'Retry-After': str(retry_after)}
+
+            limiter = route_limiters[route_name]
+            if not limiter.acquire():
+                return jsonify({'error': 'Server busy, please retry shortly'}), 429, \
+                    {'Retry-After': str(limiter.retry_after())}
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                limiter.release()
+        return wrapper
+    return decorator
+
+app.config["MODEL_WAIT_TIMEOUT"] = float(os.environ.get("MODEL_WAIT_TIMEOUT", 30))
+
+def requires_models(f):
+    """
+    Holds requests that arrive during the warmup until the models are loaded (or times out with 503).
+    Goes above @admission_controlled, so waiting requests do not hold its concurrency slots.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not models_ready.wait(app.config["MODEL_WAIT_TIMEOUT"]):
+            return jsonify({'error': 'Models are still loading, retry shortly'}), 503, {'Retry-After': '5'}
+        return f(*args, **kwargs)
+    return decorated
+
+def wants_explanation():
+    # Explanation mode is opt-in per request: ?explain=1
+    return str(request.args.get('explain', '')).lower() in ('1', 'true', 'yes')
 
 # --- Admin Routes ---
 
@@ -306,49 +983,103 @@ def admin_stats():
 
 @app.route('/admin/bank-stats', methods=['GET'])
 def admin_bank_stats():
-    apps = db_get_all_applications()
+    # From the daily rollups; ?from= / ?to= limit to applications submitted / decided in the range
+    if not rollup_store:
+        return jsonify({'error': 'Rollups unavailable'}), 503
+    try:
+        start, end = rollup_range()
+        rows = rollup_store.query('bank', start, end)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     stats = {}
-    
-    for app in apps:
-        bank = app.get('selected_bank', 'Unknown')
-        if not bank: bank = 'Unknown'
-        
-        if bank not in stats:
-            stats[bank] = {'applications': 0, 'approved': 0, 'rejected': 0, 'fraud': 0}
-            
-        stats[bank]['applications'] += 1
-        status = str(app.get('status')).lower()
-        if status == 'approved':
-            stats[bank]['approved'] += 1
-        elif status == 'rejected':
-            stats[bank]['rejected'] += 1
-        elif status == 'fraud' or app.get('fraud_flag'):
-             stats[bank]['fraud'] += 1
-             
+    for bank, counts in rollups.totals(rows).items():
+        stats[bank] = {'applications': counts.get('applications', 0)}
+        for decision in rollups.DECISIONS:
+            stats[bank][decision] = counts.get(decision, 0)
     return jsonify(stats)
 
 @app.route('/admin/officer-stats', methods=['GET'])
 def admin_officer_stats():
-    # In a real app, we'd query an Officer DB.
-    # Here we'll Mock it or derive from Applications if 'officer_id' was present (it's not clearly currently).
-    # We will list officers from the directory and try to find their stats.
-    
+    # Officer decisions (POST /officer/decision) from the daily rollups, optionally ?from= / ?to=
+    if not rollup_store:
+        return jsonify({'error': 'Rollups unavailable'}), 503
+    try:
+        start, end = rollup_range()
+        per_officer = rollups.totals(rollup_store.query('officer', start, end))
+        per_bank = rollups.totals(rollup_store.query('officer_bank', start, end))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # The bank an officer decided most applications for
+    banks = {}
+    for key, counts in per_bank.items():
+        officer, bank = key.split('|', 1)
+        n = sum(counts.values())
+        if n > banks.get(officer, (None, 0))[1]:
+            banks[officer] = (bank, n)
+
     officers = []
-    if os.path.exists(officer_dir):
-        for name in os.listdir(officer_dir):
-            if os.path.isdir(os.path.join(officer_dir, name)):
-                 officers.append({
-                     'name': name,
-                     'bank': 'Assigned Bank', # Placeholder as we don't have mapping yet
-                     'processed': 0,
-                     'approved': 0,
-                     'rejected': 0,
-                     'fraud': 0
-                 })
+    for officer, counts in sorted(per_officer.items()):
+        entry = {'name': officer, 'bank': banks.get(officer, ('Unknown', 0))[0]}
+        entry.update({decision: counts.get(decision, 0) for decision in rollups.DECISIONS})
+        entry['processed'] = sum(entry[decision] for decision in rollups.DECISIONS)
+        officers.append(entry)
     return jsonify(officers)
 
+@app.route('/admin/trends', methods=['GET'])
+def admin_trends():
+    # Daily series: ?dimension=status|bank|officer&key=<bank / officer id>&from=&to=
+    if not rollup_store:
+        return jsonify({'error': 'Rollups unavailable'}), 503
+    dimension = request.args.get('dimension', 'status')
+    if dimension not in rollups.DIMENSIONS:
+        return jsonify({'error': f"dimension must be one of {', '.join(rollups.DIMENSIONS)}"}), 400
+    key = request.args.get('key')
+    try:
+        start, end = rollup_range()
+        rows = rollup_store.query(dimension, start, end, key)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'dimension': dimension,
+        'key': key,
+        'from': start,
+        'to': end,
+        'days': rollups.by_day(rows),
+        'totals': rollups.totals(rows)
+    })
+
+@app.route('/admin/rollups/rebuild', methods=['POST'])
+def admin_rollups_rebuild():
+    # Recomputes every counter from the stored (and archived) applications
+    if not rollup_store:
+        return jsonify({'error': 'Rollups unavailable'}), 503
+    try:
+        return jsonify({'success': True, 'counters': rebuild_rollups()})
+    except Exception as e:
+        print(f"Rollup rebuild error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/fraud-cases', methods=['GET'])
 def admin_fraud_cases():
+    # ?view=rings: clusters of applications linked by mobile / name / near-identical forms
+    # (&all=1 includes linked clusters not flagged as rings, &refresh=1 rebuilds first);
+    # ?view=cluster&application_id=...: the cluster one application belongs to
+    view = request.args.get('view')
+    if view in ('rings', 'cluster'):
+        try:
+            refresh_fraud_links(force=request.args.get('refresh') == '1')
+        except Exception as e:
+            print(f"Fraud link rebuild error: {e}")
+            return jsonify({'error': str(e)}), 500
+        if view == 'cluster':
+            cluster = fraud_graph.cluster_of(request.args.get('application_id'))
+            if cluster is None:
+                return jsonify({'error': 'Application not found'}), 404
+            return jsonify(cluster)
+        rings = fraud_graph.clusters(rings_only=request.args.get('all') != '1')
+        return jsonify({'stats': fraud_graph.stats(), 'rings': rings})
+
     apps = db_get_all_applications()
     frauds = [a for a in apps if str(a.get('status')).lower() == 'fraud' or a.get('fraud_flag') == True]
     return jsonify(frauds)
@@ -360,12 +1091,12 @@ def admin_users():
     blocked = set(get_blocked_users())
     
     for app in apps:
-        # Identify user by Name or Mobile? Let's use Name + Mobile as key or Input.Name
+        # Identify user by Name + Mobile (see user_key)
         inp = app.get('input', {})
         name = inp.get('Name', 'Unknown')
         mobile = inp.get('Mobile', 'Unknown')
         
-        key = f"{name}|{mobile}"
+        key = user_key(inp)
         if key not in users_map:
             users_map[key] = {
                 'name': name,
@@ -379,6 +1110,183 @@ def admin_users():
         
     return jsonify(list(users_map.values()))
 
+@app.route('/admin/search', methods=['GET'])
+def admin_search():
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({'error': 'Missing q'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = min(max(request.args.get('page_size', search_index.DEFAULT_PAGE_SIZE, type=int), 1),
+                    search_index.MAX_PAGE_SIZE)
+    start = time.perf_counter()
+    fetch = page * page_size
+
+    try:
+        remote, remote_total = search_mongo(q, fetch)
+        local = search_local(q, pending_only=True)
+    except Exception as e:
+        print(f"Mongo search unavailable, local results only: {e}")
+        remote, remote_total = [], 0
+        local = search_local(q)
+
+    # Local (unsynced) copies first; a synced record carries its local id as legacy_id
+    merged, seen = [], set()
+    for item in local + remote:
+        item = dict(item)
+        rid = str(item.pop('legacy_id', None) or item['application_id'])
+        if rid not in seen:
+            seen.add(rid)
+            merged.append(item)
+    overlap = len(local) + len(remote) - len(merged)
+    merged.sort(key=search_index.sort_key)
+
+    results = merged[fetch - page_size:fetch]
+    for item in results:
+        inp = {k: v for k, v in (('Name', item.get('name')), ('Mobile', item.get('mobile'))) if v is not None}
+        item['is_blocked'] = state_store.is_blocked(user_key(inp))
+    return jsonify({
+        'query': q,
+        'page': page,
+        'page_size': page_size,
+        'total': len(local) + remote_total - overlap,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        'results': results
+    })
+
+def query_args():
+    """
+    GET form of an /admin/query body: column=value, column__op=value (in: comma separated),
+    group_by=a,b, agg=loanAmount:mean,age:max, limit=N
+    """
+    where, body = {}, {}
+    for arg, value in request.args.items():
+        if arg in ('refresh', 'describe'):
+            continue
+        if arg == 'group_by':
+            body['group_by'] = [c for c in value.split(',') if c]
+        elif arg == 'agg':
+            body['agg'] = dict(item.split(':', 1) for item in value.split(',') if ':' in item)
+        elif arg == 'limit':
+            body['limit'] = int(value)
+        else:
+            column, _, op = arg.partition('__')
+            where.setdefault(column, {})[op or 'eq'] = value.split(',') if op == 'in' else value
+    body['where'] = where
+    return body
+
+@app.route('/admin/query', methods=['GET', 'POST'])
+@requires_models
+def admin_query():
+    # Filter / group-by / count over the columnar snapshot (see columnar.py), e.g.
+    #   /admin/query?selfEmployed=Yes&area=Semiurban&existingEmi__gt=5000&status=rejected
+    #       &selected_bank=State Bank of India (SBI)&decided_at__gte=2026-10-12&group_by=officer_id
+    # POST takes the same as JSON: {"where": {...}, "group_by": [...], "agg": {...}, "limit": N}
+    if columnar_snapshot is None:
+        return jsonify({'error': 'Columnar snapshot unavailable'}), 500
+    try:
+        refresh_columnar(force=request.args.get('refresh') == '1')
+    except Exception as e:
+        print(f"Columnar snapshot rebuild error: {e}")
+        return jsonify({'error': str(e)}), 500
+    if request.args.get('describe') == '1':
+        return jsonify(columnar_snapshot.describe())
+
+    try:
+        body = request.get_json() if request.method == 'POST' else query_args()
+        if not isinstance(body, dict):
+            raise columnar.QueryError("expected a JSON object")
+        result = columnar_snapshot.query(body.get('where'), body.get('group_by'), body.get('agg'),
+                                         int(body.get('limit') or 0))
+    except (columnar.QueryError, ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    result['rows'] = len(columnar_snapshot)
+    return jsonify(result)
+
+@app.route('/admin/drift', methods=['GET'])
+def admin_drift():
+    # PSI and live vs. training quantiles per feature; ?refresh=1 skips the cached report
+    force = str(request.args.get('refresh', '')).lower() in ('1', 'true', 'yes')
+    report = {}
+    if user_drift:
+        report['user'] = user_drift.report(force)
+    if officer_drift:
+        report['officer'] = officer_drift.report(force)
+    return jsonify(report)
+
+@app.route('/admin/drift/reset', methods=['POST'])
+def admin_drift_reset():
+    for monitor in (user_drift, officer_drift):
+        if monitor:
+            monitor.reset()
+    return jsonify({'success': True})
+
+@app.route('/admin/admission', methods=['GET'])
+def admin_admission():
+    # Concurrency / queue-time metrics per prediction route and per-client limiting counters
+    return jsonify({
+        'routes': {name: limiter.stats() for name, limiter in route_limiters.items()},
+        'clients': client_limiter.stats()
+    })
+
+@app.route('/admin/write-behind', methods=['GET'])
+def admin_write_behind():
+    if not write_buffer:
+        return jsonify({'enabled': False})
+    stats = write_buffer.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/admin/inference', methods=['GET'])
+def admin_inference():
+    if not model_pool:
+        return jsonify({'enabled': False})
+    stats = model_pool.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/admin/startup', methods=['GET'])
+def admin_startup():
+    report = profile.report()
+    report['ready'] = models_ready.is_set()
+    report['mongo'] = mongo_status
+    return jsonify(report)
+
+@app.route('/admin/sync', methods=['GET', 'POST'])
+def admin_sync():
+    # GET: reconciler status; POST: run a pass now
+    if not reconciler:
+        return jsonify({'enabled': False})
+    if request.method == 'POST':
+        try:
+            return jsonify({'success': True, 'result': reconciler.run_once()})
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
+    stats = reconciler.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/admin/cascade', methods=['GET'])
+@requires_models
+def admin_cascade():
+    if not officer_prediction:
+        return jsonify({'error': 'Officer model not loaded'}), 500
+    return jsonify(officer_prediction.cascade_stats())
+
+@app.route('/admin/shadow', methods=['GET'])
+def admin_shadow():
+    scorers = {'user_approval': user_shadow, 'officer_approval': officer_shadow}
+    return jsonify({
+        name: dict(scorer.stats(), enabled=True) if scorer else {'enabled': False}
+        for name, scorer in scorers.items()
+    })
+
+@app.route('/admin/shadow/reset', methods=['POST'])
+def admin_shadow_reset():
+    for scorer in (user_shadow, officer_shadow):
+        if scorer:
+            scorer.reset()
+    return jsonify({'success': True})
+
 @app.route('/admin/block-user', methods=['POST'])
 def admin_block_user():
     data = request.get_json()
@@ -393,6 +1301,8 @@ def admin_block_user():
     return jsonify({'success': True})
 
 @app.route('/predict', methods=['POST'])
+@requires_models
+@admission_controlled('predict', per_client=True)
 def predict():
     if not approval_model:
         return jsonify({'error': 'Models not loaded'}), 500
@@ -401,14 +1311,24 @@ def predict():
         data = request.get_json()
         print("Received prediction request:", data)
         
+        # ?explain=1 adds per-feature contributions (why approved / rejected)
         result = prediction_script.predict(
             data, 
             approval_model, 
             bank_model, 
             bank_encoder, 
-            approval_features
+            approval_features,
+            explain=wants_explanation()
         )
         
+        if user_drift:
+            try:
+                user_drift.observe(prediction_script.encode_row(data, user_drift.features))
+            except Exception as drift_err:
+                print(f"Drift monitor error: {drift_err}")
+        
+        shadow_after_response(user_shadow, lambda: [prediction_script.encode_row(data, user_shadow.features)])
+        
         # Save using Helper
         try:
             record = {
@@ -416,11 +1336,17 @@ def predict():
                 'prediction': result,
                 'status': 'predicted',
                 'selected_bank': None,
-                'timestamp': pd.Timestamp.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'input_hash': idempotency.input_fingerprint(data),
+                'search': search_index.search_fields(data)
             }
-            # Use abstracted insert
-            app_id = db_insert_application(record)
+            # Use abstracted insert (or upsert on the input hash in idempotent mode)
+            if app.config["IDEMPOTENT_PREDICT"]:
+                app_id = db_upsert_application(record, app.config["IDEMPOTENCY_WINDOW"])
+            else:
+                app_id = db_insert_application(record)
             result['application_id'] = app_id
+            note_application_write(dict(record, _id=app_id))
             print(f"Saved prediction with ID: {app_id}")
         except Exception as db_err:
             print(f"DB Error (Prediction not saved): {db_err}")
@@ -450,7 +1376,7 @@ def apply_for_loan():
         update_fields = {
             'selected_bank': bank_name,
             'status': 'applied',
-            'applied_at': pd.Timestamp.now().isoformat()
+            'applied_at': datetime.now().isoformat()
         }
         
         # Add contact info to input section (or top level, but input is where user data lives)
@@ -459,8 +1385,8 @@ def apply_for_loan():
         if applicant_mobile:
             update_fields['input.Mobile'] = applicant_mobile
             
-        # Update DB using Helper
-        success = db_update_application(app_id, update_fields)
+        # Update DB using Helper (and the bank / status rollups)
+        success = db_update_application_tracked(app_id, update_fields)
         
         if success:
             return jsonify({'success': True, 'message': f'Application submitted for {bank_name}'})
@@ -473,7 +1399,13 @@ def apply_for_loan():
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'online', 'models_loaded': approval_model is not None})
+    # Answers as soon as the server is up; 'ready' turns true once the warmup has finished
+    return jsonify({
+        'status': 'online',
+        'ready': models_ready.is_set(),
+        'models_loaded': approval_model is not None,
+        'mongo': mongo_status
+    })
 
 @app.route('/applications', methods=['GET'])
 def get_applications():
@@ -507,6 +1439,8 @@ def get_application_details(app_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/officer_predict', methods=['POST'])
+@requires_models
+@admission_controlled('officer_predict')
 def officer_predict_endpoint():
     if not officer_prediction:
         return jsonify({'error': 'Officer prediction module not loaded'}), 500
@@ -515,9 +1449,22 @@ def officer_predict_endpoint():
         data = request.get_json()
         print("Received officer prediction request:", data)
         
-        # Officer prediction does not depend on the global 'load_models' for ML model folder
-        # It handles its own loading internally in prediction.py
-        result = officer_prediction.officer_predict(data)
+        # Officer models are loaded by the warmup (or lazily by prediction.py itself)
+        # A list of applications is scored in one batched pass
+        if isinstance(data, list):
+            result = officer_prediction.officer_predict_batch(data, explain=wants_explanation())
+        else:
+            result = officer_prediction.officer_predict(data, explain=wants_explanation())
+        
+        if officer_drift:
+            try:
+                for item in (data if isinstance(data, list) else [data]):
+                    officer_drift.observe(officer_prediction.encode_row(item))
+            except Exception as drift_err:
+                print(f"Drift monitor error: {drift_err}")
+        
+        shadow_after_response(officer_shadow, lambda: [
+            officer_prediction.encode_row(item) for item in (data if isinstance(data, list) else [data])])
         
         print("Officer prediction result:", result)
         return jsonify(result)
@@ -526,7 +1473,278 @@ def officer_predict_endpoint():
         print(f"Error during officer prediction: {e}")
         return jsonify({'error': str(e)}), 500
 
+# --- Officer Queue Triage ---
+# /officer/triage scores a bank's pending queue in one batched pass and returns it riskiest
+# first. Scores are stored on the application under 'triage' with the officer model cache key
+# (model versions + encoded inputs), so unchanged applications are not scored again.
+
+def db_save_triage_scores(updates):
+    """updates: {application_id: triage dict}; one bulk write per store."""
+    if not updates:
+        return
+    try:
+        from pymongo import UpdateOne
+        mongo.db.loan_applications.bulk_write(
+            [UpdateOne(sync.id_query(app_id), {'$set': {'triage': triage}}) for app_id, triage in updates.items()],
+            ordered=False)
+    except Exception as e:
+        print(f"Mongo triage save skipped: {e}")
+
+    def save_local(apps):
+        changed = False
+        for app in apps:
+            triage = updates.get(str(app.get('_id')))
+            if triage is not None:
+                app['triage'] = triage
+                changed = True
+        return None, changed
+    try:
+        update_local_db(save_local)
+    except Exception as e:
+        print(f"Local triage save error: {e}")
+
+def triage_sort_key(item):
+    # Most likely fraud first, then the approvals closest to the 0.5 threshold
+    return (-item['fraud_probability'], item['approval_margin'])
+
+@app.route('/officer/triage', methods=['GET'])
+@requires_models
+@admission_controlled('officer_predict')
+def officer_triage():
+    if not officer_prediction:
+        return jsonify({'error': 'Officer prediction module not loaded'}), 500
+    try:
+        start = time.perf_counter()
+        bank_name = request.args.get('bank')
+        status = request.args.get('status', 'applied')
+        limit = request.args.get('limit', type=int)
+
+        apps = db_get_applications(bank_name, status=status, limit=None)
+        # Scored like the officer review screen: Approved_Bank from the selected bank plus the
+        # stored CIBIL; both are part of the encoded row, hence of the score key
+        inputs = [officer_prediction.application_input(app) for app in apps]
+        keys = officer_prediction.score_keys([officer_prediction.encode_row(data) for data in inputs])
+
+        # Reuse stored scores whose key still matches; score the rest in one batch
+        scores = [None] * len(apps)
+        todo = []
+        for i, (app, key) in enumerate(zip(apps, keys)):
+            stored = app.get('triage')
+            if isinstance(stored, dict) and stored.get('key') == key:
+                scores[i] = stored['scores']
+            else:
+                todo.append(i)
+        if todo:
+            computed = officer_prediction.officer_predict_batch([inputs[i] for i in todo], proba=True)
+            scored_at = datetime.now().isoformat()
+            updates = {}
+            for i, result in zip(todo, computed):
+                scores[i] = result
+                if 'Fraud_Probability' in result:
+                    updates[str(apps[i]['_id'])] = {'key': keys[i], 'scores': result, 'scored_at': scored_at}
+            run_after_response(lambda: db_save_triage_scores(updates))
+
+        rescored = set(todo)
+        queue = []
+        for i, (app, result) in enumerate(zip(apps, scores)):
+            approval = float(result.get('Officer_Approval_Probability', result.get('Officer_Approved_Model', 0)))
+            data = inputs[i]
+            queue.append({
+                'application_id': str(app.get('_id')),
+                'name': data.get('Name'),
+                'mobile': data.get('Mobile'),
+                'loan_amount': data.get('loanAmount'),
+                'selected_bank': app.get('selected_bank'),
+                'status': app.get('status'),
+                'timestamp': app.get('timestamp'),
+                'fraud_probability': float(result.get('Fraud_Probability', result.get('Fraud_Label_Model', 0))),
+                'approval_probability': approval,
+                'approval_margin': round(abs(approval - 0.5), 4),
+                'scores': result,
+                'reused': i not in rescored
+            })
+        queue.sort(key=triage_sort_key)
+        if limit:
+            queue = queue[:limit]
+
+        return jsonify({
+            'bank': bank_name,
+            'status': status,
+            'total': len(apps),
+            'scored': len(todo),
+            'reused': len(apps) - len(todo),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+            'queue': queue
+        })
+    except Exception as e:
+        print(f"Error during triage: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/officer/similar', methods=['GET', 'POST'])
+@requires_models
+def officer_similar():
+    # Most similar past cases and their outcomes:
+    #   GET  /officer/similar?application_id=...&k=10   (a stored application)
+    #   POST /officer/similar?k=10  with the application input as JSON
+    # &exact=1 scans every case instead of the closest index cells
+    if neighbor_index is None:
+        return jsonify({'error': 'Officer prediction module not loaded'}), 500
+    try:
+        start = time.perf_counter()
+        k = min(max(request.args.get('k', neighbors.DEFAULT_K, type=int), 1), neighbors.MAX_K)
+        app_id = request.args.get('application_id')
+        if request.method == 'POST':
+            data = request.get_json() or {}
+        elif app_id:
+            application = db_get_application(app_id)
+            if application is None:
+                return jsonify({'error': 'Application not found'}), 404
+            data = officer_prediction.application_input(application)
+            app_id = str(application.get('legacy_id') or application.get('_id'))
+        else:
+            return jsonify({'error': 'Missing application_id'}), 400
+
+        refresh_neighbors(force=request.args.get('refresh') == '1')
+        found = neighbor_index.search(data, k, exclude=app_id, exact=request.args.get('exact') == '1')
+        return jsonify({
+            'application_id': app_id,
+            'k': k,
+            'summary': neighbors.summarize(found),
+            'neighbors': found,
+            'index': neighbor_index.stats(),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+        })
+    except Exception as e:
+        print(f"Error during similar-case lookup: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/officer/decision', methods=['POST'])
+def officer_decision():
+    # Records an officer's decision on an application: approved / rejected / fraud
+    try:
+        data = request.get_json() or {}
+        app_id = data.get('application_id')
+        officer_id = data.get('officer_id')
+        decision = str(data.get('decision', '')).lower()
+
+        if not app_id or not officer_id:
+            return jsonify({'error': 'Missing application_id or officer_id'}), 400
+        if decision not in rollups.DECISIONS:
+            return jsonify({'error': f"decision must be one of {', '.join(rollups.DECISIONS)}"}), 400
+
+        update_fields = {
+            'status': decision.capitalize(),
+            'officer_id': str(officer_id),
+            'decided_at': datetime.now().isoformat(),
+            'fraud_flag': decision == 'fraud'
+        }
+        if data.get('notes'):
+            update_fields['officer_notes'] = data.get('notes')
+
+        if db_update_application_tracked(app_id, update_fields):
+            return jsonify({'success': True, 'status': update_fields['status'], 'decided_at': update_fields['decided_at']})
+        return jsonify({'success': False, 'message': 'Application not found or update failed'}), 404
+
+    except Exception as e:
+        print(f"Error recording officer decision: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# --- Startup ---
+# The heavy imports and model loads run on a warmup thread and Mongo is checked on another,
+# so importing app.py (and the first /health) does not wait for either. /predict and
+# /officer_predict wait up to MODEL_WAIT_TIMEOUT seconds for the warmup, then answer 503.
+models_ready = threading.Event()
+warmup_error = None
+
+def warm_up():
+    global prediction_script, officer_prediction, compact_model, inference_pool, shadow, columnar, neighbors
+    global warmup_error
+    try:
+        # The third-party libraries first, so each is timed on its own
+        for module in ('numpy', 'pandas', 'joblib', 'xgboost'):
+            try:
+                profile.timed_import(module)
+            except ImportError as e:
+                print(f"Warning: could not import {module}: {e}")
+        try:
+            prediction_script = profile.timed_import('prediction_script')
+        except ImportError as e:
+            print(f"Error importing prediction_script: {e}")
+        try:
+            officer_prediction = profile.timed_import('prediction')
+        except ImportError as e:
+            print(f"Error importing officer prediction module: {e}")
+        try:
+            compact_model = profile.timed_import('compact_model')
+        except ImportError as e:
+            print(f"Compact model support unavailable: {e}")
+        load_models()
+    except Exception as e:
+        warmup_error = str(e)
+        print(f"CRITICAL ERROR: Warmup failed: {e}")
+
+    # Optional features after the models, each on its own: a failure disables that feature only
+    if app.config["INFERENCE_WORKERS"] > 0:
+        try:
+            inference_pool = profile.timed_import('inference_pool')
+            with profile.step('inference pool', 'init'):
+                init_inference_pool()
+        except Exception as e:
+            print(f"Inference pool unavailable, scoring in-process: {e}")
+    try:
+        with profile.step('drift monitors', 'init'):
+            init_drift_monitors()
+    except Exception as e:
+        print(f"Drift monitors unavailable: {e}")
+    try:
+        shadow = profile.timed_import('shadow')
+        with profile.step('shadow scorers', 'init'):
+            init_shadow_scorers()
+    except Exception as e:
+        print(f"Shadow scoring unavailable: {e}")
+    try:
+        attach_shared_caches()
+    except Exception as e:
+        print(f"Shared prediction cache unavailable: {e}")
+    try:
+        columnar = profile.timed_import('columnar')
+        create_columnar_snapshot()
+    except Exception as e:
+        print(f"Columnar snapshot unavailable: {e}")
+    try:
+        neighbors = profile.timed_import('neighbors')
+        create_neighbor_index()
+    except Exception as e:
+        print(f"Similar-case index unavailable: {e}")
+    profile.mark_ready()
+    models_ready.set()
+
+def start_warmup():
+    start_reconciler()
+    threading.Thread(target=check_mongo_connection, name="mongo-check", daemon=True).start()
+    threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+def is_reloader_parent():
+    # `python app.py` runs with the debug reloader: this process only watches the files and
+    # re-runs app.py in a child (WERKZEUG_RUN_MAIN=true) that serves, so threads started
+    # here would load the models, sync and check Mongo a second time for nothing
+    return (__name__ == '__main__' and '--profile-startup' not in sys.argv
+            and os.environ.get('WERKZEUG_RUN_MAIN') != 'true')
+
+# WARMUP_ON_IMPORT=0 leaves start_warmup() (or a synchronous warm_up()) to whoever imports
+# app.py, e.g. the tests, which point the stores elsewhere first
+app.config["WARMUP_ON_IMPORT"] = os.environ.get("WARMUP_ON_IMPORT", "1") == "1"
+
+profile.mark_serving()
+if app.config["WARMUP_ON_IMPORT"] and not is_reloader_parent():
+    start_warmup()
+
 if __name__ == '__main__':
-    load_models()
+    if '--profile-startup' in sys.argv:
+        # Report where the startup time goes (imports / artifacts / init) and exit
+        models_ready.wait()
+        print(profile.format())
+        print(f"MongoDB: {mongo_status}")
+        sys.exit(0)
     # Run on Port 5000
     app.run(debug=True, host='0.0.0.0', port=5000)
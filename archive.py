@@ -0,0 +1,368 @@
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import state_backend
+
+# Hot/cold archival for loan applications.
+# Applications that are old, or in a terminal status for a while, move out of
+# loan_applications / local_applications.json into a compressed cold store:
+#   - files: NDJSON segments (gzip, or zstd when the 'zstandard' package is installed)
+#     under archive/, with index.log (append-only) mapping application id -> segment
+#   - mongo: the loan_applications_archive collection
+# A run copies a batch to the cold store first and only then deletes it from the hot
+# store, so an interrupted run is simply resumed by running again.
+#
+#   python archive.py run --max-age-days 180 --terminal-age-days 30
+#   python archive.py get <application_id>
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.path.join(base_dir, "archive")
+MONGO_URI = "mongodb://localhost:27017/loan_db"
+
+TERMINAL_STATUSES = {'approved', 'rejected', 'fraud'}
+DEFAULT_MAX_AGE_DAYS = 180
+DEFAULT_TERMINAL_AGE_DAYS = 30
+DEFAULT_BATCH = 1000
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def last_activity(app):
+    """Most recent of the application's timestamps (creation, apply, decision)."""
+    latest = None
+    for field in ('timestamp', 'applied_at', 'decided_at'):
+        try:
+            ts = datetime.fromisoformat(str(app.get(field)))
+        except (TypeError, ValueError):
+            continue
+        if latest is None or ts > latest:
+            latest = ts
+    return latest
+
+
+def is_archivable(app, now, max_age_days, terminal_age_days):
+    ts = last_activity(app)
+    if ts is None:
+        return False
+    age = now - ts
+    if age > timedelta(days=max_age_days):
+        return True
+    status = str(app.get('status', '')).lower()
+    return status in TERMINAL_STATUSES and age > timedelta(days=terminal_age_days)
+
+
+class FileArchive:
+    """Compressed NDJSON segments (each written atomically) plus an append-only id -> segment log."""
+
+    def __init__(self, directory=ARCHIVE_DIR, compression='gzip'):
+        if compression == 'zstd' and zstandard is None:
+            print("zstandard is not installed, archiving with gzip")
+            compression = 'gzip'
+        self.directory = directory
+        self.compression = compression
+        self.index_file = os.path.join(directory, "index.log")
+        self.legacy_index_file = os.path.join(directory, "index.json")
+        self._index = None
+        self._index_ino = None
+        self._index_offset = 0
+        self._lock = threading.Lock()
+
+    # --- Index ---
+
+    def _load_index(self):
+        # index.log only grows, so only the lines appended since the last call (by this or
+        # another process, e.g. the archival command) are read
+        try:
+            st = os.stat(self.index_file)
+        except OSError:
+            st = None
+        ino = st.st_ino if st else None
+        if self._index is None or ino != self._index_ino or (st and st.st_size < self._index_offset):
+            self._index, self._index_ino, self._index_offset = self._load_legacy_index(), ino, 0
+        if st and st.st_size > self._index_offset:
+            with open(self.index_file, 'rb') as f:
+                f.seek(self._index_offset)
+                chunk = f.read()
+            end = chunk.rfind(b"\n") + 1  # a line still being written is picked up next time
+            for line in chunk[:end].splitlines():
+                try:
+                    app_id, segment = json.loads(line)
+                except ValueError:
+                    continue  # torn line left by a crash mid-append
+                self._index[app_id] = segment
+            self._index_offset += end
+        return self._index
+
+    def _load_legacy_index(self):
+        # Archives written before index.log kept the whole map in index.json
+        if not os.path.exists(self.legacy_index_file):
+            return {}
+        with open(self.legacy_index_file, 'r') as f:
+            return json.load(f)
+
+    def contains(self, app_id):
+        with self._lock:
+            return str(app_id) in self._load_index()
+
+    def contains_many(self, app_ids):
+        """The ids (as strings) among app_ids that are already archived."""
+        with self._lock:
+            index = self._load_index()
+            return {str(i) for i in app_ids if str(i) in index}
+
+    def count(self):
+        with self._lock:
+            return len(self._load_index())
+
+    # --- Segments ---
+
+    def _open(self, path, mode):
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            if 'w' in mode:
+                return zstandard.open(path, mode)
+            return zstandard.open(path, 'rt')
+        return gzip.open(path, mode)
+
+    def write(self, records):
+        """Appends the records not archived yet as one new segment. Returns how many were written."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            index = self._load_index()
+            new = [r for r in records if str(r.get('_id')) not in index]
+            if not new:
+                return 0
+            ext = '.ndjson.zst' if self.compression == 'zstd' else '.ndjson.gz'
+            name = f"segment-{int(time.time() * 1000)}-{len(index):08d}{ext}"
+            path = os.path.join(self.directory, name)
+            with self._open(path + '.tmp', 'wt') as f:
+                for rec in new:
+                    f.write(json.dumps(rec, default=str) + "\n")
+            os.replace(path + '.tmp', path)
+
+            # Start on a fresh line if a crashed run left a torn one at the end
+            torn = os.path.exists(self.index_file) and os.path.getsize(self.index_file) > self._index_offset
+            with open(self.index_file, 'a') as f:
+                f.write("\n" if torn else "")
+                f.write("".join(json.dumps([str(rec.get('_id')), name]) + "\n" for rec in new))
+                f.flush()
+                os.fsync(f.fileno())
+            self._load_index()
+            return len(new)
+
+    def get(self, app_id):
+        app_id = str(app_id)
+        with self._lock:
+            segment = self._load_index().get(app_id)
+        if not segment:
+            return None
+        needle = json.dumps(app_id)
+        with self._open(os.path.join(self.directory, segment), 'rt') as f:
+            for line in f:
+                if needle in line:
+                    rec = json.loads(line)
+                    if str(rec.get('_id')) == app_id:
+                        rec['archived'] = True
+                        return rec
+        return None
+
+    def iter_records(self):
+        """Every archived application, segment by segment (used to rebuild rollups)."""
+        with self._lock:
+            segments = sorted(set(self._load_index().values()))
+        for segment in segments:
+            with self._open(os.path.join(self.directory, segment), 'rt') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+class MongoArchive:
+    """Cold store in a separate collection; writes are idempotent upserts by _id."""
+
+    def __init__(self, get_db):
+        self.get_db = get_db
+
+    @property
+    def collection(self):
+        return self.get_db().loan_applications_archive
+
+    def contains(self, app_id):
+        return self.get(app_id) is not None
+
+    def contains_many(self, app_ids):
+        """The ids (as strings) among app_ids that are already archived, in one query."""
+        from bson.objectid import ObjectId
+        keys = []
+        for app_id in app_ids:
+            keys.append(str(app_id))
+            if ObjectId.is_valid(str(app_id)):
+                keys.append(ObjectId(str(app_id)))
+        return {str(d['_id']) for d in self.collection.find({'_id': {'$in': keys}}, {'_id': 1})}
+
+    def count(self):
+        return self.collection.estimated_document_count()
+
+    def write(self, records):
+        from pymongo import ReplaceOne
+        if not records:
+            return 0
+        self.collection.bulk_write([ReplaceOne({'_id': r['_id']}, r, upsert=True) for r in records], ordered=False)
+        return len(records)
+
+    def get(self, app_id):
+        from bson.objectid import ObjectId
+        keys = [str(app_id)]
+        if ObjectId.is_valid(str(app_id)):
+            keys.insert(0, ObjectId(str(app_id)))
+        doc = self.collection.find_one({'_id': {'$in': keys}})
+        if doc:
+            doc['_id'] = str(doc['_id'])
+            doc['archived'] = True
+        return doc
+
+    def iter_records(self):
+        for doc in self.collection.find():
+            doc['_id'] = str(doc['_id'])
+            yield doc
+
+
+def open_archive(target='files', directory=ARCHIVE_DIR, compression='gzip', get_db=None):
+    if target == 'mongo':
+        return MongoArchive(get_db)
+    return FileArchive(directory, compression)
+
+
+# --- Archival run ---
+
+def _inactive_since(cutoff):
+    """Mongo filter: created before cutoff and not applied / decided since (see last_activity)."""
+    return {'$and': [{'timestamp': {'$lt': cutoff}}] + [
+        {'$or': [{field: None}, {field: {'$lt': cutoff}}]} for field in ('applied_at', 'decided_at')
+    ]}
+
+
+def archivable_query(now, max_age_days, terminal_age_days):
+    """is_archivable() as a Mongo filter, so the selection happens in the database."""
+    max_cutoff = (now - timedelta(days=max_age_days)).isoformat()
+    terminal_cutoff = (now - timedelta(days=terminal_age_days)).isoformat()
+    terminal = [s for status in TERMINAL_STATUSES for s in (status, status.capitalize(), status.upper())]
+    return {'$or': [
+        _inactive_since(max_cutoff),
+        {'$and': [{'status': {'$in': terminal}}, _inactive_since(terminal_cutoff)]}
+    ]}
+
+
+def archive_mongo(coll, cold, now, max_age_days, terminal_age_days, batch_size=DEFAULT_BATCH):
+    """
+    Moves archivable documents out of the hot collection batch by batch (copy, then delete).
+    Pages by _id over the raw query results; a page is only the last one when Mongo returned
+    fewer than batch_size documents, whatever the re-check in Python keeps of it.
+    """
+    query = archivable_query(now, max_age_days, terminal_age_days)
+    moved = 0
+    last_id = None
+    while True:
+        page_query = query if last_id is None else {'$and': [query, {'_id': {'$gt': last_id}}]}
+        page = list(coll.find(page_query).sort('_id', 1).limit(batch_size))
+        if not page:
+            break
+        last_id = page[-1]['_id']
+        batch = [d for d in page if is_archivable(d, now, max_age_days, terminal_age_days)]
+        if batch:
+            cold.write(batch)
+            coll.delete_many({'_id': {'$in': [d['_id'] for d in batch]}})
+            moved += len(batch)
+        if len(page) < batch_size:
+            break
+    return moved
+
+
+def archive_local(backend, cold, now, max_age_days, terminal_age_days, batch_size=DEFAULT_BATCH):
+    """
+    Same for the fallback store (local_applications.json or Redis), as one read-modify-write
+    under the state backend's lock so concurrent app writes are not lost.
+    """
+    def move(apps):
+        # Records archived by an interrupted earlier run are dropped from the hot store too
+        ids = [a.get('_id') for a in apps]
+        done = set()
+        for i in range(0, len(ids), batch_size):
+            done |= cold.contains_many(ids[i:i + batch_size])
+        todo = [a for a in apps if str(a.get('_id')) not in done
+                and is_archivable(a, now, max_age_days, terminal_age_days)]
+        for i in range(0, len(todo), batch_size):
+            batch = todo[i:i + batch_size]
+            cold.write(batch)
+            done.update(str(a.get('_id')) for a in batch)
+        if done:
+            apps[:] = [a for a in apps if str(a.get('_id')) not in done]
+        return len(done), bool(done)
+
+    return backend.update_applications(move)
+
+
+def run_archival(cold, mongo_coll=None, backend=None, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 terminal_age_days=DEFAULT_TERMINAL_AGE_DAYS, batch_size=DEFAULT_BATCH):
+    if backend is None:
+        backend = state_backend.FileStateBackend()
+    now = datetime.now()
+    moved = {'local': archive_local(backend, cold, now, max_age_days, terminal_age_days, batch_size)}
+    if mongo_coll is not None:
+        moved['mongo'] = archive_mongo(mongo_coll, cold, now, max_age_days, terminal_age_days, batch_size)
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old / terminal applications to compressed cold storage.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run')
+    run.add_argument('--max-age-days', type=int, default=DEFAULT_MAX_AGE_DAYS)
+    run.add_argument('--terminal-age-days', type=int, default=DEFAULT_TERMINAL_AGE_DAYS)
+    run.add_argument('--batch-size', type=int, default=DEFAULT_BATCH)
+    run.add_argument('--skip-mongo', action='store_true')
+    get = sub.add_parser('get')
+    get.add_argument('app_id')
+    for p in (run, get):
+        p.add_argument('--target', choices=['files', 'mongo'], default='files')
+        p.add_argument('--compression', choices=['gzip', 'zstd'], default='gzip')
+        p.add_argument('--mongo-uri', default=MONGO_URI)
+        p.add_argument('--dir', default=ARCHIVE_DIR)
+    run.add_argument('--state-backend', choices=['file', 'redis'], default='file')
+    run.add_argument('--redis-url', default=None)
+    args = parser.parse_args()
+
+    client = None
+    if args.target == 'mongo' or (args.command == 'run' and not args.skip_mongo):
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    cold = open_archive(args.target, args.dir, args.compression,
+                        get_db=(lambda: client.get_default_database()) if client else None)
+
+    if args.command == 'get':
+        print(json.dumps(cold.get(args.app_id), indent=2, default=str))
+        return
+
+    hot = None
+    if client is not None and not args.skip_mongo:
+        try:
+            client.server_info()
+            hot = client.get_default_database().loan_applications
+        except Exception as e:
+            print(f"MongoDB unavailable, archiving local_applications.json only: {e}")
+    backend = state_backend.open_backend(args.state_backend, args.redis_url)
+    moved = run_archival(cold, hot, backend, args.max_age_days, args.terminal_age_days, args.batch_size)
+    print(f"Archived: {moved}")
+
+
+if __name__ == '__main__':
+    main()
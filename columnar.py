@@ -0,0 +1,345 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# In-memory columnar snapshot of the applications for ad hoc admin queries.
+# One NumPy array per field: numbers as float64 (NaN = missing), timestamps as epoch seconds,
+# categoricals dictionary-encoded as int32 codes (-1 = missing). The form fields start from
+# the predictors' label encodings (prediction_script.MAPPINGS), other values get the next
+# free code. A filter is a boolean mask per condition, ANDed; group-by counts are a bincount
+# over the combined codes of the group columns. Rows are keyed by application id,
+# so an insert appends and an update overwrites its row in place.
+#
+#   where:    {"selfEmployed": "Yes", "area": ["Semiurban", "Urban"],
+#              "existingEmi": {"gt": 5000}, "decided_at": {"gte": "2026-10-12"}}
+#   group_by: ["selected_bank", "status"]
+#   agg:      {"loanAmount": "mean"}
+
+NUMERIC = {
+    # column -> path in the application document
+    'age': ('input', 'age'),
+    'experience': ('input', 'experience'),
+    'applicantIncome': ('input', 'applicantIncome'),
+    'coApplicantIncome': ('input', 'coApplicantIncome'),
+    'existingEmi': ('input', 'existingEmi'),
+    'loanAmount': ('input', 'loanAmount'),
+    'tenure': ('input', 'tenure'),
+    'probability': ('prediction', 'probability'),
+    'officer_approval_probability': ('triage', 'scores', 'Officer_Approval_Probability'),
+    'fraud_probability': ('triage', 'scores', 'Fraud_Probability')
+}
+TIMES = ('timestamp', 'applied_at', 'decided_at')
+CATEGORICAL = {
+    'gender': ('input', 'gender'),
+    'maritalStatus': ('input', 'maritalStatus'),
+    'dependents': ('input', 'dependents'),
+    'education': ('input', 'education'),
+    'selfEmployed': ('input', 'selfEmployed'),
+    'area': ('input', 'area'),
+    'salaryMode': ('input', 'salaryMode'),
+    'assets': ('input', 'assets'),
+    'loanPurpose': ('input', 'loanPurpose'),
+    'status': ('status',),
+    'selected_bank': ('selected_bank',),
+    'officer_id': ('officer_id',),
+    'fraud_flag': ('fraud_flag',)
+}
+OPERATORS = ('eq', 'ne', 'in', 'gt', 'gte', 'lt', 'lte')
+AGGREGATES = ('sum', 'mean', 'min', 'max')
+INITIAL_CAPACITY = 1024
+
+
+class QueryError(ValueError):
+    pass
+
+
+def dictionaries_from_mappings(mappings, input_fields):
+    """Seed codes from the predictor encodings: {'gender': {'Female': 0, ...}, ...}."""
+    out = {}
+    for feature, codes in mappings.items():
+        key = input_fields.get(feature, (None,))[0]
+        if key in CATEGORICAL:
+            out[key] = dict(codes)
+    return out
+
+
+def _get(doc, path):
+    for part in path:
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _number(value):
+    if value is None or isinstance(value, bool):
+        return np.nan
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _epoch(value):
+    """ISO string / datetime -> epoch seconds (NaN when missing)."""
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not hasattr(value, 'timestamp'):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return np.nan
+    return value.timestamp()
+
+
+def _label(column, value):
+    if value is None or value == '':
+        return None
+    if column == 'status':
+        return str(value).strip().lower()
+    if column == 'fraud_flag':
+        return 'true' if value is True or str(value).lower() == 'true' else 'false'
+    return str(value).strip()
+
+
+def app_key(app):
+    return str(app.get('legacy_id') or app.get('_id'))
+
+
+class ColumnarSnapshot:
+    def __init__(self, dictionaries=None):
+        self.seed = dictionaries or {}
+        self.lock = threading.RLock()
+        self.built_at = None
+        self._reset()
+
+    def _reset(self, capacity=INITIAL_CAPACITY):
+        self.size = 0
+        self.ids = []
+        self.rows = {}          # application id -> row
+        self.codes = {c: dict(self.seed.get(c, {})) for c in CATEGORICAL}
+        self.values = {c: [None] * (max(self.codes[c].values(), default=-1) + 1) for c in CATEGORICAL}
+        for c, codes in self.codes.items():
+            for value, code in codes.items():
+                self.values[c][code] = value
+        self.columns = {}
+        for c in list(NUMERIC) + list(TIMES):
+            self.columns[c] = np.full(capacity, np.nan)
+        for c in CATEGORICAL:
+            self.columns[c] = np.full(capacity, -1, dtype=np.int32)
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        capacity = len(self.columns['age'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for c, col in self.columns.items():
+            grown = np.full(capacity, -1 if col.dtype == np.int32 else np.nan, dtype=col.dtype)
+            grown[:self.size] = col[:self.size]
+            self.columns[c] = grown
+
+    def _code(self, column, value, add=True):
+        label = _label(column, value)
+        if label is None:
+            return -1
+        codes = self.codes[column]
+        code = codes.get(label)
+        if code is None:
+            if not add:
+                return None
+            code = len(self.values[column])
+            codes[label] = code
+            self.values[column].append(label)
+        return code
+
+    def upsert(self, app):
+        app_id = app_key(app)
+        with self.lock:
+            row = self.rows.get(app_id)
+            if row is None:
+                self._grow(self.size + 1)
+                row = self.size
+                self.rows[app_id] = row
+                self.ids.append(app_id)
+                self.size += 1
+            for c, path in NUMERIC.items():
+                self.columns[c][row] = _number(_get(app, path))
+            for c in TIMES:
+                self.columns[c][row] = _epoch(app.get(c))
+            for c, path in CATEGORICAL.items():
+                self.columns[c][row] = self._code(c, _get(app, path))
+
+    def rebuild(self, apps):
+        """Fresh snapshot of apps (the first copy of an id wins), swapped in at the end."""
+        fresh = ColumnarSnapshot(self.seed)
+        docs = []
+        for app in apps:
+            app_id = app_key(app)
+            if app.get('_id') is None or app_id in fresh.rows:
+                continue
+            fresh.rows[app_id] = len(docs)
+            fresh.ids.append(app_id)
+            docs.append(app)
+        # Whole columns at once, with headroom for the incremental inserts
+        fresh._grow(len(docs))
+        fresh.size = len(docs)
+        for c, path in NUMERIC.items():
+            fresh.columns[c][:fresh.size] = [_number(_get(app, path)) for app in docs]
+        for c in TIMES:
+            fresh.columns[c][:fresh.size] = [_epoch(app.get(c)) for app in docs]
+        for c, path in CATEGORICAL.items():
+            fresh.columns[c][:fresh.size] = [fresh._code(c, _get(app, path)) for app in docs]
+        with self.lock:
+            self.size, self.ids, self.rows = fresh.size, fresh.ids, fresh.rows
+            self.codes, self.values, self.columns = fresh.codes, fresh.values, fresh.columns
+            self.built_at = time.time()
+
+    # --- Queries ---
+
+    def _operand(self, column, value):
+        if column in CATEGORICAL:
+            code = self._code(column, value, add=False)
+            return -2 if code is None else code   # unknown value: matches nothing
+        if column in TIMES:
+            return _epoch(value)
+        number = _number(value)
+        if np.isnan(number):
+            raise QueryError(f"'{column}' needs a number, got {value!r}")
+        return number
+
+    def _mask(self, column, condition):
+        if column not in self.columns:
+            raise QueryError(f"unknown column '{column}'")
+        col = self.columns[column][:self.size]
+        if not isinstance(condition, dict):
+            condition = {'in': condition} if isinstance(condition, list) else {'eq': condition}
+        mask = np.ones(self.size, dtype=bool)
+        for op, value in condition.items():
+            if op not in OPERATORS:
+                raise QueryError(f"unknown operator '{op}' (use one of {', '.join(OPERATORS)})")
+            if op == 'in':
+                values = value if isinstance(value, list) else [value]
+                mask &= np.isin(col, [self._operand(column, v) for v in values])
+                continue
+            if op in ('gt', 'gte', 'lt', 'lte') and column in CATEGORICAL:
+                raise QueryError(f"'{column}' is categorical, use eq / ne / in")
+            operand = self._operand(column, value)
+            if op == 'eq':
+                mask &= col == operand
+            elif op == 'ne':
+                mask &= col != operand
+            elif op == 'gt':
+                mask &= col > operand
+            elif op == 'gte':
+                mask &= col >= operand
+            elif op == 'lt':
+                mask &= col < operand
+            else:
+                mask &= col <= operand
+        return mask
+
+    def _decode(self, column, value):
+        if column in CATEGORICAL:
+            return self.values[column][value] if value >= 0 else None
+        if np.isnan(value):
+            return None
+        if column in TIMES:
+            return datetime.fromtimestamp(value).isoformat()
+        return float(value)
+
+    def query(self, where=None, group_by=None, agg=None, limit=0):
+        """
+        Returns:
+            dict: {'count', 'groups' (with group_by), 'aggregates' (with agg and no group_by),
+                   'application_ids' (first `limit` matches), 'elapsed_ms'}
+        """
+        started = time.perf_counter()
+        group_by = list(group_by or [])
+        agg = dict(agg or {})
+        for column in group_by:
+            if column not in CATEGORICAL:
+                raise QueryError(f"can only group by categorical columns ({', '.join(CATEGORICAL)})")
+        for column, fn in agg.items():
+            if column not in NUMERIC or fn not in AGGREGATES:
+                raise QueryError(f"aggregate must map a numeric column to one of {', '.join(AGGREGATES)}")
+
+        with self.lock:
+            mask = np.ones(self.size, dtype=bool)
+            for column, condition in (where or {}).items():
+                mask &= self._mask(column, condition)
+            rows = np.flatnonzero(mask)
+            result = {'count': int(len(rows))}
+
+            if group_by:
+                cols = [self.columns[c][rows].astype(np.int64) + 1 for c in group_by]   # -1 -> 0
+                sizes = [len(self.values[c]) + 1 for c in group_by]
+                combined = np.ravel_multi_index(cols, sizes) if cols[0].size else np.zeros(0, dtype=np.int64)
+                if int(np.prod(sizes)) <= 1 << 20:
+                    # Small key space: count by direct indexing instead of sorting
+                    counts = np.bincount(combined, minlength=int(np.prod(sizes)))
+                    keys = np.flatnonzero(counts)
+                    slot = np.zeros(len(counts), dtype=np.int64)
+                    slot[keys] = np.arange(len(keys))
+                    inverse, counts = slot[combined], counts[keys]
+                else:
+                    keys, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+                    inverse = inverse.reshape(-1)
+                per_group = {f"{fn}_{column}": self._group_aggregate(self.columns[column][rows], inverse, len(keys), fn)
+                             for column, fn in agg.items()}
+                groups = []
+                for i, (key, n) in enumerate(zip(keys, counts)):
+                    parts = np.unravel_index(key, sizes)
+                    group = {c: self._decode(c, int(p) - 1) for c, p in zip(group_by, parts)}
+                    group['count'] = int(n)
+                    for name, values in per_group.items():
+                        group[name] = values[i]
+                    groups.append(group)
+                groups.sort(key=lambda g: -g['count'])
+                result['groups'] = groups
+            elif agg:
+                result['aggregates'] = {f"{fn}_{column}": self._aggregate(self.columns[column][rows], fn)
+                                        for column, fn in agg.items()}
+            if limit:
+                result['application_ids'] = [self.ids[r] for r in rows[:limit]]
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    @staticmethod
+    def _group_aggregate(values, groups, n, fn):
+        """fn of values per group id (0..n-1), NaNs skipped; None for a group without values."""
+        valid = ~np.isnan(values)
+        values, groups = values[valid], groups[valid]
+        counts = np.bincount(groups, minlength=n)
+        if fn in ('sum', 'mean'):
+            out = np.bincount(groups, weights=values, minlength=n)
+            if fn == 'mean':
+                out = out / np.maximum(counts, 1)
+        else:
+            out = np.full(n, np.inf if fn == 'min' else -np.inf)
+            (np.minimum if fn == 'min' else np.maximum).at(out, groups, values)
+        return [round(float(v), 4) if c else None for v, c in zip(out, counts)]
+
+    @staticmethod
+    def _aggregate(values, fn):
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return None
+        return round(float(getattr(np, fn)(values)), 4)
+
+    def describe(self):
+        with self.lock:
+            return {
+                'rows': self.size,
+                'built_at': self.built_at,
+                'numeric': list(NUMERIC),
+                'times': list(TIMES),
+                'categorical': {c: [v for v in self.values[c] if v is not None] for c in CATEGORICAL}
+            }
@@ -0,0 +1,508 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+# Compact, array-based layout for the XGBoost tree ensembles.
+# All trees are flattened into a handful of contiguous arrays (int16 features,
+# float32 thresholds/values, int32 child indexes with the right
+# child stored next to the left one) and evaluated level by level with
+# NumPy, so inference needs neither xgboost nor the pickled sklearn wrapper.
+#
+#   python compact_model.py                 # compact every model, write compaction_report.json
+#   python compact_model.py --rel-tol 0.02  # more aggressive pruning
+#
+# USE_COMPACT_MODELS=1 only loads the artifacts the report marks 'use_compact': the
+# compact model agrees with the original and scores a single row (what /predict and
+# /officer_predict do per request) faster. That holds for all four models (~4-5x), even
+# where nothing was pruned; scoring 1000 rows at once is slower than xgboost for the
+# unpruned ones, which is kept in the report for batch users. Artifacts that do not
+# qualify are deleted rather than left next to the pickles.
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+ml_dir = os.path.join(base_dir, "ML model")
+officer_dir = os.path.join(base_dir, "officer models")
+REPORT_FILE = os.path.join(base_dir, "compaction_report.json")
+COMPACT_SUFFIX = ".compact.npz"
+
+# model file, directory, dataset, label column ('' = compare against the original only)
+MODELS = [
+    ("user_approval_model.pkl", ml_dir, "balanced_user_level_dataset_40k.csv", "Approved_Status"),
+    ("user_bank_recommendation_model.pkl", ml_dir, "balanced_user_level_dataset_40k.csv", ""),
+    ("officer_approval_model.pkl", officer_dir, "officer_level_dataset.csv", "Officer_Approved"),
+    ("fraud_detection_model.pkl", officer_dir, "officer_level_dataset.csv", "Fraud_Label"),
+    ("loan_amount_model.pkl", officer_dir, "officer_level_dataset.csv", "Eligible_Loan_Amount"),
+]
+
+
+def compact_path(model_path):
+    return os.path.splitext(model_path)[0] + COMPACT_SUFFIX
+
+
+def worthwhile(entry):
+    """
+    True if a report entry shows a real gain on the serving path: the compact model makes
+    the same predictions and scores a single row faster than the original.
+    """
+    latency = entry.get('latency_ms', {})
+    if 'prediction_agreement' in entry:
+        faithful = entry['prediction_agreement'] >= 0.999
+    else:
+        faithful = entry.get('mean_abs_diff', float('inf')) <= 1e-3 * max(entry.get('mae_original', 1.0), 1.0)
+    return faithful and latency.get('single_compact', float('inf')) < latency.get('single_original', 0)
+
+
+def compact_enabled(model_path, report_file=REPORT_FILE):
+    """True if the compaction report marks this model's compact artifact as worth loading."""
+    try:
+        with open(report_file, 'r') as f:
+            models = json.load(f).get('models', {})
+    except (OSError, ValueError):
+        return False
+    return bool(models.get(os.path.basename(model_path), {}).get('use_compact'))
+
+
+class CompactTreeModel:
+    """
+    Drop-in replacement for the fitted XGBClassifier / XGBRegressor objects:
+    predict(), predict_proba() and predict_contribs() (path attribution, same as
+    XGBoost's approx_contribs) over the flattened tree arrays.
+    """
+
+    def __init__(self, arrays, meta):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.default_left = arrays['default_left'].astype(bool)
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.tree_group = arrays['tree_group']
+        self.meta = meta
+        self.kind = meta['kind']
+        self.num_groups = int(meta['num_groups'])
+        self.base_margin = np.asarray(meta['base_margin'], dtype=np.float64)
+        self.feature_names = meta.get('feature_names') or None
+        self.max_depth = int(meta['max_depth'])
+        self.model_version = meta.get('model_version')
+        # Gather index for the walk (leaves read feature 0, their +inf threshold keeps them in place)
+        self._feature_idx = np.maximum(self.feature, 0).astype(np.intp)
+        if self.kind != 'regression':
+            self.classes_ = np.arange(max(self.num_groups, 2))
+
+    # --- Persistence ---
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files if k != 'meta'}
+            meta = json.loads(str(data['meta']))
+        return cls(arrays, meta)
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            feature=self.feature, threshold=self.threshold,
+            left=self.left,
+            default_left=self.default_left.astype(np.uint8),
+            value=self.value, roots=self.roots, tree_group=self.tree_group,
+            meta=np.array(json.dumps(self.meta))
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    # --- Inference ---
+
+    def _as_matrix(self, X):
+        if hasattr(X, 'columns'):
+            if self.feature_names and all(f in X.columns for f in self.feature_names):
+                X = X[self.feature_names]
+            X = X.to_numpy()
+        # XGBoost compares float32 feature values against float32 thresholds
+        return np.asarray(X, dtype=np.float32).reshape(len(X), -1)
+
+    def _walk(self, X, contribs=None):
+        """Routes every row through every tree; returns the reached leaf per (row, tree)."""
+        n = X.shape[0]
+        offsets = (np.arange(n) * X.shape[1])[:, None]
+        flat = X.ravel()
+        has_nan = np.isnan(flat).any()
+        node = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        # Leaves loop back to themselves, so walking max_depth levels is enough for every tree
+        for _ in range(self.max_depth):
+            x = flat[offsets + self._feature_idx[node]]
+            go_left = x < self.threshold[node]
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+            nxt = self.left[node] + ~go_left
+            if contribs is not None:
+                r, t = np.nonzero(nxt != node)
+                delta = self.value[nxt[r, t]] - self.value[node[r, t]]
+                np.add.at(contribs, (r, self.tree_group[t], self.feature[node[r, t]]), delta)
+            node = nxt
+        return node
+
+    def predict_margin(self, X):
+        X = self._as_matrix(X)
+        leaves = self.value[self._walk(X)].astype(np.float64)
+        margin = np.tile(self.base_margin, (X.shape[0], 1))
+        for g in range(self.num_groups):
+            margin[:, g] += leaves[:, self.tree_group == g].sum(axis=1)
+        return margin
+
+    def predict_proba(self, X):
+        margin = self.predict_margin(X)
+        if self.kind == 'binary':
+            p = 1.0 / (1.0 + np.exp(-margin[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        if self.kind == 'multiclass':
+            e = np.exp(margin - margin.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        raise AttributeError("predict_proba is not available for regression models")
+
+    def predict(self, X):
+        if self.kind == 'regression':
+            return self.predict_margin(X)[:, 0]
+        if self.kind == 'binary':
+            return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+        return self.predict_proba(X).argmax(axis=1)
+
+    def predict_contribs(self, X):
+        """
+        Per-feature contributions in margin space, last column is the bias.
+        Shape (n, features + 1), or (n, groups, features + 1) for multi-class models.
+        """
+        X = self._as_matrix(X)
+        n_features = X.shape[1]
+        contribs = np.zeros((X.shape[0], self.num_groups, n_features + 1), dtype=np.float64)
+        self._walk(X, contribs)
+        for g in range(self.num_groups):
+            roots = self.roots[self.tree_group == g]
+            contribs[:, g, -1] += self.base_margin[g] + self.value[roots].sum()
+        return contribs[:, 0, :] if self.num_groups == 1 else contribs
+
+
+# --- Compaction ---
+
+def _parse_trees(booster):
+    """Reads the exact float32 tree arrays from the booster's JSON model."""
+    model = json.loads(bytes(booster.save_raw('json')))
+    learner = model['learner']
+    gbtree = learner['gradient_booster']
+    if gbtree.get('name') == 'dart':
+        gbtree = gbtree['gbtree']
+    trees = []
+    for tree, group in zip(gbtree['model']['trees'], gbtree['model']['tree_info']):
+        left = tree['left_children']
+        nodes = []
+        for i in range(len(left)):
+            is_leaf = left[i] == -1
+            nodes.append({
+                'feature': -1 if is_leaf else tree['split_indices'][i],
+                'threshold': tree['split_conditions'][i],
+                'left': left[i],
+                'right': tree['right_children'][i],
+                'default_left': bool(tree['default_left'][i]),
+                'cover': tree['sum_hessian'][i],
+            })
+        trees.append({'group': int(group), 'nodes': nodes})
+    return learner, trees
+
+
+def _node_means(nodes, idx=0):
+    """Cover-weighted mean leaf value below each node (the values path attribution uses)."""
+    node = nodes[idx]
+    if node['feature'] < 0:
+        node['mean'] = node['threshold']
+        return node['mean'], node['cover']
+    lm, lc = _node_means(nodes, node['left'])
+    rm, rc = _node_means(nodes, node['right'])
+    total = lc + rc
+    node['mean'] = (lm * lc + rm * rc) / total if total > 0 else (lm + rm) / 2
+    return node['mean'], total
+
+
+def _prune(nodes, idx, tol):
+    """Collapses splits whose two leaf children differ by at most tol (bottom-up)."""
+    node = nodes[idx]
+    if node['feature'] < 0:
+        return
+    _prune(nodes, node['left'], tol)
+    _prune(nodes, node['right'], tol)
+    left, right = nodes[node['left']], nodes[node['right']]
+    if left['feature'] < 0 and right['feature'] < 0 and abs(left['threshold'] - right['threshold']) <= tol:
+        node['feature'] = -1
+        node['threshold'] = node['mean']
+
+
+def _signature(nodes, idx=0):
+    node = nodes[idx]
+    if node['feature'] < 0:
+        return ('leaf',)
+    return (node['feature'], np.float32(node['threshold']).item(), node['default_left'],
+            _signature(nodes, node['left']), _signature(nodes, node['right']))
+
+
+def _leaf_values(nodes, idx=0, out=None):
+    out = [] if out is None else out
+    node = nodes[idx]
+    if node['feature'] < 0:
+        out.append(node['threshold'])
+    else:
+        _leaf_values(nodes, node['left'], out)
+        _leaf_values(nodes, node['right'], out)
+    return out
+
+
+def _add_leaves(nodes, values, idx=0, pos=None):
+    pos = [0] if pos is None else pos
+    node = nodes[idx]
+    if node['feature'] < 0:
+        node['threshold'] += values[pos[0]]
+        pos[0] += 1
+    else:
+        _add_leaves(nodes, values, node['left'], pos)
+        _add_leaves(nodes, values, node['right'], pos)
+
+
+def compact_model(model, rel_tol=0.01, calibration=None):
+    """
+    Builds a CompactTreeModel from a fitted XGBoost sklearn model.
+
+    - splits whose leaves differ by less than rel_tol * mean |leaf| are collapsed,
+    - constant trees and trees whose largest leaf is below that tolerance are folded
+      into the base margin (cover-weighted mean),
+    - trees with identical structure in the same output group are merged by adding leaves,
+    - thresholds and values are stored as float32, indexes as int32/int16.
+    """
+    booster = model.get_booster()
+    learner, trees = _parse_trees(booster)
+    objective = learner['objective']['name']
+    num_class = int(learner['learner_model_param'].get('num_class', 0) or 0)
+    if objective.startswith('multi:'):
+        kind, num_groups = 'multiclass', max(num_class, 1)
+    elif objective.startswith('binary:'):
+        kind, num_groups = 'binary', 1
+    else:
+        kind, num_groups = 'regression', 1
+
+    # The base margin is taken from the booster itself (robust across objectives and
+    # XGBoost versions): margin of the original model minus the sum of its trees on a sample row.
+    import xgboost as xgb
+    n_features = int(learner['learner_model_param']['num_feature'])
+    sample = np.zeros((1, n_features), dtype=np.float32) if calibration is None else \
+        np.asarray(calibration, dtype=np.float32)[:1]
+    original_margin = booster.predict(
+        xgb.DMatrix(sample, feature_names=booster.feature_names), output_margin=True
+    ).reshape(-1)
+    base_margin = original_margin - _raw_tree_sum(trees, sample[0], num_groups)
+
+    all_leaves = [abs(n['threshold']) for t in trees for n in t['nodes'] if n['feature'] < 0]
+    tol = rel_tol * (sum(all_leaves) / max(len(all_leaves), 1))
+
+    folded = np.zeros(num_groups)
+    kept = []
+    merged = {}
+    stats = {'trees_in': len(trees), 'nodes_in': sum(len(t['nodes']) for t in trees),
+             'trees_folded': 0, 'trees_merged': 0}
+    for tree in trees:
+        nodes = tree['nodes']
+        _node_means(nodes)
+        _prune(nodes, 0, tol)
+        leaves = _leaf_values(nodes)
+        if nodes[0]['feature'] < 0 or max(abs(v) for v in leaves) <= tol:
+            folded[tree['group']] += nodes[0]['mean']
+            stats['trees_folded'] += 1
+            continue
+        key = (tree['group'], _signature(nodes))
+        if key in merged:
+            _add_leaves(merged[key]['nodes'], leaves)
+            stats['trees_merged'] += 1
+            continue
+        merged[key] = tree
+        kept.append(tree)
+
+    # Flatten the surviving trees breadth-first so the two children of a split are
+    # adjacent (right child = left child + 1); only reachable nodes are kept.
+    feature, threshold, left, default_left, value = [], [], [], [], []
+    roots, groups, max_depth = [], [], 0
+    for tree in kept:
+        nodes = tree['nodes']
+        _node_means(nodes)
+        roots.append(len(feature))
+        groups.append(tree['group'])
+        order = [(0, 0)]
+        i = 0
+        while i < len(order):
+            idx, depth = order[i]
+            node = nodes[idx]
+            new_idx = roots[-1] + i
+            max_depth = max(max_depth, depth)
+            if node['feature'] < 0:
+                # Leaf: always "goes left" to itself (NaN follows default_left)
+                feature.append(-1)
+                threshold.append(np.inf)
+                left.append(new_idx)
+                default_left.append(True)
+                value.append(node['threshold'])
+            else:
+                feature.append(node['feature'])
+                threshold.append(node['threshold'])
+                left.append(roots[-1] + len(order))
+                default_left.append(node['default_left'])
+                value.append(node['mean'])
+                order.append((node['left'], depth + 1))
+                order.append((node['right'], depth + 1))
+            i += 1
+
+    arrays = {
+        'feature': np.asarray(feature, dtype=np.int16),
+        'threshold': np.asarray(threshold, dtype=np.float32),
+        'left': np.asarray(left, dtype=np.int32),
+        'default_left': np.asarray(default_left, dtype=np.uint8),
+        'value': np.asarray(value, dtype=np.float32),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'tree_group': np.asarray(groups, dtype=np.int16),
+    }
+    source_version = hashlib.sha1(bytes(booster.save_raw())).hexdigest()[:16]
+    meta = {
+        'kind': kind,
+        'objective': objective,
+        'num_groups': num_groups,
+        'base_margin': [float(b + f) for b, f in zip(base_margin, folded)],
+        'feature_names': list(booster.feature_names or []),
+        'max_depth': max_depth,
+        'rel_tol': rel_tol,
+        'source_version': source_version,
+        'model_version': f"compact-{source_version}-{rel_tol}",
+    }
+    compact = CompactTreeModel(arrays, meta)
+
+    stats.update({'trees_out': compact.n_trees, 'nodes_out': compact.n_nodes, 'max_depth': max_depth})
+    return compact, stats
+
+
+def _raw_tree_sum(trees, x, num_groups):
+    total = np.zeros(num_groups)
+    for tree in trees:
+        nodes = tree['nodes']
+        node = nodes[0]
+        while node['feature'] >= 0:
+            val = np.float32(x[node['feature']])
+            if np.isnan(val):
+                nxt = node['left'] if node['default_left'] else node['right']
+            else:
+                nxt = node['left'] if val < np.float32(node['threshold']) else node['right']
+            node = nodes[nxt]
+        total[tree['group']] += np.float32(node['threshold'])
+    return total
+
+
+def load_model(path):
+    """Loads a model artifact: the compact .npz format or a joblib/pickle file."""
+    if path.endswith('.npz'):
+        return CompactTreeModel.load(path)
+    import joblib
+    return joblib.load(path)
+
+
+# --- Report ---
+
+def _time_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def evaluate(original, compact, X, y=None):
+    """Accuracy and latency of the compact model against the original on a dataset sample."""
+    report = {'rows': int(len(X))}
+    if compact.kind == 'regression':
+        a, b = original.predict(X), compact.predict(X)
+        report['max_abs_diff'] = float(np.max(np.abs(a - b)))
+        report['mean_abs_diff'] = float(np.mean(np.abs(a - b)))
+        if y is not None:
+            report['mae_original'] = float(np.mean(np.abs(a - y)))
+            report['mae_compact'] = float(np.mean(np.abs(b - y)))
+    else:
+        pa, pb = original.predict_proba(X), compact.predict_proba(X)
+        report['max_prob_diff'] = float(np.max(np.abs(pa - pb)))
+        report['prediction_agreement'] = float(np.mean(pa.argmax(axis=1) == pb.argmax(axis=1)))
+        if y is not None:
+            report['accuracy_original'] = float(np.mean(pa.argmax(axis=1) == y))
+            report['accuracy_compact'] = float(np.mean(pb.argmax(axis=1) == y))
+
+    one = X.iloc[:1] if hasattr(X, 'iloc') else X[:1]
+    batch = X.iloc[:1000] if hasattr(X, 'iloc') else X[:1000]
+    report['latency_ms'] = {
+        'single_original': round(_time_call(lambda: original.predict(one), 50), 3),
+        'single_compact': round(_time_call(lambda: compact.predict(one), 50), 3),
+        'batch1000_original': round(_time_call(lambda: original.predict(batch), 5), 3),
+        'batch1000_compact': round(_time_call(lambda: compact.predict(batch), 5), 3),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the XGBoost model artifacts for faster inference.")
+    parser.add_argument('--rel-tol', type=float, default=0.01,
+                        help="Pruning tolerance relative to the mean absolute leaf value (default 0.01)")
+    parser.add_argument('--sample', type=int, default=5000,
+                        help="Dataset rows used for the accuracy report (default 5000)")
+    parser.add_argument('--report', default=REPORT_FILE)
+    args = parser.parse_args()
+
+    import joblib
+    import pandas as pd
+
+    datasets = {}
+    report = {'rel_tol': args.rel_tol, 'models': {}}
+    for filename, directory, dataset, label in MODELS:
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            print(f"Skipping {filename}: not found")
+            continue
+        print(f"Compacting {filename} ...")
+        original = joblib.load(path)
+
+        if dataset not in datasets:
+            datasets[dataset] = pd.read_csv(os.path.join(directory, dataset))
+        df = datasets[dataset].sample(min(args.sample, len(datasets[dataset])), random_state=42)
+        features = list(original.get_booster().feature_names or [])
+        X = df[features]
+        y = df[label].to_numpy() if label and label in df.columns else None
+
+        compact, stats = compact_model(original, args.rel_tol, calibration=X.to_numpy())
+        out = compact_path(path)
+        compact.save(out)
+
+        entry = dict(stats)
+        entry['size_bytes_original'] = os.path.getsize(path)
+        entry['size_bytes_compact'] = os.path.getsize(out)
+        entry.update(evaluate(original, compact, X, y))
+        entry['use_compact'] = worthwhile(entry)
+        report['models'][filename] = entry
+        print(f"  trees {stats['trees_in']} -> {stats['trees_out']}, nodes {stats['nodes_in']} -> {stats['nodes_out']}, "
+              f"{entry['size_bytes_original'] // 1024} KB -> {entry['size_bytes_compact'] // 1024} KB")
+        print(f"  latency (1 row) {entry['latency_ms']['single_original']} ms -> {entry['latency_ms']['single_compact']} ms, "
+              f"(1000 rows) {entry['latency_ms']['batch1000_original']} ms -> {entry['latency_ms']['batch1000_compact']} ms")
+        if not entry['use_compact']:
+            os.remove(out)
+            print(f"  no gain over the original: {os.path.basename(out)} removed, USE_COMPACT_MODELS keeps the pickle")
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
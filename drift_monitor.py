@@ -0,0 +1,244 @@
+import bisect
+import csv
+import json
+import math
+import os
+import threading
+import time
+
+from quantiles import P2Quantile
+
+# Online feature drift monitor.
+# Live /predict and /officer_predict traffic is folded into fixed-bin histograms and
+# streaming (P-square) quantiles, in constant memory per feature. The histograms use the
+# same bin edges as the baselines computed from the training CSVs, so PSI can be
+# computed at any time without keeping the raw requests.
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(base_dir, "drift_baselines.json")
+USER_DATASET = os.path.join(base_dir, "ML model", "balanced_user_level_dataset_40k.csv")
+OFFICER_DATASET = os.path.join(base_dir, "officer models", "officer_level_dataset.csv")
+
+DEFAULT_BINS = 10
+TRACKED_QUANTILES = (0.1, 0.5, 0.9)
+
+# Usual PSI reading: < 0.1 stable, 0.1 - 0.25 moderate shift, > 0.25 significant drift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+MIN_SAMPLES = 50
+PSI_EPSILON = 1e-4
+
+
+def exact_quantile(sorted_values, p):
+    if not sorted_values:
+        return None
+    idx = p * (len(sorted_values) - 1)
+    lo = int(math.floor(idx))
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (idx - lo)
+
+
+def bin_edges(sorted_values, bins=DEFAULT_BINS):
+    """
+    Edges for a feature: one bin per value for low-cardinality (encoded categorical)
+    columns, otherwise quantile edges of the training distribution.
+    """
+    distinct = sorted(set(sorted_values))
+    if len(distinct) <= bins * 2:
+        return [(a + b) / 2 for a, b in zip(distinct, distinct[1:])]
+    edges = [exact_quantile(sorted_values, i / bins) for i in range(1, bins)]
+    return sorted(set(edges))
+
+
+def build_baseline(csv_path, features, bins=DEFAULT_BINS):
+    """Computes histogram edges, bin proportions and reference quantiles per feature from a training CSV."""
+    columns = {feat: [] for feat in features}
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            for feat in features:
+                try:
+                    columns[feat].append(float(row.get(feat) or 0))
+                except ValueError:
+                    columns[feat].append(0.0)
+
+    baseline = {}
+    for feat, values in columns.items():
+        values.sort()
+        edges = bin_edges(values, bins)
+        counts = [0] * (len(edges) + 1)
+        for v in values:
+            counts[bisect.bisect_right(edges, v)] += 1
+        total = max(len(values), 1)
+        baseline[feat] = {
+            'edges': edges,
+            'proportions': [c / total for c in counts],
+            'quantiles': {str(p): exact_quantile(values, p) for p in TRACKED_QUANTILES},
+            'count': len(values)
+        }
+    return baseline
+
+
+def psi(expected, actual):
+    """Population Stability Index between two proportion vectors over the same bins."""
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e, PSI_EPSILON)
+        a = max(a, PSI_EPSILON)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+class FeatureSketch:
+    """Fixed-bin histogram plus streaming quantiles for one feature."""
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.quantiles = {p: P2Quantile(p) for p in TRACKED_QUANTILES}
+        self.n = 0
+
+    def add(self, x):
+        self.counts[bisect.bisect_right(self.edges, x)] += 1
+        for est in self.quantiles.values():
+            est.add(x)
+        self.n += 1
+
+    def proportions(self):
+        total = max(self.n, 1)
+        return [c / total for c in self.counts]
+
+
+class DriftMonitor:
+    """
+    Tracks live feature distributions for one model family and compares them to the
+    training baseline. observe() is O(features) with a single lock; report() is cached
+    and recomputed at most every report_interval seconds.
+    """
+
+    def __init__(self, name, features, baseline, report_interval=60):
+        self.name = name
+        self.features = [f for f in features if f in baseline]
+        self.baseline = baseline
+        self.report_interval = report_interval
+        self._lock = threading.Lock()
+        self._last_report = None
+        self._last_report_at = 0.0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sketches = {f: FeatureSketch(self.baseline[f]['edges']) for f in self.features}
+            self.started_at = time.time()
+            self.observed = 0
+            self._last_report = None
+
+    def observe(self, row):
+        """row: dict of encoded feature values, or a list aligned with self.features."""
+        if isinstance(row, dict):
+            values = [row.get(f, 0) for f in self.features]
+        else:
+            values = row
+        with self._lock:
+            for feat, val in zip(self.features, values):
+                try:
+                    self.sketches[feat].add(float(val))
+                except (TypeError, ValueError):
+                    continue
+            self.observed += 1
+
+    def report(self, force=False):
+        now = time.time()
+        if not force and self._last_report is not None and now - self._last_report_at < self.report_interval:
+            return self._last_report
+
+        with self._lock:
+            features = {}
+            for feat in self.features:
+                sketch = self.sketches[feat]
+                base = self.baseline[feat]
+                score = psi(base['proportions'], sketch.proportions()) if sketch.n else None
+                if sketch.n < MIN_SAMPLES:
+                    status = 'insufficient_data'
+                elif score >= PSI_SIGNIFICANT:
+                    status = 'drift'
+                elif score >= PSI_MODERATE:
+                    status = 'moderate'
+                else:
+                    status = 'stable'
+                features[feat] = {
+                    'psi': round(score, 4) if score is not None else None,
+                    'status': status,
+                    'samples': sketch.n,
+                    'live_quantiles': {str(p): est.value() for p, est in sketch.quantiles.items()},
+                    'baseline_quantiles': base['quantiles']
+                }
+            observed = self.observed
+
+        drifted = sorted(f for f, r in features.items() if r['status'] == 'drift')
+        report = {
+            'monitor': self.name,
+            'observed': observed,
+            'since': self.started_at,
+            'generated_at': now,
+            'drifted_features': drifted,
+            'features': features
+        }
+        if drifted:
+            print(f"Drift warning ({self.name}): {', '.join(drifted)}")
+        self._last_report = report
+        self._last_report_at = now
+        return report
+
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: drift baselines could not be loaded: {e}")
+        return {}
+
+
+def get_baseline(name, csv_path, features, path=BASELINE_FILE):
+    """Precomputed baseline from drift_baselines.json, rebuilt from the CSV if missing or stale."""
+    baselines = load_baselines(path)
+    baseline = baselines.get(name, {})
+    if all(f in baseline for f in features):
+        return baseline
+    print(f"Building drift baseline '{name}' from {csv_path}")
+    baseline = build_baseline(csv_path, features)
+    baselines[name] = baseline
+    try:
+        with open(path, 'w') as f:
+            json.dump(baselines, f, indent=1)
+    except Exception as e:
+        print(f"Warning: drift baselines could not be saved: {e}")
+    return baseline
+
+
+def create_monitor(name, csv_path, features, report_interval=60):
+    return DriftMonitor(name, features, get_baseline(name, csv_path, features), report_interval)
+
+
+if __name__ == '__main__':
+    # Precompute baselines for both model families: python drift_monitor.py
+    import pickle
+    import joblib
+
+    with open(os.path.join(base_dir, "ML model", "approval_features.pkl"), "rb") as f:
+        user_features = pickle.load(f)
+    officer_features = []
+    for name in ("officer_approval_features.pkl", "fraud_features.pkl", "loan_amount_features.pkl"):
+        for feat in joblib.load(os.path.join(base_dir, "officer models", name)):
+            if feat not in officer_features:
+                officer_features.append(feat)
+
+    baselines = {
+        'user': build_baseline(USER_DATASET, user_features),
+        'officer': build_baseline(OFFICER_DATASET, officer_features)
+    }
+    with open(BASELINE_FILE, 'w') as f:
+        json.dump(baselines, f, indent=1)
+    print(f"Wrote baselines for {len(user_features)} user and {len(officer_features)} officer features to {BASELINE_FILE}")
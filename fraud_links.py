@@ -0,0 +1,290 @@
+import math
+import threading
+import time
+from collections import Counter
+
+from search_index import normalize_name, normalize_mobile
+
+# Fraud-ring detection across applications.
+# Applications are linked when they share an attribute key:
+#   - mobile:      the same mobile number (digits only)
+#   - name:        the same normalized name
+#   - fingerprint: the same bucketed profile (age / income / loan amount bands plus the
+#                  categorical answers), i.e. near-identical forms
+# Each key keeps a hash-index entry pointing at the first application seen with it; a new
+# application is unioned with that one, so clusters grow with union-find in near-linear time
+# instead of comparing pairs. Per-cluster aggregates (names per mobile, mobiles per name,
+# applicants per fingerprint, banks) count how many applications contribute each value, are
+# merged small-into-large on every union, and are corrected when an application is re-added
+# (e.g. /apply filling in the name and mobile a /predict record did not have).
+# Keys shared by more than MAX_KEY_FANOUT applications (e.g. a very common name) stop linking,
+# so one popular value cannot glue unrelated applicants into a giant cluster.
+#
+# A cluster is reported as a ring when it holds at least two distinct applicants (Name|Mobile,
+# applications with neither do not count) and one mobile number is used under several names,
+# or one fingerprint by several applicants.
+
+MAX_KEY_FANOUT = 50
+FINGERPRINT_FIELDS = ('gender', 'maritalStatus', 'dependents', 'education', 'selfEmployed',
+                      'salaryMode', 'assets', 'area', 'loanPurpose', 'tenure')
+
+
+def _band(value, ratio=1.25):
+    """Logarithmic band: values within ~25% of each other usually share it."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if value <= 0:
+        return 0
+    return int(math.log(value) / math.log(ratio))
+
+
+def fingerprint(inp):
+    """Bucketed profile of a form, None when the amounts needed to tell profiles apart are missing."""
+    income, loan = _band(inp.get('applicantIncome')), _band(inp.get('loanAmount'))
+    if not income or not loan:
+        return None
+    try:
+        age = int(float(inp.get('age')) // 5)
+    except (TypeError, ValueError):
+        age = None
+    parts = [age, income, _band(inp.get('coApplicantIncome')), loan, _band(inp.get('existingEmi'))]
+    parts += [str(inp.get(f, '')).strip().lower() for f in FINGERPRINT_FIELDS]
+    return "|".join(str(p) for p in parts)
+
+
+def app_key(app):
+    """Id an application is tracked under; a Mongo copy of a local record keeps the local id."""
+    return str(app.get('legacy_id') or app.get('_id'))
+
+
+def link_keys(inp):
+    keys = []
+    mobile = normalize_mobile(inp.get('Mobile'))
+    if len(mobile) >= 6:
+        keys.append(('mobile', mobile))
+    name = normalize_name(inp.get('Name'))
+    if name and name != 'unknown':
+        keys.append(('name', name))
+    fp = fingerprint(inp)
+    if fp:
+        keys.append(('fingerprint', fp))
+    return keys
+
+
+def contribution(app):
+    """What one application adds to its cluster's aggregates: (applicant, bank, mobile, name, fingerprint)."""
+    inp = app.get('input') or {}
+    name = normalize_name(inp.get('Name'))
+    if name == 'unknown':
+        name = ''
+    mobile = normalize_mobile(inp.get('Mobile'))
+    applicant = f"{name}|{mobile}" if name or mobile else None
+    return applicant, app.get('selected_bank') or None, mobile, name, fingerprint(inp)
+
+
+def _bump(counter, value, n):
+    counter[value] += n
+    if counter[value] <= 0:
+        del counter[value]
+
+
+def _bump_in(groups, key, value, n):
+    group = groups.setdefault(key, Counter())
+    _bump(group, value, n)
+    if not group:
+        del groups[key]
+
+
+class _Cluster:
+    __slots__ = ('apps', 'banks', 'mobile_names', 'name_mobiles', 'fp_applicants', 'applicants')
+
+    def __init__(self):
+        self.apps = {}              # application id -> summary
+        self.banks = Counter()      # bank -> applications
+        self.mobile_names = {}      # mobile -> Counter(name)
+        self.name_mobiles = {}      # name -> Counter(mobile)
+        self.fp_applicants = {}     # fingerprint -> Counter(applicant key)
+        self.applicants = Counter()
+
+    def size(self):
+        return len(self.apps)
+
+    def count(self, contrib, n):
+        """Adds (n=1) or takes back (n=-1) one application's contribution."""
+        applicant, bank, mobile, name, fp = contrib
+        if applicant:
+            _bump(self.applicants, applicant, n)
+        if bank:
+            _bump(self.banks, bank, n)
+        if mobile and name:
+            _bump_in(self.mobile_names, mobile, name, n)
+            _bump_in(self.name_mobiles, name, mobile, n)
+        if fp and applicant:
+            _bump_in(self.fp_applicants, fp, applicant, n)
+
+    def absorb(self, other):
+        self.apps.update(other.apps)
+        self.banks.update(other.banks)
+        self.applicants.update(other.applicants)
+        for mine, theirs in ((self.mobile_names, other.mobile_names),
+                             (self.name_mobiles, other.name_mobiles),
+                             (self.fp_applicants, other.fp_applicants)):
+            for key, values in theirs.items():
+                mine.setdefault(key, Counter()).update(values)
+
+
+class FraudLinkGraph:
+    def __init__(self, max_fanout=MAX_KEY_FANOUT):
+        self.max_fanout = max_fanout
+        self._parent = {}
+        self._clusters = {}     # root -> _Cluster
+        self._index = {}        # (kind, value) -> first application id
+        self._key_counts = {}   # (kind, value) -> applications carrying it
+        self._app_keys = {}     # application id -> keys already linked
+        self._contribs = {}     # application id -> its current contribution()
+        self.lock = threading.RLock()
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._parent)
+
+    # --- Union-find ---
+
+    def _find(self, x):
+        root = x
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[x] != root:   # path compression
+            self._parent[x], x = root, self._parent[x]
+        return root
+
+    def _union(self, a, b):
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return ra
+        # Union by size; the smaller cluster's aggregates are merged into the larger one
+        if self._clusters[ra].size() < self._clusters[rb].size():
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._clusters[ra].absorb(self._clusters.pop(rb))
+        return ra
+
+    # --- Building ---
+
+    def add(self, app):
+        """Adds (or re-links after a name / mobile change) one application; returns its cluster id."""
+        app_id = app_key(app)
+        inp = app.get('input') or {}
+        keys = link_keys(inp)
+        with self.lock:
+            if app_id not in self._parent:
+                self._parent[app_id] = app_id
+                self._clusters[app_id] = _Cluster()
+                self._app_keys[app_id] = set()
+
+            cluster = self._clusters[self._find(app_id)]
+            # A re-added application replaces what it counted before
+            if app_id in self._contribs:
+                cluster.count(self._contribs.pop(app_id), -1)
+            contrib = contribution(app)
+            cluster.count(contrib, 1)
+            self._contribs[app_id] = contrib
+            cluster.apps[app_id] = {
+                'application_id': app_id,
+                'name': inp.get('Name'),
+                'mobile': inp.get('Mobile'),
+                'selected_bank': app.get('selected_bank'),
+                'status': app.get('status'),
+                'timestamp': app.get('timestamp')
+            }
+
+            # Links only grow: an old name / mobile keeps the links it already made
+            for key in keys:
+                if key in self._app_keys[app_id]:
+                    continue
+                self._app_keys[app_id].add(key)
+                count = self._key_counts.get(key, 0) + 1
+                self._key_counts[key] = count
+                first = self._index.setdefault(key, app_id)
+                if first != app_id and count <= self.max_fanout:
+                    self._union(first, app_id)
+            return self._find(app_id)
+
+    def rebuild(self, apps):
+        fresh = FraudLinkGraph(self.max_fanout)
+        seen = set()
+        for app in apps:
+            app_id = app_key(app)
+            if app.get('_id') is None or app_id in seen:
+                continue
+            seen.add(app_id)
+            fresh.add(app)
+        with self.lock:
+            self._parent, self._clusters = fresh._parent, fresh._clusters
+            self._index, self._key_counts, self._app_keys = fresh._index, fresh._key_counts, fresh._app_keys
+            self._contribs = fresh._contribs
+            self.built_at = time.time()
+
+    # --- Reporting ---
+
+    @staticmethod
+    def _describe(root, cluster):
+        shared_mobiles = {m: sorted(n) for m, n in cluster.mobile_names.items() if len(n) > 1}
+        shared_names = {n: sorted(m) for n, m in cluster.name_mobiles.items() if len(m) > 1}
+        near_duplicates = sum(1 for a in cluster.fp_applicants.values() if len(a) > 1)
+        reasons = []
+        if shared_mobiles:
+            reasons.append('shared_mobile')
+        if near_duplicates:
+            reasons.append('near_duplicate_forms')
+        if shared_names:
+            reasons.append('name_with_several_mobiles')
+        if len(cluster.banks) > 1:
+            reasons.append('multiple_banks')
+        return {
+            'cluster_id': root,
+            'applications': cluster.size(),
+            'applicants': len(cluster.applicants),
+            'banks': sorted(cluster.banks),
+            'shared_mobiles': shared_mobiles,
+            'names_with_several_mobiles': shared_names,
+            'near_duplicate_groups': near_duplicates,
+            'reasons': reasons,
+            'is_ring': len(cluster.applicants) > 1 and bool(shared_mobiles or near_duplicates),
+            'members': sorted(cluster.apps.values(), key=lambda a: str(a.get('timestamp') or ''))
+        }
+
+    def clusters(self, rings_only=True, min_applicants=2):
+        with self.lock:
+            out = []
+            for root, cluster in self._clusters.items():
+                if len(cluster.applicants) < min_applicants:
+                    continue
+                info = self._describe(root, cluster)
+                if rings_only and not info['is_ring']:
+                    continue
+                out.append(info)
+        out.sort(key=lambda c: (-c['applicants'], -c['applications']))
+        return out
+
+    def cluster_of(self, app_id):
+        with self.lock:
+            app_id = str(app_id)
+            if app_id not in self._parent:
+                return None
+            root = self._find(app_id)
+            return self._describe(root, self._clusters[root])
+
+    def stats(self):
+        with self.lock:
+            sizes = [c.size() for c in self._clusters.values()]
+            return {
+                'applications': len(self._parent),
+                'clusters': len(sizes),
+                'largest_cluster': max(sizes) if sizes else 0,
+                'keys': len(self._index),
+                'saturated_keys': sum(1 for n in self._key_counts.values() if n > self.max_fanout),
+                'built_at': self.built_at
+            }
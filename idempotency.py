@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import state_backend
+
+# Idempotency helpers for /predict.
+# The same form submitted twice must map to the same application: the normalized input is
+# hashed into 'input_hash', and /predict upserts on (input_hash, timestamp within window).
+# Running this module compacts data written before the hash existed:
+#
+#   python idempotency.py --dry-run          # report duplicates only
+#   python idempotency.py --window 86400     # dedup Mongo and local_applications.json
+
+MONGO_URI = "mongodb://localhost:27017/loan_db"
+DEFAULT_WINDOW = 24 * 3600
+
+# Statuses past 'predicted' are never deleted by the dedup command
+PRELIMINARY_STATUSES = {'predicted', 'none', ''}
+
+
+def normalize_value(val):
+    if val is None:
+        return None
+    if isinstance(val, bool):
+        return val
+    if isinstance(val, (int, float)):
+        return float(val)
+    if isinstance(val, str):
+        val = val.strip()
+        try:
+            return float(val)
+        except ValueError:
+            return val.casefold()
+    if isinstance(val, dict):
+        return {str(k): normalize_value(v) for k, v in val.items()}
+    if isinstance(val, (list, tuple)):
+        return [normalize_value(v) for v in val]
+    return str(val)
+
+
+def input_fingerprint(data):
+    """Stable hash of a /predict payload: key order, whitespace, case and '36' vs 36 do not matter."""
+    normalized = normalize_value(data or {})
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _parse_time(value):
+    try:
+        return datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def find_duplicates(records, window_seconds=DEFAULT_WINDOW):
+    """
+    Groups records by input hash; inside a group, submissions within window_seconds of the
+    first one of a run are duplicates of it. Per run the most progressed record survives
+    (anything beyond 'predicted', else the newest); only preliminary records are removed.
+
+    Returns:
+        list: ids (as stored) of records to delete.
+    """
+    groups = {}
+    for rec in records:
+        h = rec.get('input_hash') or input_fingerprint(rec.get('input'))
+        groups.setdefault(h, []).append(rec)
+
+    window = timedelta(seconds=window_seconds)
+    remove = []
+    for recs in groups.values():
+        if len(recs) < 2:
+            continue
+        recs.sort(key=lambda r: str(r.get('timestamp', '')))
+        runs, current, run_start = [], [], None
+        for rec in recs:
+            ts = _parse_time(rec.get('timestamp'))
+            if current and (ts is None or run_start is None or ts - run_start > window):
+                runs.append(current)
+                current = []
+            if not current:
+                run_start = ts
+            current.append(rec)
+        runs.append(current)
+
+        for run in runs:
+            if len(run) < 2:
+                continue
+            progressed = [r for r in run if str(r.get('status', '')).lower() not in PRELIMINARY_STATUSES]
+            survivors = progressed or [run[-1]]
+            keep = {id(r) for r in survivors}
+            remove.extend(r['_id'] for r in run if id(r) not in keep)
+    return remove
+
+
+def dedup_local(backend, window_seconds=DEFAULT_WINDOW, dry_run=False):
+    """Dedups the fallback store in one read-modify-write under the state backend's lock."""
+    def dedup(apps):
+        backfilled = 0
+        for app in apps:
+            if not app.get('input_hash'):
+                app['input_hash'] = input_fingerprint(app.get('input'))
+                backfilled += 1
+        remove = {str(i) for i in find_duplicates(apps, window_seconds)}
+        count = len(apps)
+        if not dry_run and remove:
+            apps[:] = [a for a in apps if str(a.get('_id')) not in remove]
+        return {'records': count, 'backfilled': backfilled, 'removed': len(remove)}, \
+            not dry_run and bool(remove or backfilled)
+
+    return backend.update_applications(dedup)
+
+
+def dedup_mongo(uri=MONGO_URI, window_seconds=DEFAULT_WINDOW, dry_run=False, batch_size=1000):
+    from pymongo import MongoClient, UpdateOne
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=3000)
+    coll = client.get_default_database().loan_applications
+    records, backfill = [], []
+    for doc in coll.find({}, {'input': 1, 'input_hash': 1, 'timestamp': 1, 'status': 1}):
+        if not doc.get('input_hash'):
+            doc['input_hash'] = input_fingerprint(doc.get('input'))
+            backfill.append(UpdateOne({'_id': doc['_id']}, {'$set': {'input_hash': doc['input_hash']}}))
+        doc.pop('input', None)
+        records.append(doc)
+
+    remove = find_duplicates(records, window_seconds)
+    if not dry_run:
+        for i in range(0, len(backfill), batch_size):
+            coll.bulk_write(backfill[i:i + batch_size], ordered=False)
+        for i in range(0, len(remove), batch_size):
+            coll.delete_many({'_id': {'$in': remove[i:i + batch_size]}})
+        coll.create_index([('input_hash', 1), ('timestamp', -1)])
+    return {'records': len(records), 'backfilled': len(backfill), 'removed': len(remove)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove duplicate /predict submissions from the application stores.")
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help="Idempotency window in seconds")
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would be removed")
+    parser.add_argument('--mongo-uri', default=MONGO_URI)
+    parser.add_argument('--state-backend', choices=['file', 'redis'], default='file')
+    parser.add_argument('--redis-url', default=None)
+    parser.add_argument('--skip-mongo', action='store_true')
+    args = parser.parse_args()
+
+    backend = state_backend.open_backend(args.state_backend, args.redis_url)
+    print("Fallback store:", dedup_local(backend, args.window, args.dry_run))
+    if not args.skip_mongo:
+        try:
+            print("MongoDB:", dedup_mongo(args.mongo_uri, args.window, args.dry_run))
+        except Exception as e:
+            print(f"MongoDB dedup skipped: {e}")
+
+
+if __name__ == '__main__':
+    main()
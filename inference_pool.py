@@ -0,0 +1,370 @@
+import hashlib
+import json
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from quantiles import P2Quantile
+
+# Process-pool inference.
+# Model scoring is CPU-bound and, on request threads, competes for the GIL with the encoding
+# and I/O work of every other route. An InferencePool runs N worker processes that each load
+# the models once. Request threads hand over encoded feature rows; a dispatcher thread per
+# worker collects the requests for the same model that arrive within batch_window_ms into one
+# micro-batch, copies it into a shared-memory buffer and sends the worker only a small control
+# message over its pipe. The worker writes the predictions into a second shared buffer.
+#
+# PooledModel wraps a loaded model so the prediction modules can use the pool unchanged:
+# predict()/predict_proba() go to the workers, everything else (explanations, attributes) runs
+# on the in-process copy, which is also the fallback when the pool fails.
+#
+# Workers are started as `python inference_pool.py --worker ...` (not by forking the server),
+# so they import nothing but the models.
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_WINDOW_MS = 2.0
+DEFAULT_TIMEOUT = 30.0
+BUFFER_WIDTH = 64   # max columns per row in the shared input / output buffers
+
+
+def file_version(path):
+    """Model version from the artifact bytes (same file -> same prediction-cache keys in every process)."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _attach(name):
+    # Only the server owns (and unlinks) the buffers; keep the worker's resource tracker out of it
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+# --- Worker process ---
+
+def worker_main(in_name, out_name, specs):
+    # stdout carries the protocol; anything the models print goes to stderr
+    channel_out = os.fdopen(os.dup(1), 'wb')
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    channel_in = sys.stdin.buffer
+
+    import pandas as pd
+    from compact_model import load_model
+
+    in_shm, out_shm = _attach(in_name), _attach(out_name)
+    out_capacity = out_shm.size // 8
+
+    def send(msg):
+        pickle.dump(msg, channel_out, protocol=pickle.HIGHEST_PROTOCOL)
+        channel_out.flush()
+
+    try:
+        models = {name: load_model(path) for name, path in specs.items()}
+    except Exception as e:
+        send(('error', f"{type(e).__name__}: {e}"))
+        return
+    send(('ready', os.getpid()))
+
+    while True:
+        try:
+            msg = pickle.load(channel_in)
+        except EOFError:
+            break
+        if msg[0] == 'stop':
+            break
+        _, name, method, n_rows, n_cols, columns = msg
+        try:
+            X = np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=in_shm.buf).copy()
+            if columns:
+                X = pd.DataFrame(X, columns=columns)
+            out = np.asarray(getattr(models[name], method)(X), dtype=np.float64)
+            if out.size <= out_capacity:
+                np.ndarray(out.shape, dtype=np.float64, buffer=out_shm.buf)[...] = out
+                send(('ok', out.shape))
+            else:
+                send(('ok', out.shape, out))
+        except Exception as e:
+            send(('error', f"{type(e).__name__}: {e}"))
+
+    in_shm.close()
+    out_shm.close()
+
+
+# --- Server side ---
+
+class _Worker:
+    """One worker process with its pair of shared buffers; used by a single dispatcher thread."""
+
+    def __init__(self, specs, max_batch):
+        size = max_batch * BUFFER_WIDTH * 8
+        self.in_shm = shared_memory.SharedMemory(create=True, size=size)
+        self.out_shm = shared_memory.SharedMemory(create=True, size=size)
+        self.max_batch = max_batch
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker',
+             self.in_shm.name, self.out_shm.name, json.dumps(specs)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=base_dir
+        )
+
+    def wait_ready(self):
+        msg = self._recv()
+        if msg[0] != 'ready':
+            raise RuntimeError(f"inference worker failed to start: {msg[1]}")
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def _recv(self):
+        try:
+            return pickle.load(self.proc.stdout)
+        except EOFError:
+            raise RuntimeError(f"inference worker exited (code {self.proc.poll()})")
+
+    def run(self, name, method, X, columns):
+        n_rows, n_cols = X.shape
+        if n_rows > self.max_batch or n_cols > BUFFER_WIDTH:
+            raise ValueError(f"batch of shape {X.shape} does not fit the shared buffer")
+        np.ndarray((n_rows, n_cols), dtype=np.float64, buffer=self.in_shm.buf)[...] = X
+        pickle.dump(('run', name, method, n_rows, n_cols, columns), self.proc.stdin)
+        self.proc.stdin.flush()
+        msg = self._recv()
+        if msg[0] == 'error':
+            raise RuntimeError(msg[1])
+        if len(msg) > 2:
+            return msg[2]
+        return np.ndarray(msg[1], dtype=np.float64, buffer=self.out_shm.buf).copy()
+
+    def close(self):
+        try:
+            if self.alive():
+                pickle.dump(('stop',), self.proc.stdin)
+                self.proc.stdin.flush()
+                self.proc.wait(timeout=5)
+        except Exception:
+            self.proc.kill()
+        for shm in (self.in_shm, self.out_shm):
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+
+
+class _Job:
+    __slots__ = ('key', 'X', 'result', 'error', 'done')
+
+    def __init__(self, key, X):
+        self.key = key
+        self.X = X
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class InferencePool:
+    def __init__(self, specs, workers=2, max_batch=DEFAULT_MAX_BATCH, batch_window_ms=DEFAULT_WINDOW_MS,
+                 timeout=DEFAULT_TIMEOUT):
+        """
+        Args:
+            specs (dict): model name -> artifact path (.pkl or .compact.npz).
+            workers (int): number of worker processes.
+            max_batch (int): max rows per micro-batch (also sizes the shared buffers).
+            batch_window_ms (float): how long a dispatcher waits for more requests to batch.
+        """
+        self.specs = dict(specs)
+        self.versions = {name: file_version(path) for name, path in self.specs.items()}
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000.0
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.restarts = 0
+        self._batch_rows = {p: P2Quantile(p) for p in (0.5, 0.95)}
+        self._latency_ms = {p: P2Quantile(p) for p in (0.5, 0.95, 0.99)}
+
+        self._workers = [_Worker(self.specs, max_batch) for _ in range(workers)]
+        try:
+            for worker in self._workers:
+                worker.wait_ready()
+        except Exception:
+            for worker in self._workers:
+                worker.close()
+            raise
+        self._threads = [
+            threading.Thread(target=self._dispatch, args=(i,), name=f"inference-dispatch-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, name, method, X, columns=None):
+        """Runs model `name`.method(X) in a worker and returns the result as a numpy array."""
+        if self._stopped:
+            raise RuntimeError("inference pool is closed")
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        key = (name, method, tuple(columns) if columns else None)
+        start = time.perf_counter()
+        jobs = [_Job(key, X[i:i + self.max_batch]) for i in range(0, len(X), self.max_batch)] or [_Job(key, X)]
+        for job in jobs:
+            self._queue.put(job)
+        for job in jobs:
+            if not job.done.wait(self.timeout):
+                raise TimeoutError(f"inference pool did not answer within {self.timeout}s")
+            if job.error is not None:
+                raise job.error
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.requests += 1
+            for est in self._latency_ms.values():
+                est.add(elapsed)
+        if len(jobs) == 1:
+            return jobs[0].result
+        return np.concatenate([job.result for job in jobs])
+
+    def _dispatch(self, index):
+        carry = None
+        while True:
+            job = carry if carry is not None else self._queue.get()
+            carry = None
+            if job is None:
+                self._queue.put(None)  # let the other dispatchers see the stop signal
+                return
+
+            # Micro-batch: same model, method and columns, until the window closes or the batch is full
+            batch, rows = [job], len(job.X)
+            deadline = time.perf_counter() + self.batch_window
+            while rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None or nxt.key != job.key or rows + len(nxt.X) > self.max_batch:
+                    carry = nxt
+                    break
+                batch.append(nxt)
+                rows += len(nxt.X)
+
+            name, method, columns = job.key
+            X = batch[0].X if len(batch) == 1 else np.concatenate([b.X for b in batch])
+            try:
+                out = self._run(index, name, method, X, list(columns) if columns else None)
+                offset = 0
+                for b in batch:
+                    b.result = out[offset:offset + len(b.X)]
+                    offset += len(b.X)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                for b in batch:
+                    b.error = e
+            with self._lock:
+                self.batches += 1
+                self.rows += rows
+                for est in self._batch_rows.values():
+                    est.add(rows)
+            for b in batch:
+                b.done.set()
+
+    def _run(self, index, name, method, X, columns):
+        worker = self._workers[index]
+        if not worker.alive():
+            # Replace a crashed worker before using it again
+            worker.close()
+            worker = _Worker(self.specs, self.max_batch)
+            worker.wait_ready()
+            self._workers[index] = worker
+            with self._lock:
+                self.restarts += 1
+        return worker.run(name, method, X, columns)
+
+    def close(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout=2.0)
+        for worker in self._workers:
+            worker.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'alive': sum(1 for w in self._workers if w.alive()),
+                'models': sorted(self.specs),
+                'max_batch': self.max_batch,
+                'batch_window_ms': self.batch_window * 1000,
+                'queued': self._queue.qsize(),
+                'requests': self.requests,
+                'batches': self.batches,
+                'rows': self.rows,
+                'avg_rows_per_batch': round(self.rows / self.batches, 2) if self.batches else 0,
+                'errors': self.errors,
+                'restarts': self.restarts,
+                'batch_rows': {f"p{int(p * 100)}": est.value() for p, est in self._batch_rows.items()},
+                'latency_ms': {f"p{int(p * 100)}": est.value() for p, est in self._latency_ms.items()}
+            }
+
+
+class PooledModel:
+    """Stands in for a loaded model; predict()/predict_proba() are scored by the pool."""
+
+    def __init__(self, pool, name, local_model):
+        self.pool = pool
+        self.name = name
+        self.local_model = local_model
+        self.model_version = pool.versions[name]
+
+    def _run(self, method, X):
+        columns = [str(c) for c in X.columns] if hasattr(X, 'columns') else None
+        try:
+            return self.pool.submit(self.name, method, X, columns)
+        except Exception as e:
+            print(f"Inference pool error ({self.name}.{method}), scoring in-process: {e}")
+            return getattr(self.local_model, method)(X)
+
+    def predict(self, X):
+        return self._run('predict', X)
+
+    def predict_proba(self, X):
+        return self._run('predict_proba', X)
+
+    def __getattr__(self, attr):
+        if attr == 'local_model':
+            raise AttributeError(attr)
+        return getattr(self.local_model, attr)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 5 and sys.argv[1] == '--worker':
+        worker_main(sys.argv[2], sys.argv[3], json.loads(sys.argv[4]))
+    else:
+        print("Usage: started by InferencePool as: inference_pool.py --worker <in_shm> <out_shm> <specs-json>")
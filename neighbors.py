@@ -0,0 +1,312 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Similar historical applications for the officer review screen.
+# Every case (the rows of officer_level_dataset.csv plus the applications officers decided)
+# is a vector of the officer model features, encoded like officer_predict (prediction.encode_row;
+# stored applications first get Approved_Bank / Hidden_CIBIL via prediction.application_input),
+# with the money columns log-scaled and every feature standardized. An inverted-file index
+# splits the vectors into NLIST k-means cells; a query ranks the cells by centroid distance,
+# scans the NPROBE closest ones exactly and returns the top k with their outcomes
+# (Officer_Approved, Fraud_Label, Eligible_Loan_Amount). A new decision is appended to the
+# cell of its nearest centroid. The dataset part is cached in neighbors_index.npz.
+#
+#   python neighbors.py build    # (re)build neighbors_index.npz from the dataset
+#   python neighbors.py bench    # recall against an exact scan, and latency
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+DATASET = os.path.join(base_dir, "officer models", "officer_level_dataset.csv")
+INDEX_FILE = os.path.join(base_dir, "neighbors_index.npz")
+
+# Same order as prediction.INPUT_FIELDS
+FEATURES = [
+    'Age', 'Gender', 'Marital_Status', 'Dependents', 'Education', 'Self_Employed',
+    'Work_Experience_Years', 'ApplicantIncome', 'CoapplicantIncome', 'Salary_Payment_Mode',
+    'Existing_EMI', 'Residential_Assets', 'Area', 'Loan_Purpose', 'LoanAmount', 'Loan_Amount_Term',
+    'Hidden_CIBIL', 'Approved_Bank'
+]
+LOG_FEATURES = ('ApplicantIncome', 'CoapplicantIncome', 'Existing_EMI', 'LoanAmount')
+OUTCOMES = ('Officer_Approved', 'Fraud_Label', 'Eligible_Loan_Amount')
+
+NLIST = 200
+NPROBE = 8
+KMEANS_ITERATIONS = 10
+DEFAULT_K = 10
+MAX_K = 100
+SEED = 42
+
+_log_idx = [FEATURES.index(f) for f in LOG_FEATURES]
+
+
+def _transform(matrix):
+    x = np.array(matrix, dtype=np.float64, ndmin=2)
+    x[:, _log_idx] = np.log1p(np.maximum(x[:, _log_idx], 0))
+    return x
+
+
+def _sq_distances(x, centroids):
+    """Squared L2 distances, shape (len(x), len(centroids))."""
+    d = (x * x).sum(1)[:, None] - 2 * x @ centroids.T + (centroids * centroids).sum(1)[None, :]
+    return np.maximum(d, 0)
+
+
+def kmeans(x, k, iterations=KMEANS_ITERATIONS, seed=SEED):
+    rng = np.random.RandomState(seed)
+    centroids = x[rng.choice(len(x), size=min(k, len(x)), replace=False)].copy()
+    for _ in range(iterations):
+        assign = _sq_distances(x, centroids).argmin(1)
+        counts = np.bincount(assign, minlength=len(centroids))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        filled = counts > 0   # an empty cell keeps its previous centroid
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids, _sq_distances(x, centroids).argmin(1)
+
+
+def outcome_of_decision(app):
+    """Outcomes of an officer-decided application (None when not decided yet)."""
+    status = str(app.get('status')).lower()
+    fraud = status == 'fraud' or app.get('fraud_flag') == True
+    if status not in ('approved', 'rejected') and not fraud:
+        return None
+    eligible = ((app.get('triage') or {}).get('scores') or {}).get('Eligible_Loan_Amount_Model')
+    return (1.0 if status == 'approved' else 0.0, 1.0 if fraud else 0.0,
+            float(eligible) if eligible is not None else np.nan)
+
+
+class NeighborIndex:
+    def __init__(self, encode=None, nprobe=NPROBE, complete=None):
+        self.encode = encode        # prediction.encode_row
+        self.complete = complete    # stored application -> model input (prediction.application_input)
+        self.nprobe = nprobe
+        self.lock = threading.RLock()
+        self.built_at = None
+        self.base = None            # dataset part, loaded / built once
+        self._clear()
+
+    def _clear(self):
+        self.size = 0
+        self.vectors = np.zeros((0, len(FEATURES)), dtype=np.float32)
+        self.outcomes = np.zeros((0, len(OUTCOMES)))
+        self.ids = []
+        self.rows = {}              # application id -> row
+        self.lists = []             # cell -> row numbers
+
+    def __len__(self):
+        return self.size
+
+    # --- Dataset part ---
+
+    def load_base(self, dataset=DATASET, path=INDEX_FILE):
+        """Loads the cached index of the dataset, or builds (and caches) it when stale / missing."""
+        with open(dataset, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        if path and os.path.exists(path):
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('sha1') == digest and meta.get('features') == FEATURES:
+                    self.base = {k: data[k] for k in data.files if k != 'meta'}
+                    return 'cached'
+        self.base = build_base(dataset)
+        if path:
+            tmp = path + ".tmp.npz"
+            np.savez(tmp, meta=json.dumps({'sha1': digest, 'features': FEATURES}), **self.base)
+            os.replace(tmp, path)
+        return 'built'
+
+    def _reset_to_base(self):
+        b = self.base
+        self.mean, self.std, self.centroids = b['mean'], b['std'], b['centroids']
+        n = len(b['vectors'])
+        capacity = max(n * 2, 1024)
+        self.vectors = np.zeros((capacity, len(FEATURES)), dtype=np.float32)
+        self.vectors[:n] = b['vectors']
+        self.outcomes = np.full((capacity, len(OUTCOMES)), np.nan)
+        self.outcomes[:n] = b['outcomes']
+        self.size = n
+        self.ids = [f"dataset:{i}" for i in range(n)]
+        self.rows = {}
+        order = np.argsort(b['assign'], kind='stable')
+        bounds = np.searchsorted(b['assign'][order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+
+    # --- Decided applications ---
+
+    def vector(self, data):
+        row = self.encode(data)
+        raw = _transform([[row[f] for f in FEATURES]])
+        return ((raw - self.mean) / self.std).astype(np.float32)[0]
+
+    def add(self, app):
+        """Adds / updates one decided application; undecided ones are ignored."""
+        outcome = outcome_of_decision(app)
+        if outcome is None or self.base is None:
+            return False
+        app_id = str(app.get('legacy_id') or app.get('_id'))
+        vec = self.vector(self.complete(app) if self.complete else (app.get('input') or {}))
+        cell = int(_sq_distances(vec[None, :].astype(np.float64), self.centroids).argmin())
+        with self.lock:
+            row = self.rows.get(app_id)
+            if row is None:
+                if self.size == len(self.vectors):
+                    self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+                    self.outcomes = np.concatenate([self.outcomes, np.full_like(self.outcomes, np.nan)])
+                row = self.size
+                self.size += 1
+                self.rows[app_id] = row
+                self.ids.append(app_id)
+            else:
+                self.lists = [cells[cells != row] if row in cells else cells for cells in self.lists]
+            self.vectors[row] = vec
+            self.outcomes[row] = outcome
+            self.lists[cell] = np.append(self.lists[cell], row)
+        return True
+
+    def rebuild(self, apps):
+        if self.base is None:
+            self.load_base()
+        with self.lock:
+            self._reset_to_base()
+            for app in apps:
+                if app.get('_id') is not None:
+                    self.add(app)
+            self.built_at = time.time()
+
+    # --- Queries ---
+
+    def search(self, data, k=DEFAULT_K, exclude=None, exact=False, nprobe=None):
+        """
+        Returns:
+            list: [{'case', 'distance', 'source', outcome: value, ...}] closest first.
+        """
+        q = self.vector(data)
+        with self.lock:
+            if exact:
+                rows = np.arange(self.size)
+            else:
+                probes = np.argsort(_sq_distances(q[None, :].astype(np.float64), self.centroids)[0])
+                rows = np.concatenate([self.lists[c] for c in probes[:nprobe or self.nprobe]])
+            if exclude is not None and str(exclude) in self.rows:
+                rows = rows[rows != self.rows[str(exclude)]]
+            diff = self.vectors[rows] - q
+            dist = np.einsum('ij,ij->i', diff, diff)
+            top = np.argpartition(dist, k)[:k] if len(rows) > k else np.arange(len(rows))
+            top = top[np.argsort(dist[top])]
+            out = []
+            for i in top:
+                row = int(rows[i])
+                case = self.ids[row]
+                item = {
+                    'case': case,
+                    'source': 'dataset' if case.startswith('dataset:') else 'application',
+                    'distance': round(float(np.sqrt(dist[i])), 4)
+                }
+                for name, value in zip(OUTCOMES, self.outcomes[row]):
+                    item[name] = None if np.isnan(value) else (float(value) if name == 'Eligible_Loan_Amount' else int(value))
+                out.append(item)
+        return out
+
+    def stats(self):
+        with self.lock:
+            sizes = [len(cells) for cells in self.lists]
+            return {
+                'cases': self.size,
+                'applications': len(self.rows),
+                'cells': len(sizes),
+                'nprobe': self.nprobe,
+                'largest_cell': max(sizes) if sizes else 0,
+                'built_at': self.built_at
+            }
+
+
+def summarize(neighbors):
+    """Approval / fraud rate and mean eligible amount over the neighbours that have them."""
+    out = {}
+    for name, key in (('Officer_Approved', 'approval_rate'), ('Fraud_Label', 'fraud_rate'),
+                      ('Eligible_Loan_Amount', 'mean_eligible_loan_amount')):
+        values = [n[name] for n in neighbors if n[name] is not None]
+        out[key] = round(sum(values) / len(values), 4) if values else None
+    return out
+
+
+def build_base(dataset=DATASET, nlist=NLIST):
+    import pandas as pd
+    df = pd.read_csv(dataset)
+    raw = _transform(df[FEATURES].to_numpy(dtype=np.float64))
+    mean, std = raw.mean(0), raw.std(0)
+    std[std == 0] = 1.0
+    x = (raw - mean) / std
+    centroids, assign = kmeans(x, nlist)
+    return {
+        'vectors': x.astype(np.float32),
+        'outcomes': df[list(OUTCOMES)].to_numpy(dtype=np.float64),
+        'mean': mean,
+        'std': std,
+        'centroids': centroids,
+        'assign': assign.astype(np.int32)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or benchmark the similar-applications index.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build')
+    bench = sub.add_parser('bench')
+    bench.add_argument('--queries', type=int, default=200)
+    bench.add_argument('-k', type=int, default=DEFAULT_K)
+    bench.add_argument('--nprobe', type=int, default=NPROBE)
+    for p in (build, bench):
+        p.add_argument('--dataset', default=DATASET)
+        p.add_argument('--file', default=INDEX_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if os.path.exists(args.file):
+            os.remove(args.file)
+        start = time.perf_counter()
+        index = NeighborIndex()
+        index.load_base(args.dataset, args.file)
+        print(f"Indexed {len(index.base['vectors'])} cases in {len(index.base['centroids'])} cells "
+              f"in {time.perf_counter() - start:.1f}s -> {args.file}")
+        return
+
+    import sys
+    sys.path.append(os.path.dirname(args.dataset))
+    import pandas as pd
+    from prediction import encode_row, INPUT_FIELDS, MAPPINGS
+    index = NeighborIndex(encode=encode_row, nprobe=args.nprobe)
+    print(f"Base index: {index.load_base(args.dataset, args.file)}")
+    index.rebuild([])
+
+    # Decode sample rows back to frontend payloads so queries go through encode_row
+    decode = {f: {v: k for k, v in m.items()} for f, m in MAPPINGS.items()}
+    sample = pd.read_csv(args.dataset).sample(args.queries, random_state=SEED)
+    recall, latency = [], []
+    for _, row in sample.iterrows():
+        data = {}
+        for feature, (key, _) in INPUT_FIELDS.items():
+            value = row[feature]
+            data[key] = decode[feature].get(int(value), value) if feature in decode else float(value)
+        start = time.perf_counter()
+        found = index.search(data, args.k)
+        latency.append((time.perf_counter() - start) * 1000)
+        exact = index.search(data, args.k, exact=True)
+        recall.append(len({n['case'] for n in found} & {n['case'] for n in exact}) / max(len(exact), 1))
+    print(json.dumps({
+        'queries': args.queries,
+        'k': args.k,
+        'nprobe': args.nprobe,
+        'recall': round(float(np.mean(recall)), 4),
+        'latency_ms_p50': round(float(np.percentile(latency, 50)), 3),
+        'latency_ms_p95': round(float(np.percentile(latency, 95)), 3)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import prediction
+
+# Offline check of the officer rule cascade (CASCADE_MODE in prediction.py).
+# Runs the rules and all three models over officer_level_dataset.csv and reports, for the
+# rows the cascade would short-circuit, how often the models disagree with the rules and
+# how each side compares to the dataset labels.
+#
+#   python cascade_report.py [--dataset officer_level_dataset.csv] [--output cascade_report.json]
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET = os.path.join(BASE_DIR, "officer_level_dataset.csv")
+
+# (model output, rule output, dataset label)
+TARGETS = [
+    ('Officer_Approved_Model', 'Officer_Approved_Rule', 'Officer_Approved'),
+    ('Fraud_Label_Model', 'Fraud_Label_Rule', 'Fraud_Label'),
+    ('Eligible_Loan_Amount_Model', 'Eligible_Loan_Amount_Rule', 'Eligible_Loan_Amount'),
+]
+
+
+def score_models(df):
+    out = {}
+    for name, model, features in (
+        ('Officer_Approved_Model', prediction.officer_approval_model, prediction.officer_approval_features),
+        ('Fraud_Label_Model', prediction.fraud_detection_model, prediction.fraud_features),
+        ('Eligible_Loan_Amount_Model', prediction.loan_amount_model, prediction.loan_amount_features),
+    ):
+        out[name] = np.asarray(model.predict(df[features]), dtype=float)
+    return out
+
+
+def compare(mask, models, rules, labels):
+    n = int(mask.sum())
+    report = {'rows': n}
+    if not n:
+        return report
+    for model_key, rule_key, label_key in TARGETS:
+        m, r = models[model_key][mask], rules[rule_key][mask]
+        entry = {}
+        if label_key == 'Eligible_Loan_Amount':
+            entry['mean_abs_diff'] = round(float(np.abs(m - r).mean()), 2)
+            entry['rows_differing_over_10pct'] = int((np.abs(m - r) > 0.1 * np.maximum(np.abs(r), 1)).sum())
+        else:
+            disagree = m != r
+            entry['disagreements'] = int(disagree.sum())
+            entry['disagreement_rate'] = round(float(disagree.mean()), 4)
+        if labels is not None and label_key in labels:
+            y = labels[label_key].to_numpy(dtype=float)[mask]
+            if label_key == 'Eligible_Loan_Amount':
+                entry['model_mae_vs_label'] = round(float(np.abs(m - y).mean()), 2)
+                entry['rule_mae_vs_label'] = round(float(np.abs(r - y).mean()), 2)
+            else:
+                entry['model_accuracy_vs_label'] = round(float((m == y).mean()), 4)
+                entry['rule_accuracy_vs_label'] = round(float((r == y).mean()), 4)
+        report[model_key] = entry
+    return report
+
+
+def build_report(path=DATASET):
+    prediction.ensure_models()
+    data = pd.read_csv(path)
+    df = data[list(prediction.INPUT_FIELDS)]
+
+    start = time.perf_counter()
+    rules = prediction.rule_predictions(df)
+    reasons = np.array([r or '' for r in prediction.short_circuit_reasons(df)])
+    rules_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    models = score_models(df)
+    models_ms = (time.perf_counter() - start) * 1000
+
+    short = reasons != ''
+    report = {
+        'dataset': os.path.basename(path),
+        'rows': len(df),
+        'short_circuited': int(short.sum()),
+        'short_circuit_rate': round(float(short.mean()), 4),
+        'timing_ms': {
+            'rules_all_rows': round(rules_ms, 2),
+            'models_all_rows': round(models_ms, 2),
+            'models_after_cascade_estimate': round(models_ms * (1 - float(short.mean())), 2)
+        },
+        'all_short_circuited': compare(short, models, rules, data),
+        'by_rule': {
+            rule: compare(reasons == rule, models, rules, data)
+            for rule in prediction.SHORT_CIRCUIT_RULES
+        },
+        # For reference: the same comparison on the rows that still go to the models
+        'model_path_rows': compare(~short, models, rules, data)
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report model/rule disagreement on the cases the officer cascade short-circuits.")
+    parser.add_argument('--dataset', default=DATASET)
+    parser.add_argument('--output', help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = build_report(args.dataset)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,11 @@
+import copy
+import hashlib
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
 import joblib
@@ -72,150 +80,601 @@ def eligible_loan_amount(row):
     # Bank cannot approve more than requested
     return max(0, min(eligible, row["LoanAmount"]))
 
+def rule_predictions(df):
+    """
+    Vectorized officer_approval / fraud_label / eligible_loan_amount over an encoded DataFrame.
+    Rows with an unknown Approved_Bank get 0 for all three, like the per-row rule error fallback.
+    """
+    bank = df["Approved_Bank"].to_numpy()
+    cibil = df["Hidden_CIBIL"].to_numpy(dtype=float)
+    income = df["ApplicantIncome"].to_numpy(dtype=float)
+    emi = df["Existing_EMI"].to_numpy(dtype=float)
+    exp = df["Work_Experience_Years"].to_numpy(dtype=float)
+    amount = df["LoanAmount"].to_numpy(dtype=float)
+    dti = emi / np.maximum(income, 1)
+
+    bank_ids = np.array(sorted(BANK_RULES))
+    pos = np.clip(np.searchsorted(bank_ids, bank), 0, len(bank_ids) - 1)
+    known = bank_ids[pos] == bank
+    valid = known | (bank == -1)
+    lookup = {key: np.array([BANK_RULES[b][key] for b in bank_ids])[pos]
+              for key in ("min_cibil", "min_salary", "min_exp", "max_dti")}
+    approved = (
+        known &
+        (cibil >= lookup["min_cibil"]) &
+        (income >= lookup["min_salary"]) &
+        (exp >= lookup["min_exp"]) &
+        (dti <= lookup["max_dti"]) &
+        (amount <= income * 40)
+    )
+
+    fraud = (
+        ((df["Salary_Payment_Mode"].to_numpy() == 0) & (amount > 500000)) |
+        (cibil < 600) |
+        (dti > 0.6) |
+        ((exp < 1) & (amount > 300000)) |
+        ((income < 20000) & (amount > 600000))
+    )
+
+    multiplier = np.select([cibil >= 750, cibil >= 700, cibil >= 650], [35, 30, 25], default=20)
+    eligible = income * multiplier - emi * df["Loan_Amount_Term"].to_numpy(dtype=float)
+    eligible = np.maximum(0, np.minimum(eligible, amount))
+
+    return {
+        'Officer_Approved_Rule': np.where(valid, approved, 0).astype(int),
+        'Fraud_Label_Rule': np.where(valid, fraud, 0).astype(int),
+        'Eligible_Loan_Amount_Rule': np.where(valid, eligible, 0.0).astype(float)
+    }
+
+# Clear-cut cases: the rules alone already reject the application
+SHORT_CIRCUIT_RULES = ('no_bank', 'cibil_below_600', 'dti_above_0.6')
+
+def short_circuit_reasons(df):
+    """First matching SHORT_CIRCUIT_RULES entry per row, or None where the models are needed."""
+    dti = df["Existing_EMI"].to_numpy(dtype=float) / np.maximum(df["ApplicantIncome"].to_numpy(dtype=float), 1)
+    conditions = [
+        df["Approved_Bank"].to_numpy() == -1,
+        df["Hidden_CIBIL"].to_numpy(dtype=float) < 600,
+        dti > 0.6
+    ]
+    reasons = np.select(conditions, list(SHORT_CIRCUIT_RULES), default='')
+    return [str(r) or None for r in reasons]
+
 # --- Load Models and Features ---
 # --- Load Models and Features ---
 import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Set USE_COMPACT_MODELS=1 to load the *.compact.npz artifacts written by compact_model.py
+# (only for the models compaction_report.json marks 'use_compact')
+USE_COMPACT_MODELS = os.environ.get("USE_COMPACT_MODELS", "0") == "1"
+
 try:
-    officer_approval_model = joblib.load(os.path.join(BASE_DIR, "officer_approval_model.pkl"))
-    officer_approval_features = joblib.load(os.path.join(BASE_DIR, "officer_approval_features.pkl"))
+    from compact_model import CompactTreeModel, compact_enabled, compact_path
+except ImportError:
+    CompactTreeModel = None
+
+# Module global -> artifact file of each officer model
+MODEL_FILES = {
+    'officer_approval_model': "officer_approval_model.pkl",
+    'fraud_detection_model': "fraud_detection_model.pkl",
+    'loan_amount_model': "loan_amount_model.pkl"
+}
+
+def model_path(filename):
+    path = os.path.join(BASE_DIR, filename)
+    if USE_COMPACT_MODELS and CompactTreeModel and os.path.exists(compact_path(path)) and compact_enabled(path):
+        return compact_path(path)
+    return path
+
+def load_model(filename):
+    path = model_path(filename)
+    if path.endswith('.npz'):
+        print(f"Loading compact model: {path}")
+        return CompactTreeModel.load(path)
+    return joblib.load(path)
 
-    fraud_detection_model = joblib.load(os.path.join(BASE_DIR, "fraud_detection_model.pkl"))
-    fraud_features = joblib.load(os.path.join(BASE_DIR, "fraud_features.pkl"))
+def set_models(**models):
+    """Replaces loaded models by name (see MODEL_FILES), e.g. with inference_pool.PooledModel proxies."""
+    for name, model in models.items():
+        if name not in MODEL_FILES:
+            raise KeyError(f"Unknown officer model: {name}")
+        globals()[name] = model
 
-    loan_amount_model = joblib.load(os.path.join(BASE_DIR, "loan_amount_model.pkl"))
-    loan_amount_features = joblib.load(os.path.join(BASE_DIR, "loan_amount_features.pkl"))
-    print("All officer models and feature lists loaded successfully.")
-except FileNotFoundError as e:
-    print(f"Error loading model or feature file: {e}. Make sure all .pkl files are in the same directory.")
-    # Exit or handle error appropriately in a real application
-    exit()
+# Models are loaded on first use (or by an explicit load_models() call from a warmup thread),
+# so importing this module stays cheap and a missing file does not terminate the process
+officer_approval_model = None
+officer_approval_features = []
+fraud_detection_model = None
+fraud_features = []
+loan_amount_model = None
+loan_amount_features = []
+load_error = None
+_load_lock = threading.Lock()
 
-def officer_predict(data: dict) -> dict:
+def load_models() -> dict:
     """
-    Predicts officer approval, fraud risk, and eligible loan amount for a single loan application.
+    Loads the three models and their feature lists (once).
+
+    Returns:
+        dict: load time in ms per artifact file (empty when already loaded).
     """
-    
-    # 1. Map Frontend Keys to Model Feature Names
-    input_dict = {
-        'Age': data.get('age', 30),
-        'Gender': data.get('gender', 'Male'),
-        'Marital_Status': data.get('maritalStatus', 'Single'),
-        'Dependents': data.get('dependents', '0'),
-        'Education': data.get('education', 'Graduate'),
-        'Self_Employed': data.get('selfEmployed', 'No'),
-        'Work_Experience_Years': data.get('experience', 0),
-        'ApplicantIncome': data.get('applicantIncome', 0),
-        'CoapplicantIncome': data.get('coApplicantIncome', 0),
-        'Salary_Payment_Mode': data.get('salaryMode', 'Cash'),
-        'Existing_EMI': data.get('existingEmi', 0),
-        'Residential_Assets': data.get('assets', 'None'),
-        'Area': data.get('area', 'Urban'),
-        'Loan_Purpose': data.get('loanPurpose', 'Other'),
-        'LoanAmount': data.get('loanAmount', 0),
-        'Loan_Amount_Term': data.get('tenure', 12),
-        'Hidden_CIBIL': data.get('Hidden_CIBIL', 700),
-        'Approved_Bank': data.get('Approved_Bank', 0)
-    }
+    global officer_approval_model, officer_approval_features, fraud_detection_model, fraud_features
+    global loan_amount_model, loan_amount_features, load_error
+    timings = {}
 
-    # If keys are already in Title Case (passed from rawApplication.input directly with some overrides)
-    # We should merge the raw data with our mapped defaults if the raw inputs use original keys (Age, Gender...)
-    # But frontend sends 'applicant' object constructed from 'input' in loadApplication.
-    # Actually, in runPrediction():
-    # modelInput = { ...this.rawApplication.input, "Hidden_CIBIL": ..., "Approved_Bank": ... }
-    # rawApplication.input has Title Case keys (Age, Gender...) as saved in app.py predict() 'input': data
-    # WAIT! user-eligibility uses camelCase for sending to backend.
-    # app.py predict() receives user-eligibility data (camelCase).
-    # Then it saves: 'input': data. So 'input' has camelCase keys!
-    # Let's verify 'local_applications.json' again.
-    
-    # 2. Encoding
-    df = pd.DataFrame([input_dict])
-    
-    # If the input data actually had Title Case keys (e.g. from Python test script), use them.
-    # Check if 'Age' is in data, if so override.
-    if 'Age' in data: df['Age'] = data['Age']
-    if 'ApplicantIncome' in data: df['ApplicantIncome'] = data['ApplicantIncome']
-    if 'LoanAmount' in data: df['LoanAmount'] = data['LoanAmount']
-    if 'Existing_EMI' in data: df['Existing_EMI'] = data['Existing_EMI']
-    if 'Work_Experience_Years' in data: df['Work_Experience_Years'] = data['Work_Experience_Years']
-    
-    mappings = {
-        'Gender': {'Female': 0, 'Male': 1, 'Other': 2},
-        'Marital_Status': {'Single': 0, 'Married': 1},
-        'Education': {'Graduate': 0, 'Not Graduate': 1},
-        'Self_Employed': {'No': 0, 'Yes': 1},
-        'Area': {'Rural': 0, 'Semiurban': 1, 'Urban': 2},
-        'Salary_Payment_Mode': {'Bank Transfer': 0, 'Cash': 1, 'Cheque': 2},
-        'Residential_Assets': {'House + Land': 0, 'None': 1, 'Own House': 2},
-        'Loan_Purpose': {
-            'Asset Purchase': 0, 'Education': 1, 'Home Renovation': 2, 
-            'Medical': 3, 'Other': 4, 'Wedding': 5
-        },
-        'Dependents': {'0': 0, '1': 1, '2': 2, '3+': 3}
-    }
-    
-    # Apply mappings
-    for col, mapping in mappings.items():
-        if col in df.columns:
-            val = df.iloc[0][col]
+    def timed(filename, loader):
+        start = time.perf_counter()
+        try:
+            return loader(filename)
+        finally:
+            timings[filename] = round((time.perf_counter() - start) * 1000, 2)
+
+    def load_features(filename):
+        return joblib.load(os.path.join(BASE_DIR, filename))
+
+    with _load_lock:
+        if models_loaded():
+            return timings
+        try:
+            officer_approval_model = timed("officer_approval_model.pkl", load_model)
+            officer_approval_features = timed("officer_approval_features.pkl", load_features)
+
+            fraud_detection_model = timed("fraud_detection_model.pkl", load_model)
+            fraud_features = timed("fraud_features.pkl", load_features)
+
+            loan_amount_model = timed("loan_amount_model.pkl", load_model)
+            loan_amount_features = timed("loan_amount_features.pkl", load_features)
+            load_error = None
+            print("All officer models and feature lists loaded successfully.")
+        except Exception as e:
+            load_error = str(e)
+            print(f"Error loading model or feature file: {e}. Make sure all .pkl files are in the same directory.")
+    return timings
+
+def models_loaded() -> bool:
+    return all(m is not None for m in (officer_approval_model, fraud_detection_model, loan_amount_model))
+
+def ensure_models():
+    if not models_loaded():
+        load_models()
+    if not models_loaded():
+        raise RuntimeError(f"Officer models not loaded: {load_error}")
+
+# --- Input Encoding ---
+# Frontend (camelCase) key -> (Model feature name, default value)
+INPUT_FIELDS = {
+    'Age': ('age', 30),
+    'Gender': ('gender', 'Male'),
+    'Marital_Status': ('maritalStatus', 'Single'),
+    'Dependents': ('dependents', '0'),
+    'Education': ('education', 'Graduate'),
+    'Self_Employed': ('selfEmployed', 'No'),
+    'Work_Experience_Years': ('experience', 0),
+    'ApplicantIncome': ('applicantIncome', 0),
+    'CoapplicantIncome': ('coApplicantIncome', 0),
+    'Salary_Payment_Mode': ('salaryMode', 'Cash'),
+    'Existing_EMI': ('existingEmi', 0),
+    'Residential_Assets': ('assets', 'None'),
+    'Area': ('area', 'Urban'),
+    'Loan_Purpose': ('loanPurpose', 'Other'),
+    'LoanAmount': ('loanAmount', 0),
+    'Loan_Amount_Term': ('tenure', 12),
+    'Hidden_CIBIL': ('Hidden_CIBIL', 700),
+    'Approved_Bank': ('Approved_Bank', 0)
+}
+
+# If the input data actually had Title Case keys (e.g. from Python test script), use them.
+TITLE_CASE_OVERRIDES = ['Age', 'ApplicantIncome', 'LoanAmount', 'Existing_EMI', 'Work_Experience_Years']
+
+MAPPINGS = {
+    'Gender': {'Female': 0, 'Male': 1, 'Other': 2},
+    'Marital_Status': {'Single': 0, 'Married': 1},
+    'Education': {'Graduate': 0, 'Not Graduate': 1},
+    'Self_Employed': {'No': 0, 'Yes': 1},
+    'Area': {'Rural': 0, 'Semiurban': 1, 'Urban': 2},
+    'Salary_Payment_Mode': {'Bank Transfer': 0, 'Cash': 1, 'Cheque': 2},
+    'Residential_Assets': {'House + Land': 0, 'None': 1, 'Own House': 2},
+    'Loan_Purpose': {
+        'Asset Purchase': 0, 'Education': 1, 'Home Renovation': 2, 
+        'Medical': 3, 'Other': 4, 'Wedding': 5
+    },
+    'Dependents': {'0': 0, '1': 1, '2': 2, '3+': 3}
+}
+
+# Number of features listed in 'top_factors' of an explanation
+TOP_FACTORS = 5
+
+def to_number(val):
+    """Same coercion as pd.to_numeric(errors='coerce').fillna(0) for a single value."""
+    if val is None:
+        return 0.0
+    if isinstance(val, str):
+        val = val.strip()
+    try:
+        num = float(val)
+    except (TypeError, ValueError):
+        return 0.0
+    if num != num:  # NaN
+        return 0.0
+    return num
+
+def encode_row(data: dict) -> dict:
+    """
+    Maps one application (camelCase from the frontend, or Title Case overrides)
+    to the encoded feature dict used by the rules and the models.
+    """
+    row = {}
+    for feature, (key, default) in INPUT_FIELDS.items():
+        val = data.get(key, default)
+        if feature in TITLE_CASE_OVERRIDES and feature in data:
+            val = data[feature]
+        if feature in MAPPINGS:
             if isinstance(val, str):
                 val = val.strip()
-            encoded_val = mapping.get(str(val), 0)
-            df[col] = encoded_val
+            row[feature] = MAPPINGS[feature].get(str(val), 0)
+        else:
+            row[feature] = to_number(val)
+    return row
+
+# Bank name -> Approved_Bank id, in the order the officer review screen
+# (officer-review.ts getBankId) tries them: exact name first, then the first key contained in it
+BANK_IDS = {
+    'HDFC': 0, 'HDFC Bank': 0,
+    'SBI': 1, 'State Bank of India': 1,
+    'ICICI': 2, 'ICICI Bank': 2,
+    'Axis': 3, 'Axis Bank': 3,
+    'Kotak': 4, 'Kotak Mahindra Bank': 4,
+    'IndusInd': 5, 'IndusInd Bank': 5,
+    'IDFC FIRST': 6, 'IDFC FIRST Bank': 6,
+    'YES': 7, 'YES Bank': 7,
+    'Bank of India': 8,
+    'Bank of Baroda': 9
+}
+
+def bank_id(bank_name) -> int:
+    bank_name = str(bank_name or '')
+    if bank_name in BANK_IDS:
+        return BANK_IDS[bank_name]
+    for key, value in BANK_IDS.items():
+        if key.lower() in bank_name.lower():
+            return value
+    return 0  # Default to HDFC if unknown (same as the UI)
+
+def application_input(app: dict) -> dict:
+    """
+    The officer model input of a stored application, completed like the officer review screen:
+    Approved_Bank from the selected bank, Hidden_CIBIL from the CIBIL stored with the application.
+    """
+    data = dict(app.get('input') or {})
+    data['Approved_Bank'] = bank_id(app.get('selected_bank'))
+    for cibil in (data.get('Hidden_CIBIL'), data.get('creditScore'), app.get('Hidden_CIBIL')):
+        if cibil not in (None, '') and to_number(cibil) > 0:
+            data['Hidden_CIBIL'] = cibil
+            break
+    return data
+
+# --- Prediction / Explanation Cache ---
+
+class PredictionCache:
+    """Small thread-safe LRU keyed by (model versions, feature-vector hash)."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared = None
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry
+        # Second tier shared with the other app instances (state_backend cache), if configured
+        if self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except Exception as e:
+                print(f"Shared cache read error: {e}")
+                entry = None
+            if entry is not None:
+                self._put_local(key, entry)
+                with self._lock:
+                    self.shared_hits += 1
+                return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self._put_local(key, entry)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry)
+            except Exception as e:
+                print(f"Shared cache write error: {e}")
+
+    def _put_local(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._data), 'hits': self.hits, 'shared_hits': self.shared_hits,
+                    'misses': self.misses, 'shared': self.shared is not None}
+
+prediction_cache = PredictionCache()
+
+_model_versions = weakref.WeakKeyDictionary()
+
+def model_version(model) -> str:
+    """Stable identifier of a loaded model (hash of the serialized booster), computed once per object."""
+    version = getattr(model, 'model_version', None)
+    if version:
+        return str(version)
+    try:
+        return _model_versions[model]
+    except (KeyError, TypeError):
+        pass
+    try:
+        raw = model.get_booster().save_raw()
+        version = hashlib.sha1(bytes(raw)).hexdigest()[:16]
+    except Exception:
+        version = f"{type(model).__name__}-{id(model)}"
+    try:
+        _model_versions[model] = version
+    except TypeError:
+        pass
+    return version
+
+def feature_contributions(model, X, exact=False):
+    """
+    Per-feature contributions from the tree model's native output (last column is the bias).
+    Uses XGBoost's fast path-attribution unless exact=True (full TreeSHAP).
+    """
+    if hasattr(model, 'predict_contribs'):
+        # Compact tree format (compact_model.py) computes the same path attribution itself
+        return model.predict_contribs(X)
+    import xgboost as xgb
+    booster = model.get_booster()
+    return booster.predict(xgb.DMatrix(X), pred_contribs=True, approx_contribs=not exact)
+
+def build_explanation(features, contribs) -> dict:
+    values = {feat: float(round(contribs[i], 4)) for i, feat in enumerate(features)}
+    ranked = sorted(values.items(), key=lambda kv: abs(kv[1]), reverse=True)[:TOP_FACTORS]
+    return {
+        'base_value': float(round(contribs[-1], 4)),
+        'contributions': values,
+        'top_factors': [
+            {'feature': feat, 'contribution': val, 'effect': 'increases' if val > 0 else 'decreases'}
+            for feat, val in ranked if val != 0
+        ]
+    }
+
+# --- Rule Cascade ---
+# CASCADE_MODE decides what happens to clear-cut cases (see short_circuit_reasons):
+#   off   - every application runs all three models
+#   skip  - the rule outputs stand in for the models, the models never run
+#   defer - same answer as skip right away; the models score those rows later in a
+#           background thread and replace the cached result
+# Each result records the path taken in 'Decision_Path': 'models', 'rules:<rule>' or 'deferred:<rule>'.
+CASCADE_MODES = ('off', 'skip', 'defer')
+CASCADE_MODE = os.environ.get("CASCADE_MODE", "off")
+if CASCADE_MODE not in CASCADE_MODES:
+    print(f"Unknown CASCADE_MODE '{CASCADE_MODE}', using 'off'")
+    CASCADE_MODE = 'off'
 
-    # Convert numeric columns explicitly
-    numeric_cols = ['Age', 'Work_Experience_Years', 'ApplicantIncome', 'CoapplicantIncome', 
-                    'Existing_EMI', 'LoanAmount', 'Loan_Amount_Term', 'Hidden_CIBIL', 'Approved_Bank']
-    for col in numeric_cols:
-        if col in df.columns:
-             df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+cascade_counts = {'models': 0, 'rules': 0, 'deferred': 0, 'deferred_scored': 0, 'deferred_dropped': 0}
+_cascade_lock = threading.Lock()
+_deferred = queue.Queue(maxsize=10000)
+_deferred_thread = None
 
-    results = {}
+def _count(path, n=1):
+    with _cascade_lock:
+        cascade_counts[path] += n
+
+def cascade_stats() -> dict:
+    with _cascade_lock:
+        stats = dict(cascade_counts)
+    stats['mode'] = CASCADE_MODE
+    stats['deferred_pending'] = _deferred.qsize()
+    return stats
+
+def _defer(key, row):
+    global _deferred_thread
+    with _cascade_lock:
+        if _deferred_thread is None:
+            _deferred_thread = threading.Thread(target=_score_deferred, name="cascade-deferred", daemon=True)
+            _deferred_thread.start()
+    try:
+        _deferred.put_nowait((key, row))
+    except queue.Full:
+        _count('deferred_dropped')
+
+def _score_deferred():
+    while True:
+        items = [_deferred.get()]
+        while len(items) < 256:
+            try:
+                items.append(_deferred.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            # Already counted as 'deferred' when queued; only 'deferred_scored' is added here
+            computed = _score_rows([row for _, row in items], explain=False, exact=False, cascade='off',
+                                   count=False)
+            for (key, _), entry in zip(items, computed):
+                if not entry.get('failed'):
+                    prediction_cache.put(key, entry)
+            _count('deferred_scored', len(items))
+        except Exception as e:
+            print(f"Deferred scoring error: {e}")
+
+def officer_predict(data: dict, explain: bool = False) -> dict:
+    """
+    Predicts officer approval, fraud risk, and eligible loan amount for a single loan application.
+    With explain=True the per-feature contributions of each model are returned under 'Explanation'.
+    """
+    return officer_predict_batch([data], explain=explain)[0]
+
+def score_keys(rows: list) -> list:
+    """
+    Cache keys of encoded rows: cascade mode + model versions + feature-vector hash.
+    Equal keys mean equal predictions, so callers can also use them to keep stored scores.
+    """
+    version = ":".join([CASCADE_MODE] + [model_version(m) for m in (officer_approval_model, fraud_detection_model, loan_amount_model)])
+    keys = []
+    for row in rows:
+        vector = np.asarray([row[feat] for feat in INPUT_FIELDS], dtype=np.float64)
+        keys.append(f"{version}:{hashlib.sha1(vector.tobytes()).hexdigest()}")
+    return keys
+
+def officer_predict_batch(records: list, explain: bool = False, exact: bool = False, proba: bool = False) -> list:
+    """
+    Batched officer_predict(): every model runs once over all applications that are not cached.
+    Results are cached with their explanations by feature-vector hash and model versions.
+    With proba=True the results also carry 'Officer_Approval_Probability' and 'Fraud_Probability'.
+    """
+    ensure_models()
+    rows = [encode_row(data) for data in records]
+    keys = score_keys(rows)
+
+    entries = [prediction_cache.get(key) for key in keys]
+    todo = [i for i, entry in enumerate(entries)
+            if entry is None or (explain and entry.get('explanation') is None)
+            or (proba and 'Fraud_Probability' not in entry['result'])]
+
+    if todo:
+        computed = _score_rows([rows[i] for i in todo], explain, exact, proba=proba)
+        for i, entry in zip(todo, computed):
+            prev = entries[i]
+            if prev is not None and entry.get('explanation') is None:
+                entry['explanation'] = prev.get('explanation')
+            entries[i] = entry
+            if not entry.get('failed'):
+                prediction_cache.put(keys[i], entry)
+            if entry['result'].get('Decision_Path', '').startswith('deferred:'):
+                _defer(keys[i], rows[i])
+
+    results = []
+    for entry in entries:
+        result = dict(entry['result'])
+        if not proba:
+            result.pop('Officer_Approval_Probability', None)
+            result.pop('Fraud_Probability', None)
+        if explain and entry.get('explanation') is not None:
+            result['Explanation'] = copy.deepcopy(entry['explanation'])
+        results.append(result)
+    return results
+
+def _score_rows(rows: list, explain: bool, exact: bool, cascade: str = None, proba: bool = False,
+                count: bool = True) -> list:
+    cascade = cascade or CASCADE_MODE
+    df = pd.DataFrame(rows, columns=list(INPUT_FIELDS))
+    entries = []
 
     # --- Rule-Based Predictions ---
     try:
-        results['Officer_Approved_Rule'] = int(officer_approval(df.iloc[0]))
-        results['Fraud_Label_Rule'] = int(fraud_label(df.iloc[0]))
-        results['Eligible_Loan_Amount_Rule'] = float(eligible_loan_amount(df.iloc[0]))
+        rules = rule_predictions(df)
     except Exception as e:
         print(f"Rule Logic Error: {e}")
-        results['Officer_Approved_Rule'] = 0
-        results['Fraud_Label_Rule'] = 0
-        results['Eligible_Loan_Amount_Rule'] = 0.0
+        rules = {
+            'Officer_Approved_Rule': np.zeros(len(rows), dtype=int),
+            'Fraud_Label_Rule': np.zeros(len(rows), dtype=int),
+            'Eligible_Loan_Amount_Rule': np.zeros(len(rows))
+        }
+    for i in range(len(rows)):
+        results = {
+            'Officer_Approved_Rule': int(rules['Officer_Approved_Rule'][i]),
+            'Fraud_Label_Rule': int(rules['Fraud_Label_Rule'][i]),
+            'Eligible_Loan_Amount_Rule': float(rules['Eligible_Loan_Amount_Rule'][i])
+        }
+        entries.append({'result': results, 'explanation': None})
+
+    # --- Cascade: clear-cut rows take the rule outputs ---
+    reasons = short_circuit_reasons(df) if cascade != 'off' else [None] * len(rows)
+    path = 'deferred' if cascade == 'defer' else 'rules'
+    for entry, reason in zip(entries, reasons):
+        result = entry['result']
+        if reason is None:
+            result['Decision_Path'] = 'models'
+            continue
+        result['Officer_Approved_Model'] = result['Officer_Approved_Rule']
+        result['Fraud_Label_Model'] = result['Fraud_Label_Rule']
+        result['Eligible_Loan_Amount_Model'] = result['Eligible_Loan_Amount_Rule']
+        result['Decision_Path'] = f"{path}:{reason}"
+        if proba:
+            result['Officer_Approval_Probability'] = float(result['Officer_Approved_Rule'])
+            result['Fraud_Probability'] = float(result['Fraud_Label_Rule'])
+        if explain:
+            entry['explanation'] = {'Short_Circuit_Rule': reason}
+    model_idx = [i for i, reason in enumerate(reasons) if reason is None]
+    if count:
+        _count('models', len(model_idx))
+        _count(path, len(rows) - len(model_idx))
+    if not model_idx:
+        return entries
+    if len(model_idx) < len(rows):
+        df = df.iloc[model_idx].reset_index(drop=True)
+    model_entries = [entries[i] for i in model_idx]
 
     # --- ML Model Predictions ---
+    models = [
+        ('Officer_Approved_Model', officer_approval_model, officer_approval_features, int, 'Officer_Approval_Probability'),
+        ('Fraud_Label_Model', fraud_detection_model, fraud_features, int, 'Fraud_Probability'),
+        ('Eligible_Loan_Amount_Model', loan_amount_model, loan_amount_features, float, None),
+    ]
     try:
-        # Prepare features for officer approval model
-        # Ensure columns exist
-        for feat in officer_approval_features:
-            if feat not in df.columns: df[feat] = 0
-        
-        features_for_officer = df[officer_approval_features]
-        results['Officer_Approved_Model'] = int(officer_approval_model.predict(features_for_officer)[0])
-
-        # Prepare features for fraud detection model
-        for feat in fraud_features:
-            if feat not in df.columns: df[feat] = 0
-            
-        features_for_fraud = df[fraud_features]
-        results['Fraud_Label_Model'] = int(fraud_detection_model.predict(features_for_fraud)[0])
-
-        # Prepare features for loan amount model
-        for feat in loan_amount_features:
-            if feat not in df.columns: df[feat] = 0
-            
-        features_for_loan_amount = df[loan_amount_features]
-        results['Eligible_Loan_Amount_Model'] = float(loan_amount_model.predict(features_for_loan_amount)[0])
-        
+        explanations = {}
+        for name, model, features, cast, proba_name in models:
+            # Ensure columns exist
+            for feat in features:
+                if feat not in df.columns: df[feat] = 0
+            features_df = df[features]
+            if proba and proba_name:
+                # One predict_proba pass; the class is the same 0.5 threshold predict() applies
+                probs = np.asarray(model.predict_proba(features_df), dtype=float)[:, 1]
+                preds = (probs > 0.5).astype(int)
+                for entry, p in zip(model_entries, probs):
+                    entry['result'][proba_name] = round(float(p), 4)
+            else:
+                preds = model.predict(features_df)
+            for entry, pred in zip(model_entries, preds):
+                entry['result'][name] = cast(pred)
+            if explain:
+                try:
+                    explanations[name] = (features, feature_contributions(model, features_df, exact=exact))
+                except Exception as e:
+                    print(f"Explanation error ({name}): {e}")
+        if explanations:
+            for i, entry in enumerate(model_entries):
+                entry['explanation'] = {
+                    name: build_explanation(features, contribs[i])
+                    for name, (features, contribs) in explanations.items()
+                }
     except Exception as e:
         print(f"Model Inference Error: {e}")
-        results['Officer_Approved_Model'] = 0
-        results['Fraud_Label_Model'] = 0
-        results['Eligible_Loan_Amount_Model'] = 0.0
+        for entry in model_entries:
+            entry['result']['Officer_Approved_Model'] = 0
+            entry['result']['Fraud_Label_Model'] = 0
+            entry['result']['Eligible_Loan_Amount_Model'] = 0.0
+            entry['result'].pop('Officer_Approval_Probability', None)
+            entry['result'].pop('Fraud_Probability', None)
+            entry['failed'] = True
 
-    return results
+    return entries
 
 if __name__ == '__main__':
     # Example usage:
@@ -0,0 +1,68 @@
+# Streaming quantiles shared by the drift monitor and the latency stats
+# (write_behind, admission, shadow, inference_pool): constant memory per tracked quantile,
+# so they can sit on hot paths and run for the life of the process.
+
+
+class P2Quantile:
+    """Streaming quantile estimate (Jain & Chlamtac P-square), five markers, O(1) memory."""
+
+    def __init__(self, p):
+        self.p = p
+        self.n = 0
+        self.q = []
+        self.pos = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.inc = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self.q
+        if self.n < 5:
+            q.append(x)
+            self.n += 1
+            if self.n == 5:
+                q.sort()
+            return
+        self.n += 1
+
+        # Find the cell x falls into and stretch the extremes if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            for i in range(1, 5):
+                if x < q[i]:
+                    k = i - 1
+                    break
+
+        pos = self.pos
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            self.desired[i] += self.inc[i]
+
+        # Adjust the three middle markers
+        for i in range(1, 4):
+            d = self.desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + d) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i]) +
+                    (pos[i + 1] - pos[i] - d) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+                )
+                if q[i - 1] < qp < q[i + 1]:
+                    q[i] = qp
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (pos[i + d] - pos[i])
+                pos[i] += d
+
+    def value(self):
+        if self.n == 0:
+            return None
+        if self.n < 5:
+            ordered = sorted(self.q)
+            return ordered[min(int(self.p * len(ordered)), len(ordered) - 1)]
+        return self.q[2]
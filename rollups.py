@@ -0,0 +1,295 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+
+# Materialized daily rollups for the admin dashboard.
+# Each application contributes counters keyed by (day, dimension, key, status):
+#   - status:       key 'all'; 'predicted' on its submission day, 'applied' on the apply day,
+#                   the officer decision ('approved' / 'rejected' / 'fraud') on the decision day
+#   - bank:         key = selected bank ('Unknown' before /apply); 'applications' on the
+#                   submission day and the decision on the decision day
+#   - officer:      key = officer_id; the decision on the decision day
+#   - officer_bank: key = 'officer_id|bank'; same, to show which bank an officer works for
+# On every status change the app applies diff(before, after), so a counter always matches
+# what a rebuild from the stored applications would produce. Range queries read
+# days x keys rows, independent of how many applications there are.
+#
+#   python rollups.py rebuild [--target sqlite|mongo] [--skip-mongo]
+#   python rollups.py query bank --from 2026-01-01 --to 2026-01-31
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+ROLLUP_FILE = os.path.join(base_dir, "rollups.sqlite3")
+DB_FILE = os.path.join(base_dir, "local_applications.json")
+MONGO_URI = "mongodb://localhost:27017/loan_db"
+
+DIMENSIONS = ('status', 'bank', 'officer', 'officer_bank')
+DECISIONS = ('approved', 'rejected', 'fraud')
+ALL = 'all'
+
+
+def day_of(value):
+    """'YYYY-MM-DD' of an ISO timestamp string or datetime, None when missing / unparseable."""
+    if value is None or value == '':
+        return None
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    day = str(value)[:10]
+    try:
+        datetime.strptime(day, '%Y-%m-%d')
+    except ValueError:
+        return None
+    return day
+
+
+def decision_of(app):
+    # Same precedence as the admin stats: approved, rejected, then fraud (status or flag)
+    status = str(app.get('status')).lower()
+    if status in ('approved', 'rejected'):
+        return status
+    if status == 'fraud' or app.get('fraud_flag') == True:
+        return 'fraud'
+    return None
+
+
+def contributions(app):
+    """Counter of (day, dimension, key, status) -> n for one application (empty for None)."""
+    out = Counter()
+    if not app:
+        return out
+    bank = app.get('selected_bank') or 'Unknown'
+    day = day_of(app.get('timestamp'))
+    if day:
+        out[(day, 'status', ALL, 'predicted')] += 1
+        out[(day, 'bank', bank, 'applications')] += 1
+    applied = day_of(app.get('applied_at'))
+    if applied and app.get('selected_bank'):
+        out[(applied, 'status', ALL, 'applied')] += 1
+    decision = decision_of(app)
+    decided = day_of(app.get('decided_at')) or day
+    if decision and decided:
+        out[(decided, 'status', ALL, decision)] += 1
+        out[(decided, 'bank', bank, decision)] += 1
+        officer = app.get('officer_id')
+        if officer:
+            out[(decided, 'officer', str(officer), decision)] += 1
+            out[(decided, 'officer_bank', f"{officer}|{bank}", decision)] += 1
+    return out
+
+
+def diff(before, after):
+    """Counter changes for an application going from `before` to `after` (either may be None)."""
+    delta = Counter(contributions(after))
+    delta.subtract(contributions(before))
+    return {k: n for k, n in delta.items() if n}
+
+
+def rebuild_counters(sources):
+    """
+    Counters over all applications in `sources` (iterables); an application seen twice counts
+    once, as its copy in the first source that has it. A record synced to Mongo carries its
+    local UUID as legacy_id, so that is the key. Callers reading Mongo pass only the local
+    records not synced yet, since a synced local copy may predate the officer's decision.
+    """
+    counters = Counter()
+    seen = set()
+    for source in sources:
+        for app in source:
+            app_id = str(app.get('legacy_id') or app.get('_id'))
+            if app_id in seen:
+                continue
+            seen.add(app_id)
+            counters.update(contributions(app))
+    return counters
+
+
+# --- Query helpers ---
+
+def totals(rows):
+    """{key: {status: n}} summed over the days in rows."""
+    out = {}
+    for day, key, status, n in rows:
+        entry = out.setdefault(key, {})
+        entry[status] = entry.get(status, 0) + n
+    return out
+
+
+def by_day(rows):
+    """[{'day': ..., status: n, ...}] sorted by day, summed over keys."""
+    days = {}
+    for day, key, status, n in rows:
+        entry = days.setdefault(day, {'day': day})
+        entry[status] = entry.get(status, 0) + n
+    return [days[d] for d in sorted(days)]
+
+
+# --- Stores ---
+
+class SQLiteRollups:
+    """Counters in a SQLite table; increments are atomic across the processes on a host."""
+
+    name = 'sqlite'
+
+    def __init__(self, path=ROLLUP_FILE):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS rollups ("
+                     "day TEXT, dim TEXT, key TEXT, status TEXT, count INTEGER, "
+                     "PRIMARY KEY (dim, day, key, status))")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, delta):
+        if not delta:
+            return
+        conn = self._conn()
+        conn.executemany(
+            "INSERT INTO rollups (day, dim, key, status, count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (dim, day, key, status) DO UPDATE SET count = count + excluded.count",
+            [(day, dim, key, status, n) for (day, dim, key, status), n in delta.items()])
+        conn.commit()
+
+    def replace_all(self, counters):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM rollups")
+            conn.executemany(
+                "INSERT INTO rollups (day, dim, key, status, count) VALUES (?, ?, ?, ?, ?)",
+                [(day, dim, key, status, n) for (day, dim, key, status), n in counters.items() if n])
+
+    def query(self, dimension, start=None, end=None, key=None):
+        sql = "SELECT day, key, status, count FROM rollups WHERE dim = ? AND count != 0"
+        args = [dimension]
+        if start:
+            sql += " AND day >= ?"
+            args.append(start)
+        if end:
+            sql += " AND day <= ?"
+            args.append(end)
+        if key is not None:
+            sql += " AND key = ?"
+            args.append(key)
+        return self._conn().execute(sql, args).fetchall()
+
+
+class MongoRollups:
+    """Counters in the daily_rollups collection (shared by every instance), updated with $inc."""
+
+    name = 'mongo'
+
+    def __init__(self, get_db):
+        self.get_db = get_db
+        self._indexed = False
+
+    @property
+    def collection(self):
+        coll = self.get_db().daily_rollups
+        if not self._indexed:
+            coll.create_index([('dim', 1), ('day', 1)])
+            self._indexed = True
+        return coll
+
+    @staticmethod
+    def _doc_id(day, dim, key, status):
+        return f"{dim}|{day}|{key}|{status}"
+
+    def add(self, delta):
+        from pymongo import UpdateOne
+        if not delta:
+            return
+        self.collection.bulk_write([
+            UpdateOne({'_id': self._doc_id(*k)},
+                      {'$inc': {'count': n}, '$setOnInsert': dict(zip(('day', 'dim', 'key', 'status'), k))},
+                      upsert=True)
+            for k, n in delta.items()
+        ], ordered=False)
+
+    def replace_all(self, counters):
+        coll = self.collection
+        coll.delete_many({})
+        docs = [dict(_id=self._doc_id(*k), day=k[0], dim=k[1], key=k[2], status=k[3], count=n)
+                for k, n in counters.items() if n]
+        if docs:
+            coll.insert_many(docs, ordered=False)
+
+    def query(self, dimension, start=None, end=None, key=None):
+        q = {'dim': dimension, 'count': {'$ne': 0}}
+        if start or end:
+            q['day'] = {}
+            if start:
+                q['day']['$gte'] = start
+            if end:
+                q['day']['$lte'] = end
+        if key is not None:
+            q['key'] = key
+        return [(d['day'], d['key'], d['status'], d['count']) for d in self.collection.find(q)]
+
+
+def open_rollups(target='sqlite', path=ROLLUP_FILE, get_db=None):
+    if target == 'mongo':
+        return MongoRollups(get_db)
+    return SQLiteRollups(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or query the daily application rollups.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    rebuild = sub.add_parser('rebuild', help="Recompute all counters from the stored applications")
+    rebuild.add_argument('--skip-mongo', action='store_true', help="Only read local_applications.json and the archive")
+    rebuild.add_argument('--archive-target', choices=['files', 'mongo'], default='files')
+    query = sub.add_parser('query')
+    query.add_argument('dimension', choices=DIMENSIONS)
+    query.add_argument('--from', dest='start')
+    query.add_argument('--to', dest='end')
+    query.add_argument('--key')
+    for p in (rebuild, query):
+        p.add_argument('--target', choices=['sqlite', 'mongo'], default='sqlite')
+        p.add_argument('--file', default=ROLLUP_FILE)
+        p.add_argument('--mongo-uri', default=MONGO_URI)
+    args = parser.parse_args()
+
+    client = None
+    if args.target == 'mongo' or (args.command == 'rebuild' and not args.skip_mongo):
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    get_db = (lambda: client.get_default_database()) if client else None
+    store = open_rollups(args.target, args.file, get_db)
+
+    if args.command == 'query':
+        rows = store.query(args.dimension, args.start, args.end, args.key)
+        print(json.dumps({'totals': totals(rows), 'by_day': by_day(rows)}, indent=2))
+        return
+
+    import archive
+    local = []
+    if os.path.exists(DB_FILE):
+        with open(DB_FILE, 'r') as f:
+            local = json.load(f)
+    sources = [local]
+    if client is not None and not args.skip_mongo:
+        try:
+            client.server_info()
+            # Mongo holds the current version of every synced record
+            sources = [[app for app in local if not app.get('synced_at')],
+                       client.get_default_database().loan_applications.find()]
+        except Exception as e:
+            print(f"MongoDB unavailable, rebuilding from local_applications.json and the archive only: {e}")
+    sources.append(archive.open_archive(args.archive_target, get_db=get_db).iter_records())
+    counters = rebuild_counters(sources)
+    store.replace_all(counters)
+    print(f"Rebuilt {len(counters)} counters ({args.target}).")
+
+
+if __name__ == '__main__':
+    main()
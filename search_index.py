@@ -0,0 +1,223 @@
+import argparse
+import bisect
+import re
+import threading
+
+# Applicant search by name / mobile prefix.
+#   - In memory (the local fallback store): ApplicantIndex keeps two sorted lists of
+#     (key, application id) -- every word of the normalized name, and the mobile digits --
+#     so a prefix lookup is a bisect plus a scan over the matches only. The app updates it
+#     record by record on its own writes and rebuilds it when another process changed the
+#     file (see app.py).
+#   - MongoDB: each application stores the same keys under 'search' (search_fields()),
+#     with indexes on search.name_tokens and search.mobile; anchored prefix regexes on
+#     those fields use the index. Results are ordered by name, mobile, id (SORT / sort_key)
+#     in both stores, so merged pages stay stable.
+#
+#   python search_index.py backfill   # add 'search' to Mongo documents written before it existed
+
+MONGO_URI = "mongodb://localhost:27017/loan_db"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+# Mongo sort of search results; sort_key() is the same order for summaries
+SORT = [('search.name', 1), ('search.mobile', 1), ('_id', 1)]
+
+
+def normalize_name(name):
+    return " ".join(str(name or "").lower().split())
+
+
+def normalize_mobile(mobile):
+    return re.sub(r"\D", "", str(mobile or ""))
+
+
+def is_mobile_query(q):
+    return bool(normalize_mobile(q)) and not re.search(r"[A-Za-z]", q)
+
+
+def sort_key(item):
+    """Order of a summary() in merged search results, matching SORT."""
+    return (normalize_name(item.get('name')), normalize_mobile(item.get('mobile')), str(item.get('application_id')))
+
+
+def search_fields(inp):
+    """The 'search' sub-document stored on an application (and indexed in Mongo)."""
+    inp = inp or {}
+    name = normalize_name(inp.get('Name'))
+    return {
+        'name': name,
+        'name_tokens': sorted(set(name.split())),
+        'mobile': normalize_mobile(inp.get('Mobile'))
+    }
+
+
+def summary(app):
+    inp = app.get('input') or {}
+    return {
+        'application_id': str(app.get('_id')),
+        'name': inp.get('Name'),
+        'mobile': inp.get('Mobile'),
+        'status': app.get('status'),
+        'selected_bank': app.get('selected_bank'),
+        'timestamp': app.get('timestamp')
+    }
+
+
+class SortedKeyIndex:
+    """Sorted (key, id) pairs; prefix search is bisect + a scan over the matches."""
+
+    def __init__(self):
+        self._pairs = []
+        self._keys = {}   # id -> keys, for removal
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, item_id, keys):
+        self.remove(item_id)
+        keys = sorted(set(k for k in keys if k))
+        if not keys:
+            return
+        for key in keys:
+            bisect.insort(self._pairs, (key, item_id))
+        self._keys[item_id] = keys
+
+    def remove(self, item_id):
+        for key in self._keys.pop(item_id, ()):
+            i = bisect.bisect_left(self._pairs, (key, item_id))
+            if i < len(self._pairs) and self._pairs[i] == (key, item_id):
+                del self._pairs[i]
+
+    def bulk_load(self, items):
+        """items: iterable of (id, keys); replaces the contents in one sort."""
+        self._keys = {}
+        pairs = []
+        for item_id, keys in items:
+            keys = sorted(set(k for k in keys if k))
+            if keys:
+                self._keys[item_id] = keys
+                pairs.extend((key, item_id) for key in keys)
+        pairs.sort()
+        self._pairs = pairs
+
+    def prefix(self, prefix):
+        """Ids whose key starts with prefix, in key order, each once."""
+        seen = set()
+        i = bisect.bisect_left(self._pairs, (prefix,))
+        while i < len(self._pairs) and self._pairs[i][0].startswith(prefix):
+            item_id = self._pairs[i][1]
+            if item_id not in seen:
+                seen.add(item_id)
+                yield item_id
+            i += 1
+
+
+class ApplicantIndex:
+    """Name-word and mobile prefix index over application summaries."""
+
+    def __init__(self):
+        self.names = SortedKeyIndex()
+        self.mobiles = SortedKeyIndex()
+        self.docs = {}
+        self.stamp = None       # version of the store the index reflects (None = rebuild needed)
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def upsert(self, app):
+        app_id = str(app.get('_id'))
+        fields = search_fields(app.get('input'))
+        with self.lock:
+            self.docs[app_id] = summary(app)
+            self.names.add(app_id, fields['name_tokens'])
+            self.mobiles.add(app_id, [fields['mobile']])
+
+    def remove(self, app_id):
+        app_id = str(app_id)
+        with self.lock:
+            self.docs.pop(app_id, None)
+            self.names.remove(app_id)
+            self.mobiles.remove(app_id)
+
+    def rebuild(self, apps, stamp=None):
+        docs, names, mobiles = {}, [], []
+        for app in apps:
+            if app.get('_id') is None:
+                continue
+            app_id = str(app['_id'])
+            fields = search_fields(app.get('input'))
+            docs[app_id] = summary(app)
+            names.append((app_id, fields['name_tokens']))
+            mobiles.append((app_id, [fields['mobile']]))
+        with self.lock:
+            self.docs = docs
+            self.names.bulk_load(names)
+            self.mobiles.bulk_load(mobiles)
+            self.stamp = stamp
+
+    def search(self, q):
+        """Matching summaries in key order. Every word of a name query has to prefix-match a word."""
+        with self.lock:
+            if is_mobile_query(q):
+                ids = list(self.mobiles.prefix(normalize_mobile(q)))
+            else:
+                words = normalize_name(q).split()
+                if not words:
+                    return []
+                ids = list(self.names.prefix(words[-1]))
+                for word in words[:-1]:
+                    allowed = set(self.names.prefix(word))
+                    ids = [i for i in ids if i in allowed]
+            return [self.docs[i] for i in ids]
+
+
+# --- MongoDB ---
+
+def ensure_mongo_indexes(coll):
+    coll.create_index('search.name_tokens')
+    coll.create_index('search.mobile')
+    coll.create_index(SORT)
+
+
+def mongo_query(q):
+    """Filter for the applications matching q; anchored regexes so the indexes are used."""
+    if is_mobile_query(q):
+        return {'search.mobile': {'$regex': '^' + re.escape(normalize_mobile(q))}}
+    words = normalize_name(q).split()
+    if not words:
+        return None
+    return {'$and': [{'search.name_tokens': {'$regex': '^' + re.escape(w)}} for w in words]}
+
+
+def backfill_mongo(coll, batch_size=1000):
+    from pymongo import UpdateOne
+    ensure_mongo_indexes(coll)
+    ops, done = [], 0
+    for doc in coll.find({'search': {'$exists': False}}, {'input.Name': 1, 'input.Mobile': 1}):
+        ops.append(UpdateOne({'_id': doc['_id']}, {'$set': {'search': search_fields(doc.get('input'))}}))
+        if len(ops) >= batch_size:
+            coll.bulk_write(ops, ordered=False)
+            done += len(ops)
+            ops = []
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+        done += len(ops)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the applicant search fields / indexes in MongoDB.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    backfill = sub.add_parser('backfill')
+    backfill.add_argument('--mongo-uri', default=MONGO_URI)
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+    client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    done = backfill_mongo(client.get_default_database().loan_applications)
+    print(f"Added search fields to {done} applications.")
+
+
+if __name__ == '__main__':
+    main()
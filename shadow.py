@@ -0,0 +1,164 @@
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from quantiles import P2Quantile
+
+# Shadow scoring of candidate models on live traffic.
+# The routes hand a sampled fraction of their encoded inputs to submit() once the response
+# has been sent; a background thread scores each batch with the primary and the candidate
+# model and aggregates agreement, probability deltas and latency in memory. Nothing on the
+# request path waits for the candidate, and when the queue is full samples are dropped.
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_MAX_QUEUE = 5000
+DEFAULT_BATCH = 256
+
+
+def _positive_proba(model, X):
+    if hasattr(model, 'predict_proba'):
+        return np.asarray(model.predict_proba(X), dtype=float)[:, 1]
+    return np.asarray(model.predict(X), dtype=float)
+
+
+class ShadowScorer:
+    def __init__(self, name, get_primary, candidate, features, sample_rate=DEFAULT_SAMPLE_RATE,
+                 threshold=0.5, max_queue=DEFAULT_MAX_QUEUE, batch_size=DEFAULT_BATCH):
+        """
+        Args:
+            get_primary: callable returning the model currently serving the route.
+            candidate: the model under evaluation.
+            features (list): column order of the rows passed to submit().
+        """
+        self.name = name
+        self.get_primary = get_primary
+        self.candidate = candidate
+        self.features = list(features)
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self.sampled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self._reset_counters()
+        self._thread = threading.Thread(target=self._run, name=f"shadow-{name}", daemon=True)
+        self._thread.start()
+
+    def _reset_counters(self):
+        self.scored = 0
+        self.agree = 0
+        self.flip_to_approve = 0
+        self.flip_to_reject = 0
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        self._abs_delta = {p: P2Quantile(p) for p in (0.5, 0.95, 0.99)}
+        self._primary_ms = {p: P2Quantile(p) for p in (0.5, 0.95)}
+        self._candidate_ms = {p: P2Quantile(p) for p in (0.5, 0.95)}
+        self._lag_ms = {p: P2Quantile(p) for p in (0.5, 0.95)}
+
+    def submit(self, row):
+        """Queues one encoded row (dict keyed by feature, or list in `features` order) if sampled."""
+        if random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((row, time.time()))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.sampled += 1
+        return True
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._score(items)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = str(e)
+                print(f"Shadow scoring error ({self.name}): {e}")
+
+    def _score(self, items):
+        rows = [row for row, _ in items]
+        if isinstance(rows[0], dict):
+            X = pd.DataFrame(rows).reindex(columns=self.features, fill_value=0)
+        else:
+            X = pd.DataFrame(rows, columns=self.features)
+
+        start = time.perf_counter()
+        primary = _positive_proba(self.get_primary(), X)
+        primary_ms = (time.perf_counter() - start) * 1000 / len(rows)
+        start = time.perf_counter()
+        candidate = _positive_proba(self.candidate, X)
+        candidate_ms = (time.perf_counter() - start) * 1000 / len(rows)
+
+        now = time.time()
+        delta = candidate - primary
+        primary_yes = primary > self.threshold
+        candidate_yes = candidate > self.threshold
+        with self._lock:
+            self.scored += len(rows)
+            self.agree += int((primary_yes == candidate_yes).sum())
+            self.flip_to_approve += int((~primary_yes & candidate_yes).sum())
+            self.flip_to_reject += int((primary_yes & ~candidate_yes).sum())
+            self.delta_sum += float(delta.sum())
+            self.abs_delta_sum += float(np.abs(delta).sum())
+            self.max_abs_delta = max(self.max_abs_delta, float(np.abs(delta).max()))
+            for d in np.abs(delta):
+                for est in self._abs_delta.values():
+                    est.add(float(d))
+            for est in self._primary_ms.values():
+                est.add(primary_ms)
+            for est in self._candidate_ms.values():
+                est.add(candidate_ms)
+            for _, enqueued_at in items:
+                for est in self._lag_ms.values():
+                    est.add((now - enqueued_at) * 1000)
+
+    def reset(self):
+        with self._lock:
+            self._reset_counters()
+
+    def stats(self):
+        with self._lock:
+            n = self.scored
+            return {
+                'sample_rate': self.sample_rate,
+                'sampled': self.sampled,
+                'dropped': self.dropped,
+                'pending': self._queue.qsize(),
+                'scored': n,
+                'errors': self.errors,
+                'last_error': self.last_error,
+                'agreement_rate': round(self.agree / n, 4) if n else None,
+                'flips': {'reject_to_approve': self.flip_to_approve, 'approve_to_reject': self.flip_to_reject},
+                'probability_delta': {
+                    'mean': round(self.delta_sum / n, 4) if n else None,
+                    'mean_abs': round(self.abs_delta_sum / n, 4) if n else None,
+                    'max_abs': round(self.max_abs_delta, 4),
+                    'abs_p50': self._abs_delta[0.5].value(),
+                    'abs_p95': self._abs_delta[0.95].value(),
+                    'abs_p99': self._abs_delta[0.99].value()
+                },
+                'latency_ms_per_row': {
+                    'primary': {f"p{int(p * 100)}": est.value() for p, est in self._primary_ms.items()},
+                    'candidate': {f"p{int(p * 100)}": est.value() for p, est in self._candidate_ms.items()}
+                },
+                'enqueue_to_scored_ms': {f"p{int(p * 100)}": est.value() for p, est in self._lag_ms.items()}
+            }
@@ -0,0 +1,95 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Startup timing for app.py.
+# Every import and artifact load on the way to "ready" is recorded as a step with its kind
+# ('import', 'artifact', 'init', ...), the thread it ran on and its start offset, so the
+# report separates what blocks the server from answering (the critical path: the main
+# thread up to mark_serving()) from what the warmup thread does in the background.
+#
+#   python app.py --profile-startup
+
+
+class StartupProfile:
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.steps = []
+        self.serving_ms = None
+        self.ready_ms = None
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def record(self, name, kind, ms, offset_ms=None, error=None):
+        step = {
+            'name': name,
+            'kind': kind,
+            'ms': round(ms, 2),
+            'start_ms': round(offset_ms if offset_ms is not None else self.elapsed_ms() - ms, 2),
+            'thread': threading.current_thread().name
+        }
+        if error:
+            step['error'] = error
+        with self._lock:
+            self.steps.append(step)
+
+    @contextmanager
+    def step(self, name, kind='init'):
+        offset = self.elapsed_ms()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.record(name, kind, (time.perf_counter() - start) * 1000, offset, error)
+
+    def timed_import(self, module):
+        """Imports `module` and records the time; an already imported module costs (and records) nothing."""
+        if module in sys.modules:
+            return sys.modules[module]
+        with self.step(module, 'import'):
+            return importlib.import_module(module)
+
+    def mark_serving(self):
+        self.serving_ms = round(self.elapsed_ms(), 2)
+
+    def mark_ready(self):
+        self.ready_ms = round(self.elapsed_ms(), 2)
+
+    def report(self):
+        with self._lock:
+            steps = sorted(self.steps, key=lambda s: s['start_ms'])
+        by_kind = {}
+        for s in steps:
+            by_kind[s['kind']] = round(by_kind.get(s['kind'], 0) + s['ms'], 2)
+        return {
+            'serving_ms': self.serving_ms,
+            'ready_ms': self.ready_ms,
+            'critical_path_ms': round(sum(s['ms'] for s in steps if s['thread'] == 'MainThread'), 2),
+            'background_ms': round(sum(s['ms'] for s in steps if s['thread'] != 'MainThread'), 2),
+            'by_kind': by_kind,
+            'steps': steps
+        }
+
+    def format(self):
+        r = self.report()
+        lines = [
+            f"Serving after {r['serving_ms']} ms, models ready after {r['ready_ms']} ms",
+            f"Critical path (main thread): {r['critical_path_ms']} ms, background warmup: {r['background_ms']} ms",
+            "By kind: " + ", ".join(f"{k} {v} ms" for k, v in sorted(r['by_kind'].items())),
+            "",
+            f"{'start':>9} {'ms':>9}  {'kind':<9} {'thread':<12} name"
+        ]
+        for s in r['steps']:
+            line = f"{s['start_ms']:>9.1f} {s['ms']:>9.1f}  {s['kind']:<9} {s['thread'][:12]:<12} {s['name']}"
+            if 'error' in s:
+                line += f"  [{s['error']}]"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,548 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Shared state for running several app.py instances side by side.
+# The blocked-user list, the fallback application store (used when MongoDB is down) and the
+# shared prediction cache go through one backend:
+#   - FileStateBackend: the existing JSON files, rewritten atomically (temp file + rename) under
+#     an exclusive lock file, so instances on the same host never lose each other's writes.
+#     Blocked users are served from an in-memory set that is reloaded only when the file
+#     changes. The cache is a SQLite table next to the files.
+#   - RedisStateBackend: the same data in Redis for instances on different hosts, one hash
+#     field per application so a write only sends the records it changed.
+#     `redis_client('memory://')` returns MemoryRedis, an in-process stand-in with the
+#     subset of the redis-py API used here, for local testing without a server.
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.join(base_dir, "local_applications.json")
+BLOCKED_FILE = os.path.join(base_dir, "blocked_users.json")
+CACHE_FILE = os.path.join(base_dir, "state_cache.sqlite3")
+DEFAULT_CACHE_TTL = 3600
+CACHE_PURGE_INTERVAL = 300  # seconds between sweeps of expired cache rows
+LOCK_TIMEOUT = 10.0
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+
+class FileLock:
+    """
+    Exclusive lock on '<path>.lock' across processes (fcntl / msvcrt) and threads.
+    Re-entrant within a thread: nested hold() calls reuse the file lock the outer call took
+    (a second flock on a new descriptor would wait for the first one forever).
+    """
+
+    _thread_locks = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        with FileLock._registry_lock:
+            # [lock, depth]: depth is only touched by the thread holding the lock
+            self._state = FileLock._thread_locks.setdefault(self.path, [threading.RLock(), 0])
+
+    @contextmanager
+    def hold(self, timeout=LOCK_TIMEOUT):
+        thread_lock = self._state[0]
+        if not thread_lock.acquire(timeout=timeout):
+            raise TimeoutError(f"could not lock {self.path}")
+        try:
+            if self._state[1]:
+                self._state[1] += 1
+                try:
+                    yield
+                finally:
+                    self._state[1] -= 1
+                return
+            with open(self.path, 'a+') as f:
+                self._lock_file(f, timeout)
+                self._state[1] = 1
+                try:
+                    yield
+                finally:
+                    self._state[1] = 0
+                    self._unlock_file(f)
+        finally:
+            thread_lock.release()
+
+    @staticmethod
+    def _lock_file(f, timeout):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                elif msvcrt:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if time.time() > deadline:
+                    raise TimeoutError(f"could not lock {f.name}")
+                time.sleep(0.01)
+
+    @staticmethod
+    def _unlock_file(f):
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        elif msvcrt:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+
+def _write_json_atomic(path, data, indent=None):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, default=str, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# --- Local files + SQLite ---
+
+class SQLiteCache:
+    """
+    Key/value cache with TTL in one SQLite file, shared by the processes on a host.
+    Expired rows are swept by set() at most every purge_interval seconds.
+    """
+
+    def __init__(self, path=CACHE_FILE, namespace='default', default_ttl=DEFAULT_CACHE_TTL,
+                 purge_interval=CACHE_PURGE_INTERVAL):
+        self.path = path
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.purge_interval = purge_interval
+        self._last_purge = time.time()
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value, expires FROM cache WHERE key = ?", (f"{self.namespace}:{key}",)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (f"{self.namespace}:{key}", json.dumps(value, default=str), time.time() + (ttl or self.default_ttl)))
+        conn.commit()
+        if time.time() - self._last_purge > self.purge_interval:
+            self.purge_expired()
+
+    def purge_expired(self):
+        self._last_purge = time.time()
+        conn = self._conn()
+        deleted = conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),)).rowcount
+        conn.commit()
+        return deleted
+
+
+class FileStateBackend:
+    name = 'file'
+
+    def __init__(self, db_file=DB_FILE, blocked_file=BLOCKED_FILE, cache_file=CACHE_FILE):
+        self.db_file = db_file
+        self.blocked_file = blocked_file
+        self.cache_file = cache_file
+        self._db_lock = FileLock(db_file)
+        self._blocked_lock = FileLock(blocked_file)
+        self._blocked = []
+        self._blocked_set = set()
+        self._blocked_stamp = None
+        self._mem_lock = threading.Lock()
+
+    # --- Blocked users ---
+
+    def _stamp(self, path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def _refresh_blocked(self):
+        stamp = self._stamp(self.blocked_file)
+        with self._mem_lock:
+            if stamp == self._blocked_stamp and self._blocked_stamp is not None:
+                return
+        blocked = _read_json(self.blocked_file, [])
+        with self._mem_lock:
+            self._blocked, self._blocked_set, self._blocked_stamp = blocked, set(blocked), stamp
+
+    def blocked_users(self):
+        self._refresh_blocked()
+        with self._mem_lock:
+            return list(self._blocked)
+
+    def is_blocked(self, user_key):
+        self._refresh_blocked()
+        with self._mem_lock:
+            return user_key in self._blocked_set
+
+    def _modify_blocked(self, fn):
+        with self._blocked_lock.hold():
+            # Re-read under the lock: another instance may have changed the list
+            blocked = _read_json(self.blocked_file, [])
+            if fn(blocked):
+                _write_json_atomic(self.blocked_file, blocked)
+        self._refresh_blocked()
+
+    def add_blocked(self, user_key):
+        def add(blocked):
+            if user_key in blocked:
+                return False
+            blocked.append(user_key)
+            return True
+        self._modify_blocked(add)
+
+    def remove_blocked(self, user_key):
+        def remove(blocked):
+            if user_key not in blocked:
+                return False
+            blocked.remove(user_key)
+            return True
+        self._modify_blocked(remove)
+
+    # --- Fallback application store ---
+
+    def read_applications(self):
+        # Writers replace the file atomically, so a plain read never sees a partial file
+        return _read_json(self.db_file, [])
+
+    def applications_stamp(self):
+        """Changes whenever the store is rewritten (by any process); None if unknown."""
+        return self._stamp(self.db_file)
+
+    def update_applications(self, fn, on_commit=None):
+        """
+        Read-modify-write under the exclusive lock. fn(apps) mutates the list in place and
+        returns (result, changed); the file is rewritten only when changed is true.
+        on_commit(stamp_before, stamp_after) runs while the lock is still held, so in-memory
+        views (the search index) can tell whether they saw every write in between.
+        """
+        with self._db_lock.hold():
+            before = self._stamp(self.db_file)
+            apps = _read_json(self.db_file, [])
+            result, changed = fn(apps)
+            if changed:
+                _write_json_atomic(self.db_file, apps, indent=4)
+            if on_commit:
+                on_commit(before, self._stamp(self.db_file))
+            return result
+
+    def write_applications(self, apps):
+        with self._db_lock.hold():
+            _write_json_atomic(self.db_file, apps, indent=4)
+
+    # --- Cache ---
+
+    def cache(self, namespace, ttl=DEFAULT_CACHE_TTL):
+        return SQLiteCache(self.cache_file, namespace, ttl)
+
+
+# --- Redis ---
+
+class MemoryRedis:
+    """In-process stand-in for redis.Redis(decode_responses=True), limited to the calls used here."""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        exp = self._expires.get(key)
+        if exp is not None and exp < time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = str(value)
+            self._expires.pop(key, None)
+            if ex or px:
+                self._expires[key] = time.time() + (ex if ex else px / 1000.0)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return removed
+
+    def sadd(self, key, *members):
+        with self._lock:
+            s = self._data.setdefault(key, set())
+            before = len(s)
+            s.update(members)
+            return len(s) - before
+
+    def srem(self, key, *members):
+        with self._lock:
+            s = self._data.get(key, set())
+            before = len(s)
+            s.difference_update(members)
+            return before - len(s)
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._data.get(key, set()))
+
+    def sismember(self, key, member):
+        with self._lock:
+            return member in self._data.get(key, set())
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = int(self._data.get(key, 0) if self._alive(key) else 0) + amount
+            self._data[key] = str(value)
+            return value
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self._lock:
+            h = self._data.setdefault(key, {})
+            items = dict(mapping or {})
+            if field is not None:
+                items[field] = value
+            added = sum(1 for f in items if f not in h)
+            h.update({f: str(v) for f, v in items.items()})
+            return added
+
+    def hdel(self, key, *fields):
+        with self._lock:
+            h = self._data.get(key, {})
+            return sum(1 for f in fields if h.pop(f, None) is not None)
+
+    def hmget(self, key, fields):
+        with self._lock:
+            h = self._data.get(key, {})
+            return [h.get(f) for f in fields]
+
+    def zadd(self, key, mapping):
+        with self._lock:
+            z = self._data.setdefault(key, {})
+            added = sum(1 for m in mapping if m not in z)
+            z.update({m: float(score) for m, score in mapping.items()})
+            return added
+
+    def zrem(self, key, *members):
+        with self._lock:
+            z = self._data.get(key, {})
+            return sum(1 for m in members if z.pop(m, None) is not None)
+
+    def zrange(self, key, start, end):
+        with self._lock:
+            members = sorted(self._data.get(key, {}).items(), key=lambda kv: (kv[1], kv[0]))
+            end = len(members) if end == -1 else end + 1
+            return [m for m, _ in members[start:end]]
+
+    def eval(self, script, numkeys, *args):
+        # Only the scripts this module sends are understood
+        if script == UNLOCK_SCRIPT:
+            with self._lock:
+                key, token = args[0], args[1]
+                if self._alive(key) and self._data[key] == token:
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    return 1
+                return 0
+        raise NotImplementedError("MemoryRedis.eval only runs UNLOCK_SCRIPT")
+
+    def ping(self):
+        return True
+
+
+def redis_client(url):
+    if url.startswith('memory://'):
+        return MemoryRedis()
+    import redis
+    return redis.Redis.from_url(url, decode_responses=True, socket_timeout=5)
+
+
+class RedisCache:
+    def __init__(self, client, prefix, default_ttl=DEFAULT_CACHE_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    def get(self, key):
+        raw = self.client.get(f"{self.prefix}:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(f"{self.prefix}:{key}", json.dumps(value, default=str), ex=int(ttl or self.default_ttl))
+
+
+# Deletes the lock only if it still holds our token, in one step (a plain GET then DEL could
+# delete a lock another instance took after ours expired)
+UNLOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisStateBackend:
+    """
+    Applications live in a hash (_id -> JSON) with a sorted set keeping their insertion order,
+    so update_applications() writes only the records fn added, changed or removed. A version
+    counter bumped on every write serves as applications_stamp().
+    """
+    name = 'redis'
+
+    def __init__(self, client, prefix='loan_app'):
+        self.client = client
+        self.prefix = prefix
+        self.blocked_key = f"{prefix}:blocked_users"
+        self.legacy_apps_key = f"{prefix}:applications"  # single JSON blob of older versions
+        self.records_key = f"{prefix}:applications:records"
+        self.order_key = f"{prefix}:applications:order"
+        self.seq_key = f"{prefix}:applications:seq"
+        self.version_key = f"{prefix}:applications:version"
+        self.lock_key = f"{prefix}:applications:lock"
+
+    # --- Blocked users ---
+
+    def blocked_users(self):
+        return sorted(self.client.smembers(self.blocked_key))
+
+    def is_blocked(self, user_key):
+        return bool(self.client.sismember(self.blocked_key, user_key))
+
+    def add_blocked(self, user_key):
+        self.client.sadd(self.blocked_key, user_key)
+
+    def remove_blocked(self, user_key):
+        self.client.srem(self.blocked_key, user_key)
+
+    # --- Fallback application store ---
+
+    def _load(self):
+        """(stored records as {_id: raw JSON} in insertion order, legacy blob or None)."""
+        ids = self.client.zrange(self.order_key, 0, -1)
+        if ids:
+            records = self.client.hmget(self.records_key, ids)
+            return {i: raw for i, raw in zip(ids, records) if raw is not None}, None
+        # Not migrated yet: the next write stores the blob's records one by one and drops it
+        raw = self.client.get(self.legacy_apps_key)
+        return {}, (json.loads(raw) if raw else None)
+
+    def read_applications(self):
+        stored, legacy = self._load()
+        return legacy if legacy is not None else [json.loads(raw) for raw in stored.values()]
+
+    def applications_stamp(self):
+        return int(self.client.get(self.version_key) or 0)
+
+    def _store(self, before, apps):
+        after = {}
+        for app in apps:
+            app.setdefault('_id', str(uuid.uuid4()))
+            after[str(app['_id'])] = json.dumps(app, default=str)
+        changed = {i: raw for i, raw in after.items() if before.get(i) != raw}
+        removed = [i for i in before if i not in after]
+        added = [i for i in after if i not in before]
+        if changed:
+            self.client.hset(self.records_key, mapping=changed)
+        if removed:
+            self.client.hdel(self.records_key, *removed)
+            self.client.zrem(self.order_key, *removed)
+        if added:
+            last = self.client.incr(self.seq_key, len(added))
+            self.client.zadd(self.order_key, {i: last - len(added) + n + 1 for n, i in enumerate(added)})
+        self.client.incr(self.version_key)
+
+    @contextmanager
+    def _locked(self, timeout=LOCK_TIMEOUT):
+        token = uuid.uuid4().hex
+        deadline = time.time() + timeout
+        while not self.client.set(self.lock_key, token, nx=True, px=int(timeout * 1000)):
+            if time.time() > deadline:
+                raise TimeoutError("could not lock the application store")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            # The lock expires on its own if this instance dies; only release our own token
+            self.client.eval(UNLOCK_SCRIPT, 1, self.lock_key, token)
+
+    def update_applications(self, fn, on_commit=None):
+        """Same contract as FileStateBackend.update_applications, under a Redis lock."""
+        with self._locked():
+            before = self.applications_stamp()
+            stored, legacy = self._load()
+            apps = legacy if legacy is not None else [json.loads(raw) for raw in stored.values()]
+            result, changed = fn(apps)
+            if changed:
+                self._store(stored, apps)
+                if legacy is not None:
+                    self.client.delete(self.legacy_apps_key)
+            if on_commit:
+                on_commit(before, self.applications_stamp())
+            return result
+
+    def write_applications(self, apps):
+        with self._locked():
+            self.client.delete(self.records_key, self.order_key, self.legacy_apps_key)
+            self._store({}, list(apps))
+
+    # --- Cache ---
+
+    def cache(self, namespace, ttl=DEFAULT_CACHE_TTL):
+        return RedisCache(self.client, f"{self.prefix}:cache:{namespace}", ttl)
+
+
+def open_backend(kind='file', redis_url=None, prefix='loan_app'):
+    if kind == 'redis':
+        client = redis_client(redis_url or 'redis://localhost:6379/0')
+        client.ping()
+        return RedisStateBackend(client, prefix)
+    return FileStateBackend()
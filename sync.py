@@ -0,0 +1,230 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+import state_backend
+
+# Reconciliation of local_applications.json with MongoDB.
+# Records written to the JSON file while Mongo was down are bulk-upserted into
+# loan_applications, then marked (synced_at / mongo_id) and, after a retention period,
+# dropped from the file. Ids map to stable Mongo keys:
+#   - ObjectId strings (write-behind records) -> the same ObjectId
+#   - UUIDs (local inserts)                   -> ObjectId from the UUID's first 12 bytes,
+#                                                with the UUID kept as `legacy_id`
+# so re-running a pass never duplicates a record and ids already handed to clients keep
+# resolving. A record edited locally after its sync loses synced_at and is synced again;
+# if the Mongo copy has a newer updated_at, Mongo wins.
+#
+#   python sync.py run [--batch-size 500] [--retention-hours 1] [--dry-run]
+#   python sync.py status
+
+MONGO_URI = "mongodb://localhost:27017/loan_db"
+DEFAULT_BATCH = 500
+DEFAULT_RETENTION = 3600.0   # seconds a synced record stays in the JSON file
+DEFAULT_INTERVAL = 30.0
+SYNC_FIELDS = ('synced_at', 'mongo_id')
+
+
+def mongo_key(app_id):
+    """Stable Mongo _id for a local application id."""
+    app_id = str(app_id)
+    if ObjectId.is_valid(app_id):
+        return ObjectId(app_id)
+    try:
+        return ObjectId(uuid.UUID(app_id).bytes[:12])
+    except ValueError:
+        return ObjectId(hashlib.sha1(app_id.encode()).digest()[:12])
+
+
+def id_query(app_id):
+    """Mongo filter matching an application by its Mongo _id or its original local id."""
+    app_id = str(app_id)
+    if ObjectId.is_valid(app_id):
+        return {'_id': ObjectId(app_id)}
+    return {'legacy_id': app_id}
+
+
+def _fingerprint(app):
+    return hashlib.sha1(json.dumps(app, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def to_mongo(app):
+    doc = {k: v for k, v in app.items() if k not in SYNC_FIELDS}
+    doc['_id'] = mongo_key(app['_id'])
+    if not ObjectId.is_valid(str(app['_id'])):
+        doc['legacy_id'] = str(app['_id'])
+    return doc
+
+
+def ensure_indexes(coll):
+    coll.create_index('legacy_id', unique=True, sparse=True)
+
+
+def push_batch(coll, batch):
+    """
+    Upserts local records into Mongo. A record whose Mongo copy has a newer updated_at is
+    left alone (the filter misses, the upsert hits the existing _id -> duplicate key).
+
+    Returns:
+        (written, skipped_as_older)
+    """
+    ops = []
+    for app in batch:
+        doc = to_mongo(app)
+        updated = doc.get('updated_at') or doc.get('timestamp') or ''
+        ops.append(ReplaceOne(
+            {'_id': doc['_id'], '$or': [{'updated_at': {'$exists': False}}, {'updated_at': {'$lte': updated}}]},
+            doc, upsert=True))
+    try:
+        coll.bulk_write(ops, ordered=False)
+        return len(ops), 0
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if errors and all(err.get('code') == 11000 for err in errors):
+            return len(ops) - len(errors), len(errors)
+        raise
+
+
+def sync_once(backend, coll, batch_size=DEFAULT_BATCH, retention=DEFAULT_RETENTION, dry_run=False):
+    """One reconciliation pass. Returns counts for logging / the admin route."""
+    now = datetime.now()
+    apps = backend.read_applications()
+    pending = [a for a in apps if a.get('_id') is not None and not a.get('synced_at')]
+    result = {'local': len(apps), 'pending': len(pending), 'synced': 0, 'mongo_newer': 0, 'pruned': 0}
+    if dry_run:
+        return result
+
+    if pending:
+        ensure_indexes(coll)
+    synced = {}
+    for i in range(0, len(pending), batch_size):
+        batch = pending[i:i + batch_size]
+        written, skipped = push_batch(coll, batch)
+        result['synced'] += written
+        result['mongo_newer'] += skipped
+        for app in batch:
+            synced[str(app['_id'])] = (_fingerprint(app), str(mongo_key(app['_id'])))
+
+    cutoff = (now - timedelta(seconds=retention)).isoformat()
+    stamp = now.isoformat()
+
+    def mark_and_prune(current):
+        changed = False
+        kept = []
+        pruned = 0
+        for app in current:
+            entry = synced.get(str(app.get('_id')))
+            # Only mark what was pushed unchanged; a record edited meanwhile goes in the next pass
+            if entry and not app.get('synced_at') and _fingerprint(app) == entry[0]:
+                app['synced_at'] = stamp
+                app['mongo_id'] = entry[1]
+                changed = True
+            if app.get('synced_at') and str(app['synced_at']) < cutoff:
+                pruned += 1
+                changed = True
+                continue
+            kept.append(app)
+        current[:] = kept
+        return pruned, changed
+
+    result['pruned'] = backend.update_applications(mark_and_prune)
+    return result
+
+
+class Reconciler:
+    """Runs sync_once every `interval` seconds on a daemon thread."""
+
+    def __init__(self, backend, get_collection, interval=DEFAULT_INTERVAL, batch_size=DEFAULT_BATCH,
+                 retention=DEFAULT_RETENTION):
+        self.backend = backend
+        self.get_collection = get_collection
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retention = retention
+        self.runs = 0
+        self.errors = 0
+        self.last_result = None
+        self.last_error = None
+        self.last_run_at = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="json-mongo-sync", daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        self._wake.set()
+
+    def run_once(self):
+        with self._lock:
+            try:
+                result = sync_once(self.backend, self.get_collection(), self.batch_size, self.retention)
+                self.last_result, self.last_error = result, None
+                if result['synced'] or result['pruned']:
+                    print(f"JSON -> Mongo sync: {result}")
+                return result
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                raise
+            finally:
+                self.runs += 1
+                self.last_run_at = datetime.now().isoformat()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"JSON -> Mongo sync failed (will retry): {e}")
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'errors': self.errors,
+            'last_run_at': self.last_run_at,
+            'last_result': self.last_result,
+            'last_error': self.last_error
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync fallback records from local_applications.json into MongoDB.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run')
+    run.add_argument('--batch-size', type=int, default=DEFAULT_BATCH)
+    run.add_argument('--retention-hours', type=float, default=DEFAULT_RETENTION / 3600)
+    run.add_argument('--dry-run', action='store_true')
+    status = sub.add_parser('status')
+    for p in (run, status):
+        p.add_argument('--mongo-uri', default=MONGO_URI)
+    args = parser.parse_args()
+
+    backend = state_backend.FileStateBackend()
+    if args.command == 'status':
+        apps = backend.read_applications()
+        synced = sum(1 for a in apps if a.get('synced_at'))
+        print(json.dumps({'local': len(apps), 'synced': synced, 'pending': len(apps) - synced}, indent=2))
+        return
+
+    from pymongo import MongoClient
+    client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    start = time.perf_counter()
+    result = sync_once(backend, client.get_default_database().loan_applications,
+                       args.batch_size, args.retention_hours * 3600, args.dry_run)
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
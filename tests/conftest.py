@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The modules live at the repository root and, like app.py sets up, in the two model directories
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+for _models_dir in ("ML model", "officer models"):
+    if os.path.join(ROOT, _models_dir) not in sys.path:
+        sys.path.append(os.path.join(ROOT, _models_dir))
+
+# Importing app.py must not start the warmup, the JSON -> Mongo reconciler or the Mongo check,
+# nor create stores next to the real ones; the fixtures below point everything at tmp_path
+_scratch = tempfile.mkdtemp(prefix="loan-app-tests-")
+os.environ.setdefault("WARMUP_ON_IMPORT", "0")
+os.environ.setdefault("SYNC_INTERVAL", "0")
+os.environ.setdefault("ARCHIVE_DIR", os.path.join(_scratch, "archive"))
+os.environ.setdefault("ROLLUP_FILE", os.path.join(_scratch, "rollups.sqlite3"))
+
+import state_backend
+
+
+class NoMongo:
+    """Stands in for flask_pymongo.PyMongo: every access fails like an unreachable server."""
+
+    @property
+    def db(self):
+        raise Exception("no MongoDB in tests")
+
+    @property
+    def cx(self):
+        raise Exception("no MongoDB in tests")
+
+
+class FakeMongo:
+    """flask_pymongo.PyMongo over a mongomock database."""
+
+    def __init__(self, db):
+        self.db = db
+        self.cx = db.client
+
+
+def file_backend(directory):
+    return state_backend.FileStateBackend(
+        db_file=str(directory / "local_applications.json"),
+        blocked_file=str(directory / "blocked_users.json"),
+        cache_file=str(directory / "state_cache.sqlite3"))
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    app = pytest.importorskip("app")
+    app.mongo = NoMongo()
+    return app
+
+
+@pytest.fixture(scope="session")
+def warm_app(app_module):
+    """app.py with the models loaded (synchronously, on the first test that needs them)."""
+    pytest.importorskip("xgboost")
+    if not app_module.models_ready.is_set():
+        app_module.warm_up()
+    if app_module.officer_prediction is None:
+        pytest.skip("officer models not loaded")
+    return app_module
+
+
+@pytest.fixture
+def app_state(app_module, tmp_path, monkeypatch):
+    """Fresh fallback store, rollups and in-memory views for one test; returns the store."""
+    import fraud_links
+    import rollups
+    import search_index
+    store = file_backend(tmp_path)
+    monkeypatch.setattr(app_module, "state_store", store)
+    monkeypatch.setattr(app_module, "rollup_store", rollups.SQLiteRollups(str(tmp_path / "rollups.sqlite3")))
+    monkeypatch.setattr(app_module, "_local_pending", {'stamp': None, 'records': []})
+    monkeypatch.setattr(app_module, "applicant_index", search_index.ApplicantIndex())
+    monkeypatch.setattr(app_module, "fraud_graph", fraud_links.FraudLinkGraph())
+    monkeypatch.setattr(app_module, "write_buffer", None)
+    return store
+
+
+@pytest.fixture
+def mongo_db(app_module, monkeypatch):
+    """Points app.py at an in-memory mongomock database for one test."""
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient().loan_db
+    monkeypatch.setattr(app_module, "mongo", FakeMongo(db))
+    return db
@@ -0,0 +1,89 @@
+import threading
+
+import admission
+
+
+def test_route_limiter_rejects_past_the_queue():
+    limiter = admission.RouteLimiter('predict', 1, 1, 0.2)
+    assert limiter.acquire()
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+    waiter.start()
+    while limiter.stats()['waiting'] == 0:
+        pass
+    assert not limiter.acquire()  # the one queue place is taken
+    limiter.release()
+    waiter.join()
+    assert results == [True]
+    limiter.release()
+
+    stats = limiter.stats()
+    assert stats['admitted'] == 2
+    assert stats['queued'] == 1
+    assert stats['rejected_queue_full'] == 1
+    assert stats['in_flight'] == 0
+
+
+def test_route_limiter_times_out_in_the_queue():
+    limiter = admission.RouteLimiter('predict', 1, 1, 0.05)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    assert limiter.stats()['rejected_timeout'] == 1
+    limiter.release()
+
+
+def test_client_rate_limiter_buckets_are_per_key():
+    limiter = admission.ClientRateLimiter(rate=0.001, burst=2)
+    assert limiter.allow('10.0.0.1')[0]
+    assert limiter.allow('10.0.0.1')[0]
+    allowed, retry_after = limiter.allow('10.0.0.1')
+    assert not allowed and retry_after >= 1
+    assert limiter.allow('10.0.0.2')[0]
+    assert limiter.stats()['tracked_clients'] == 2
+
+
+def test_client_rate_limiter_evicts_oldest_keys():
+    limiter = admission.ClientRateLimiter(rate=1, burst=1, max_keys=2)
+    for key in ('a', 'b', 'c'):
+        limiter.allow(key)
+    assert limiter.stats()['tracked_clients'] == 2
+    assert limiter.allow('a')[0]  # evicted, so it starts with a full bucket again
+
+
+def test_predict_limits_by_client_address_without_name_or_mobile(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'client_limiter', admission.ClientRateLimiter(rate=0.001, burst=1))
+    monkeypatch.setitem(app_module.route_limiters, 'predict', admission.RouteLimiter('predict', 4, 4, 0.1))
+    handler = app_module.admission_controlled('predict', per_client=True)(lambda: 'ok')
+
+    def call(addr):
+        # The real /predict form: no Name / Mobile in the body
+        with app_module.app.test_request_context('/predict', method='POST', json={'age': 30},
+                                                 environ_base={'REMOTE_ADDR': addr}):
+            return handler()
+
+    assert call('10.0.0.1') == 'ok'
+    res = call('10.0.0.1')
+    assert res[1] == 429 and 'Retry-After' in res[2]
+    assert call('10.0.0.2') == 'ok'
+
+
+def test_officer_routes_are_not_rate_limited_per_client(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'client_limiter', admission.ClientRateLimiter(rate=0.001, burst=1))
+    monkeypatch.setitem(app_module.route_limiters, 'officer_predict',
+                        admission.RouteLimiter('officer_predict', 4, 4, 0.1))
+    handler = app_module.admission_controlled('officer_predict')(lambda: 'ok')
+    for _ in range(3):
+        with app_module.app.test_request_context('/officer_predict', method='POST', json={}):
+            assert handler() == 'ok'
+    assert app_module.client_limiter.stats()['tracked_clients'] == 0
+
+
+def test_admin_users_still_groups_by_name_and_mobile(app_module, app_state):
+    app_state.write_applications([
+        {'_id': 'a', 'input': {'Name': 'sai', 'Mobile': '8989323277'}, 'status': 'applied'},
+        {'_id': 'b', 'input': {'Name': 'sai', 'Mobile': '8989323277'}, 'status': 'approved'},
+    ])
+    app_state.add_blocked('sai|8989323277')
+    users = app_module.app.test_client().get('/admin/users').get_json()
+    assert users == [{'name': 'sai', 'mobile': '8989323277', 'applications': 2,
+                      'last_status': 'approved', 'is_blocked': True}]
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import archive
+from conftest import file_backend
+
+NOW = datetime(2026, 6, 1)
+
+
+def days_ago(n):
+    return (NOW - timedelta(days=n)).isoformat()
+
+
+def test_archive_mongo_pages_past_rows_dropped_by_the_recheck(tmp_path):
+    mongomock = pytest.importorskip('mongomock')
+    coll = mongomock.MongoClient().db.loan_applications
+    docs = []
+    # Lowest _ids: a full page the Mongo filter selects but is_archivable() rejects
+    # (unparseable timestamps), which must not end the run
+    docs += [{'_id': i, 'timestamp': '2020-01-01 sometime', 'status': 'applied'} for i in range(4)]
+    docs += [{'_id': 10 + i, 'timestamp': days_ago(400), 'status': 'applied'} for i in range(5)]
+    docs += [{'_id': 20 + i, 'timestamp': days_ago(60), 'status': 'rejected'} for i in range(5)]
+    docs += [{'_id': 30 + i, 'timestamp': days_ago(5), 'status': 'approved'} for i in range(3)]
+    docs += [{'_id': 40 + i, 'timestamp': days_ago(400), 'applied_at': days_ago(2), 'status': 'applied'}
+             for i in range(3)]
+    coll.insert_many(docs)
+    expected = {d['_id'] for d in docs if archive.is_archivable(d, NOW, 180, 30)}
+    assert len(expected) == 10
+
+    cold = archive.open_archive('files', str(tmp_path))
+    moved = archive.archive_mongo(coll, cold, NOW, 180, 30, batch_size=4)
+
+    assert moved == len(expected)
+    assert {d['_id'] for d in coll.find()} == {d['_id'] for d in docs} - expected
+    assert all(cold.contains(i) for i in expected)
+    assert {r['_id'] for r in cold.iter_records()} == expected
+
+
+def local_apps():
+    return [
+        {'_id': 'old', 'timestamp': days_ago(400), 'status': 'applied'},
+        {'_id': 'done', 'timestamp': days_ago(60), 'status': 'approved'},
+        {'_id': 'fresh', 'timestamp': days_ago(5), 'status': 'predicted'},
+    ]
+
+
+class CountingArchive:
+    def __init__(self, cold):
+        self.cold = cold
+        self.lookups = 0
+
+    def contains_many(self, app_ids):
+        self.lookups += 1
+        return self.cold.contains_many(app_ids)
+
+    def write(self, records):
+        return self.cold.write(records)
+
+
+def test_archive_local_moves_archivable_and_checks_membership_per_batch(tmp_path):
+    backend = file_backend(tmp_path)
+    backend.write_applications(local_apps() + [{'_id': f'new{i}', 'timestamp': days_ago(1)} for i in range(5)])
+    cold = CountingArchive(archive.open_archive('files', str(tmp_path / 'archive')))
+
+    assert archive.archive_local(backend, cold, NOW, 180, 30, batch_size=4) == 2
+    assert cold.lookups == 2  # 8 applications in batches of 4, not one lookup each
+    assert {a['_id'] for a in backend.read_applications()} == {'fresh'} | {f'new{i}' for i in range(5)}
+    assert cold.cold.get('done')['status'] == 'approved'
+
+
+def test_archive_local_drops_records_an_interrupted_run_already_copied(tmp_path):
+    backend = file_backend(tmp_path)
+    backend.write_applications(local_apps())
+    cold = archive.open_archive('files', str(tmp_path / 'archive'))
+    cold.write([local_apps()[0]])  # copied, then the run died before deleting it
+
+    assert archive.archive_local(backend, cold, NOW, 180, 30) == 2
+    assert [a['_id'] for a in backend.read_applications()] == ['fresh']
+    assert cold.count() == 2
+
+
+def test_file_index_is_appended_and_picked_up_by_other_readers(tmp_path):
+    writer = archive.open_archive('files', str(tmp_path))
+    reader = archive.open_archive('files', str(tmp_path))
+    writer.write([{'_id': 'a'}, {'_id': 'b'}])
+    assert reader.contains_many(['a', 'b', 'c']) == {'a', 'b'}
+
+    size = (tmp_path / 'index.log').stat().st_size
+    assert writer.write([{'_id': 'b'}, {'_id': 'c'}]) == 1  # 'b' is already archived
+    lines = (tmp_path / 'index.log').read_text().splitlines()
+    assert len(lines) == 3 and (tmp_path / 'index.log').stat().st_size > size
+    assert reader.contains('c')
+    assert {r['_id'] for r in reader.iter_records()} == {'a', 'b', 'c'}
+
+
+def test_file_index_survives_a_torn_line_and_reads_legacy_index(tmp_path):
+    first = archive.open_archive('files', str(tmp_path))
+    first.write([{'_id': 'a'}])
+    segment = first._load_index()['a']
+    (tmp_path / 'index.json').write_text('{"legacy": "%s"}' % segment)
+    with open(tmp_path / 'index.log', 'a') as f:
+        f.write('["half-writ')
+
+    cold = archive.open_archive('files', str(tmp_path))
+    assert cold.contains_many(['a', 'legacy']) == {'a', 'legacy'}
+    cold.write([{'_id': 'b'}])
+    again = archive.open_archive('files', str(tmp_path))
+    assert again.contains_many(['a', 'b', 'legacy']) == {'a', 'b', 'legacy'}
+
+
+def test_mongo_archive_membership_in_one_query():
+    mongomock = pytest.importorskip('mongomock')
+    from bson.objectid import ObjectId
+    db = mongomock.MongoClient().db
+    cold = archive.open_archive('mongo', get_db=lambda: db)
+    oid = ObjectId()
+    db.loan_applications_archive.insert_many([{'_id': oid}, {'_id': 'uuid-1'}])
+    assert cold.contains_many([str(oid), 'uuid-1', 'uuid-2']) == {str(oid), 'uuid-1'}
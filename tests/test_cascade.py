@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+FORM = {
+    'age': 45, 'gender': 'Male', 'maritalStatus': 'Married', 'dependents': '1',
+    'education': 'Graduate', 'area': 'Urban', 'selfEmployed': 'Yes', 'experience': 7,
+    'applicantIncome': 88000, 'coApplicantIncome': 66000, 'salaryMode': 'Bank Transfer',
+    'existingEmi': 2000, 'assets': 'House + Land', 'loanPurpose': 'Asset Purchase',
+    'loanAmount': 140000, 'tenure': '36', 'Hidden_CIBIL': 760, 'Approved_Bank': 3
+}
+
+
+@pytest.fixture
+def officer(warm_app, monkeypatch):
+    module = warm_app.officer_prediction
+    monkeypatch.setattr(module, 'prediction_cache', module.PredictionCache())
+    monkeypatch.setattr(module, 'cascade_counts', dict.fromkeys(module.cascade_counts, 0))
+    return module
+
+
+def test_vectorized_rules_match_the_per_row_rules(officer):
+    rng = np.random.default_rng(0)
+    n = 300
+    df = pd.DataFrame({feat: np.zeros(n) for feat in officer.INPUT_FIELDS})
+    df['Approved_Bank'] = rng.integers(-1, 10, n)
+    df['Hidden_CIBIL'] = rng.integers(500, 850, n)
+    df['ApplicantIncome'] = rng.integers(0, 120000, n)
+    df['Existing_EMI'] = rng.integers(0, 60000, n)
+    df['Work_Experience_Years'] = rng.integers(0, 10, n)
+    df['LoanAmount'] = rng.integers(10000, 2000000, n)
+    df['Loan_Amount_Term'] = rng.choice([12, 24, 36, 60], n)
+    df['Salary_Payment_Mode'] = rng.integers(0, 2, n)
+
+    rules = officer.rule_predictions(df)
+    for i, row in df.iterrows():
+        assert rules['Officer_Approved_Rule'][i] == officer.officer_approval(row)
+        assert rules['Fraud_Label_Rule'][i] == officer.fraud_label(row)
+        assert rules['Eligible_Loan_Amount_Rule'][i] == pytest.approx(officer.eligible_loan_amount(row))
+
+
+def test_skip_mode_takes_the_rules_for_clear_cut_cases(officer, monkeypatch):
+    monkeypatch.setattr(officer, 'CASCADE_MODE', 'skip')
+    low_cibil, no_bank, normal = dict(FORM, Hidden_CIBIL=550), dict(FORM, Approved_Bank=-1), dict(FORM)
+    results = officer.officer_predict_batch([low_cibil, no_bank, normal])
+
+    assert [r['Decision_Path'] for r in results] == ['rules:cibil_below_600', 'rules:no_bank', 'models']
+    for result in results[:2]:
+        assert result['Officer_Approved_Model'] == result['Officer_Approved_Rule']
+        assert result['Fraud_Label_Model'] == result['Fraud_Label_Rule']
+    stats = officer.cascade_stats()
+    assert (stats['models'], stats['rules'], stats['mode']) == (1, 2, 'skip')
+
+
+def test_off_mode_runs_the_models_for_every_row(officer):
+    results = officer.officer_predict_batch([dict(FORM, Hidden_CIBIL=550), dict(FORM)])
+    assert [r['Decision_Path'] for r in results] == ['models', 'models']
+    assert officer.cascade_stats()['rules'] == 0
+
+
+def test_cascade_mode_is_part_of_the_cache_key(officer, monkeypatch):
+    row = officer.encode_row(dict(FORM, Hidden_CIBIL=550))
+    off_key = officer.score_keys([row])[0]
+    monkeypatch.setattr(officer, 'CASCADE_MODE', 'skip')
+    assert officer.score_keys([row])[0] != off_key
+
+
+def test_defer_mode_answers_with_the_rules_and_scores_later(officer, monkeypatch):
+    monkeypatch.setattr(officer, 'CASCADE_MODE', 'defer')
+    low_cibil = dict(FORM, Hidden_CIBIL=550)
+    assert officer.officer_predict(low_cibil)['Decision_Path'] == 'deferred:cibil_below_600'
+
+    deadline = time.time() + 10
+    while officer.cascade_stats()['deferred_scored'] < 1 and time.time() < deadline:
+        time.sleep(0.02)
+    assert officer.cascade_stats()['deferred'] == 1
+    assert officer.officer_predict(low_cibil)['Decision_Path'] == 'models'
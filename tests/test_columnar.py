@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+
+import pytest
+
+import columnar
+
+BANKS = ['Axis Bank', 'HDFC Bank', None]
+STATUSES = ['predicted', 'applied', 'Approved', 'rejected']
+
+
+def applications(n, seed=0):
+    rng = random.Random(seed)
+    apps = []
+    for i in range(n):
+        apps.append({
+            '_id': f'app-{i}',
+            'input': {'age': rng.randint(21, 60), 'loanAmount': str(rng.randint(1, 50) * 10000),
+                      'selfEmployed': rng.choice(['Yes', 'No', '']), 'area': rng.choice(['Urban', 'Rural'])},
+            'status': rng.choice(STATUSES),
+            'selected_bank': rng.choice(BANKS),
+            'timestamp': f'2026-10-{rng.randint(1, 28):02d}T10:00:00'
+        })
+    return apps
+
+
+@pytest.fixture
+def snapshot():
+    snap = columnar.ColumnarSnapshot({'selfEmployed': {'No': 0, 'Yes': 1}})
+    snap.rebuild(applications(3000))  # past the initial capacity
+    return snap
+
+
+def test_filters_match_a_row_by_row_scan(snapshot):
+    apps = applications(3000)
+    expected = [a['_id'] for a in apps
+                if a['input']['selfEmployed'] == 'Yes' and a['input']['age'] >= 40
+                and a['status'].lower() in ('approved', 'rejected')
+                and a['timestamp'] >= '2026-10-15']
+    result = snapshot.query({'selfEmployed': 'Yes', 'age': {'gte': 40}, 'status': ['approved', 'rejected'],
+                             'timestamp': {'gte': '2026-10-15'}}, limit=len(apps))
+    assert result['count'] == len(expected)
+    assert result['application_ids'] == expected
+
+
+def test_group_by_counts_and_aggregates(snapshot):
+    apps = applications(3000)
+    result = snapshot.query(group_by=['selected_bank'], agg={'loanAmount': 'mean'})
+    counts = Counter(a['selected_bank'] for a in apps)
+    assert {g['selected_bank']: g['count'] for g in result['groups']} == counts
+    axis = [float(a['input']['loanAmount']) for a in apps if a['selected_bank'] == 'Axis Bank']
+    [group] = [g for g in result['groups'] if g['selected_bank'] == 'Axis Bank']
+    assert group['mean_loanAmount'] == pytest.approx(sum(axis) / len(axis), abs=1e-3)
+
+
+def test_upsert_updates_in_place_and_appends(snapshot):
+    snapshot.upsert({'_id': 'app-0', 'input': {'age': 99}, 'status': 'fraud'})
+    snapshot.upsert({'_id': 'new', 'input': {'age': 99}, 'status': 'fraud', 'selected_bank': 'Kotak'})
+    assert len(snapshot) == 3001
+    result = snapshot.query({'age': 99}, limit=10)
+    assert result['application_ids'] == ['app-0', 'new']
+    assert snapshot.query({'selected_bank': 'Kotak'})['count'] == 1
+
+
+def test_synced_copy_is_the_same_row():
+    snap = columnar.ColumnarSnapshot()
+    snap.rebuild([{'_id': 'uuid-1', 'status': 'applied'},
+                  {'_id': '65a0c0ffee', 'legacy_id': 'uuid-1', 'status': 'approved'}])
+    assert len(snap) == 1
+    snap.upsert({'_id': '65a0c0ffee', 'legacy_id': 'uuid-1', 'status': 'approved'})
+    assert snap.query({'status': 'approved'}, limit=5)['application_ids'] == ['uuid-1']
+
+
+def test_unknown_values_match_nothing_and_bad_queries_raise(snapshot):
+    assert snapshot.query({'selected_bank': 'No Such Bank'})['count'] == 0
+    with pytest.raises(columnar.QueryError):
+        snapshot.query({'nope': 1})
+    with pytest.raises(columnar.QueryError):
+        snapshot.query({'area': {'gt': 'Urban'}})
+    with pytest.raises(columnar.QueryError):
+        snapshot.query({'age': 'old'})
+    with pytest.raises(columnar.QueryError):
+        snapshot.query(group_by=['age'])
@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import compact_model
+
+pytest.importorskip('xgboost')
+joblib = pytest.importorskip('joblib')
+pd = pytest.importorskip('pandas')
+
+OFFICER = os.path.join(compact_model.officer_dir, "officer_level_dataset.csv")
+
+
+@pytest.fixture(scope='module')
+def officer_rows():
+    return pd.read_csv(OFFICER, nrows=400)
+
+
+@pytest.mark.parametrize('filename', ["officer_approval_model.pkl", "fraud_detection_model.pkl"])
+def test_committed_classifier_artifacts_match_the_pickles(filename, officer_rows):
+    path = os.path.join(compact_model.officer_dir, filename)
+    original = joblib.load(path)
+    compact = compact_model.CompactTreeModel.load(compact_model.compact_path(path))
+    X = officer_rows[list(original.get_booster().feature_names)]
+    np.testing.assert_allclose(compact.predict_proba(X), original.predict_proba(X), atol=1e-5)
+    assert (compact.predict(X) == original.predict(X)).all()
+
+
+def test_committed_regressor_artifact_matches_the_pickle(officer_rows):
+    path = os.path.join(compact_model.officer_dir, "loan_amount_model.pkl")
+    original = joblib.load(path)
+    compact = compact_model.CompactTreeModel.load(compact_model.compact_path(path))
+    X = officer_rows[list(original.get_booster().feature_names)]
+    np.testing.assert_allclose(compact.predict(X), original.predict(X), rtol=1e-4, atol=1.0)
+
+
+def test_pruning_keeps_predictions_within_tolerance(officer_rows):
+    original = joblib.load(os.path.join(compact_model.officer_dir, "officer_approval_model.pkl"))
+    X = officer_rows[list(original.get_booster().feature_names)]
+    compact, stats = compact_model.compact_model(original, 0.01, calibration=X.to_numpy())
+    assert stats['trees_out'] < stats['trees_in']
+    assert (compact.predict(X) == original.predict(X)).all()
+
+
+def entry(single=(2.0, 0.5), agreement=1.0):
+    return {'prediction_agreement': agreement,
+            'latency_ms': {'single_original': single[0], 'single_compact': single[1],
+                           'batch1000_original': 5.0, 'batch1000_compact': 30.0}}
+
+
+def test_worthwhile_gates_on_single_row_latency_and_fidelity():
+    assert compact_model.worthwhile(entry())
+    assert not compact_model.worthwhile(entry(single=(0.5, 2.0)))
+    assert not compact_model.worthwhile(entry(agreement=0.98))
+    regression = {'mean_abs_diff': 0.3, 'mae_original': 20000.0, 'latency_ms': entry()['latency_ms']}
+    assert compact_model.worthwhile(regression)
+    assert not compact_model.worthwhile(dict(regression, mean_abs_diff=500.0))
+
+
+def test_compact_enabled_reads_the_report(tmp_path):
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps({'models': {'a.pkl': {'use_compact': True}, 'b.pkl': {'use_compact': False}}}))
+    assert compact_model.compact_enabled("/models/a.pkl", str(report))
+    assert not compact_model.compact_enabled("/models/b.pkl", str(report))
+    assert not compact_model.compact_enabled("/models/c.pkl", str(report))
+    assert not compact_model.compact_enabled("/models/a.pkl", str(tmp_path / "missing.json"))
+
+
+def test_every_artifact_the_report_enables_is_committed():
+    with open(compact_model.REPORT_FILE) as f:
+        models = json.load(f)['models']
+    dirs = {filename: directory for filename, directory, _, _ in compact_model.MODELS}
+    for filename, info in models.items():
+        path = compact_model.compact_path(os.path.join(dirs[filename], filename))
+        assert os.path.exists(path) == bool(info['use_compact']), filename
@@ -0,0 +1,68 @@
+import csv
+import random
+
+import pytest
+
+import drift_monitor
+from quantiles import P2Quantile
+
+
+@pytest.mark.parametrize('p', [0.1, 0.5, 0.9, 0.99])
+def test_p2_quantile_tracks_the_exact_quantile(p):
+    rng = random.Random(7)
+    values = [rng.gauss(100, 15) for _ in range(20000)]
+    est = P2Quantile(p)
+    for v in values:
+        est.add(v)
+    exact = drift_monitor.exact_quantile(sorted(values), p)
+    assert est.value() == pytest.approx(exact, abs=1.5)
+
+
+def test_p2_quantile_with_fewer_than_five_values():
+    est = P2Quantile(0.5)
+    assert est.value() is None
+    for v in (3, 1, 2):
+        est.add(v)
+    assert est.value() == 2
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    rng = random.Random(1)
+    path = tmp_path / "train.csv"
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Income', 'Area'])
+        for _ in range(5000):
+            writer.writerow([round(rng.gauss(50000, 8000)), rng.choice([0, 1, 2])])
+    return drift_monitor.build_baseline(str(path), ['Income', 'Area'])
+
+
+def test_low_cardinality_feature_gets_one_bin_per_value(baseline):
+    assert baseline['Area']['edges'] == [0.5, 1.5]
+    assert len(baseline['Income']['edges']) == drift_monitor.DEFAULT_BINS - 1
+
+
+def test_same_distribution_is_stable_and_a_shift_is_drift(baseline):
+    rng = random.Random(2)
+    monitor = drift_monitor.DriftMonitor('test', ['Income', 'Area'], baseline)
+    for _ in range(2000):
+        monitor.observe({'Income': rng.gauss(50000, 8000), 'Area': rng.choice([0, 1, 2])})
+    report = monitor.report(force=True)
+    assert report['features']['Income']['status'] == 'stable'
+    assert report['features']['Area']['status'] == 'stable'
+    assert report['drifted_features'] == []
+
+    monitor.reset()
+    for _ in range(2000):
+        monitor.observe([rng.gauss(65000, 8000), 2])
+    report = monitor.report(force=True)
+    assert report['drifted_features'] == ['Area', 'Income']
+    assert report['features']['Income']['live_quantiles']['0.5'] == pytest.approx(65000, rel=0.02)
+
+
+def test_report_waits_for_enough_samples(baseline):
+    monitor = drift_monitor.DriftMonitor('test', ['Income'], baseline)
+    for _ in range(drift_monitor.MIN_SAMPLES - 1):
+        monitor.observe({'Income': 90000})
+    assert monitor.report(force=True)['features']['Income']['status'] == 'insufficient_data'
@@ -0,0 +1,81 @@
+import fraud_links
+
+FORM = {
+    'age': 45, 'gender': 'Male', 'maritalStatus': 'Married', 'dependents': '1',
+    'education': 'Graduate', 'area': 'Urban', 'selfEmployed': 'Yes', 'experience': 7,
+    'applicantIncome': 88000, 'coApplicantIncome': 66000, 'salaryMode': 'Bank Transfer',
+    'existingEmi': 2000, 'assets': 'House + Land', 'loanPurpose': 'Asset Purchase',
+    'loanAmount': 140000, 'tenure': '36'
+}
+
+
+def application(app_id, name=None, mobile=None, bank=None, **form):
+    inp = dict(FORM, **form)
+    if name is not None:
+        inp['Name'] = name
+    if mobile is not None:
+        inp['Mobile'] = mobile
+    return {'_id': app_id, 'input': inp, 'selected_bank': bank, 'status': 'predicted',
+            'timestamp': '2026-10-01T10:00:00'}
+
+
+def test_apply_after_predict_is_one_applicant_not_a_ring():
+    graph = fraud_links.FraudLinkGraph()
+    graph.add(application('a1'))  # /predict: the form has no Name / Mobile yet
+    graph.add(application('a1', 'John Doe', '9876543210', bank='Axis Bank'))  # /apply
+
+    info = graph.cluster_of('a1')
+    assert info['applicants'] == 1
+    assert info['near_duplicate_groups'] == 0
+    assert not info['is_ring']
+    assert info['members'][0]['name'] == 'John Doe'
+    assert graph.clusters() == []
+
+
+def test_renamed_application_drops_its_old_name():
+    graph = fraud_links.FraudLinkGraph()
+    graph.add(application('a1', 'Jon Doe', '9876543210'))
+    graph.add(application('a1', 'John Doe', '9876543210'))
+    info = graph.cluster_of('a1')
+    assert info['applicants'] == 1
+    assert info['shared_mobiles'] == {}
+
+
+def test_one_mobile_under_two_names_is_a_ring():
+    graph = fraud_links.FraudLinkGraph()
+    graph.add(application('a1', 'John Doe', '9876543210', bank='Axis Bank', applicantIncome=20000))
+    graph.add(application('a2', 'Ravi Kumar', '98765 43210', bank='HDFC Bank', loanAmount=900000))
+
+    [ring] = graph.clusters()
+    assert ring['applicants'] == 2
+    assert ring['shared_mobiles'] == {'9876543210': ['john doe', 'ravi kumar']}
+    assert set(ring['reasons']) == {'shared_mobile', 'multiple_banks'}
+
+
+def test_near_identical_forms_of_different_applicants_are_a_ring():
+    graph = fraud_links.FraudLinkGraph()
+    graph.add(application('a1', 'John Doe', '9876543210'))
+    graph.add(application('a2', 'Ravi Kumar', '9123456780', applicantIncome=89000))
+
+    [ring] = graph.clusters()
+    assert ring['reasons'] == ['near_duplicate_forms']
+
+
+def test_forms_without_name_or_mobile_are_not_applicants():
+    graph = fraud_links.FraudLinkGraph()
+    graph.add(application('a1'))
+    graph.add(application('a2'))
+    graph.add(application('a3', 'John Doe', '9876543210'))
+    info = graph.cluster_of('a1')
+    assert info['applications'] == 3  # linked by the fingerprint ...
+    assert info['applicants'] == 1    # ... but only one applicant is known
+    assert not info['is_ring']
+
+
+def test_rebuild_keeps_the_first_copy_of_an_application():
+    graph = fraud_links.FraudLinkGraph()
+    local = application('uuid-1', 'John Doe', '9876543210')
+    synced = dict(application('65a0c0ffee', 'John Doe', '9876543210'), legacy_id='uuid-1')
+    graph.rebuild([local, synced])
+    assert graph.stats()['applications'] == 1
+    assert graph.built_at is not None
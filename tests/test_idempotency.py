@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import idempotency
+
+FORM = {'age': 30, 'tenure': '36', 'loanPurpose': 'Education'}
+
+
+def submission(form=FORM):
+    return {
+        'input': dict(form),
+        'prediction': {'approved': True},
+        'status': 'predicted',
+        'selected_bank': None,
+        'timestamp': datetime.now().isoformat(),
+        'input_hash': idempotency.input_fingerprint(form)
+    }
+
+
+def test_fingerprint_ignores_order_case_and_number_format():
+    a = idempotency.input_fingerprint({'tenure': '36', 'loanPurpose': 'Education ', 'age': 30})
+    b = idempotency.input_fingerprint({'age': '30', 'loanPurpose': 'education', 'tenure': 36})
+    assert a == b
+    assert a != idempotency.input_fingerprint(dict(FORM, age=31))
+
+
+def test_resubmitted_form_reuses_the_predicted_record(app_module, app_state):
+    first = app_module.db_upsert_application(submission(), 3600)
+    second = app_module.db_upsert_application(submission(), 3600)
+    assert first == second
+    apps = app_state.read_applications()
+    assert len(apps) == 1
+    assert apps[0]['submit_count'] == 2
+
+
+def test_resubmit_after_apply_creates_a_new_record(app_module, app_state):
+    first = app_module.db_upsert_application(submission(), 3600)
+    assert app_module.db_update_application(first, {'status': 'applied', 'selected_bank': 'Axis Bank'})
+
+    second = app_module.db_upsert_application(submission(), 3600)
+    assert second != first
+    by_id = {str(a['_id']): a for a in app_state.read_applications()}
+    assert by_id[first]['status'] == 'applied'
+    assert 'submit_count' not in by_id[first]
+    assert by_id[second]['status'] == 'predicted'
+
+
+def test_dedup_keeps_the_most_progressed_record():
+    h = idempotency.input_fingerprint(FORM)
+    records = [
+        {'_id': 'a', 'input_hash': h, 'status': 'predicted', 'timestamp': '2026-10-01T10:00:00'},
+        {'_id': 'b', 'input_hash': h, 'status': 'applied', 'timestamp': '2026-10-01T10:05:00'},
+        {'_id': 'c', 'input_hash': h, 'status': 'predicted', 'timestamp': '2026-10-01T10:10:00'},
+    ]
+    assert sorted(idempotency.find_duplicates(records, window_seconds=3600)) == ['a', 'c']
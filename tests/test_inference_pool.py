@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+import inference_pool
+
+sklearn_linear = pytest.importorskip('sklearn.linear_model')
+joblib = pytest.importorskip('joblib')
+
+
+@pytest.fixture(scope='module')
+def model_file(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    model = sklearn_linear.LogisticRegression().fit(X, y)
+    path = tmp_path_factory.mktemp('models') / 'clf.pkl'
+    joblib.dump(model, path)
+    return model, str(path)
+
+
+@pytest.fixture(scope='module')
+def pool(model_file):
+    _, path = model_file
+    pool = inference_pool.InferencePool({'clf': path}, workers=1, max_batch=8, batch_window_ms=20)
+    yield pool
+    pool.close()
+
+
+def test_worker_scores_like_the_local_model(pool, model_file):
+    model, _ = model_file
+    X = np.random.default_rng(1).normal(size=(5, 4))
+    np.testing.assert_allclose(pool.submit('clf', 'predict_proba', X), model.predict_proba(X))
+    np.testing.assert_array_equal(pool.submit('clf', 'predict', X[0]), model.predict(X[:1]))
+
+
+def test_inputs_larger_than_a_batch_are_split_and_reassembled(pool, model_file):
+    model, _ = model_file
+    X = np.random.default_rng(2).normal(size=(21, 4))
+    np.testing.assert_allclose(pool.submit('clf', 'predict_proba', X), model.predict_proba(X))
+
+
+def test_concurrent_requests_share_micro_batches(pool, model_file):
+    model, _ = model_file
+    rows = np.random.default_rng(3).normal(size=(6, 4))
+    before = pool.stats()['batches']
+    results = [None] * len(rows)
+
+    def score(i):
+        results[i] = pool.submit('clf', 'predict_proba', rows[i:i + 1])
+
+    threads = [threading.Thread(target=score, args=(i,)) for i in range(len(rows))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    np.testing.assert_allclose(np.concatenate(results), model.predict_proba(rows))
+    assert pool.stats()['batches'] - before < len(rows)
+
+
+def test_pooled_model_falls_back_to_the_local_copy(model_file):
+    model, path = model_file
+    pool = inference_pool.InferencePool({'clf': path}, workers=1)
+    pooled = inference_pool.PooledModel(pool, 'clf', model)
+    pool.close()
+    X = np.zeros((2, 4))
+    np.testing.assert_allclose(pooled.predict_proba(X), model.predict_proba(X))
+    assert pooled.classes_.tolist() == model.classes_.tolist()  # attributes come from the local model
+    assert pooled.model_version == inference_pool.file_version(path)
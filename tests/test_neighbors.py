@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import neighbors
+
+
+def write_dataset(path, n=600, seed=0):
+    import pandas as pd
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame(rng.randint(0, 5, size=(n, len(neighbors.FEATURES))), columns=neighbors.FEATURES)
+    for f in neighbors.LOG_FEATURES:
+        df[f] = rng.randint(1000, 500000, size=n)
+    df['Officer_Approved'] = rng.randint(0, 2, size=n)
+    df['Fraud_Label'] = rng.randint(0, 2, size=n)
+    df['Eligible_Loan_Amount'] = rng.randint(1000, 100000, size=n).astype(float)
+    df.to_csv(path, index=False)
+    return df
+
+
+def encode(data):
+    # The dataset columns are already encoded, so a query is just a row of them
+    return {f: float(data[f]) for f in neighbors.FEATURES}
+
+
+def decided(app_id, row, status='approved', **fields):
+    app = {'_id': app_id, 'input': dict(row), 'status': status,
+           'triage': {'scores': {'Eligible_Loan_Amount_Model': 50000}}}
+    app.update(fields)
+    return app
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / 'officer_level_dataset.csv'
+    return str(path), write_dataset(path)
+
+
+@pytest.fixture
+def index(dataset, tmp_path):
+    path, _ = dataset
+    idx = neighbors.NeighborIndex(encode, nprobe=4)
+    idx.load_base(path, str(tmp_path / 'index.npz'))
+    idx.rebuild([])
+    return idx
+
+
+def test_base_is_cached_until_the_dataset_changes(dataset, tmp_path):
+    path, _ = dataset
+    cache = str(tmp_path / 'index.npz')
+    assert neighbors.NeighborIndex(encode).load_base(path, cache) == 'built'
+    assert neighbors.NeighborIndex(encode).load_base(path, cache) == 'cached'
+    write_dataset(path, seed=1)
+    assert neighbors.NeighborIndex(encode).load_base(path, cache) == 'built'
+
+
+def test_kmeans_assigns_every_point_to_its_nearest_centroid():
+    x = np.random.RandomState(0).normal(size=(300, 4))
+    centroids, assign = neighbors.kmeans(x, 10)
+    assert centroids.shape == (10, 4)
+    d = ((x[:, None, :] - centroids[None, :, :]) ** 2).sum(-1)
+    assert (assign == d.argmin(1)).all()
+
+
+def test_probing_every_cell_matches_the_exact_scan(index, dataset):
+    _, df = dataset
+    cells = index.stats()['cells']
+    for i in range(0, 600, 60):
+        query = df.iloc[i][neighbors.FEATURES].to_dict()
+        exact = index.search(query, 10, exact=True)
+        assert index.search(query, 10, nprobe=cells) == exact
+        assert exact[0]['case'] == f'dataset:{i}' and exact[0]['distance'] == 0
+        assert [n['distance'] for n in exact] == sorted(n['distance'] for n in exact)
+
+
+def test_decided_applications_are_added_and_updated_in_place(index, dataset):
+    _, df = dataset
+    row = df.iloc[7][neighbors.FEATURES].to_dict()
+    assert not index.add(decided('pending', row, status='applied'))
+    assert index.add(decided('a1', row))
+    assert index.add(decided('a1', row, status='rejected', fraud_flag=True))
+    stats = index.stats()
+    assert (stats['cases'], stats['applications']) == (601, 1)
+    assert sum(len(cells) for cells in index.lists) == 601  # the update left one entry
+
+    [found] = [n for n in index.search(row, 5, exact=True) if n['case'] == 'a1']
+    assert found['source'] == 'application'
+    assert (found['Officer_Approved'], found['Fraud_Label'], found['Eligible_Loan_Amount']) == (0, 1, 50000.0)
+    assert 'a1' not in [n['case'] for n in index.search(row, 5, exclude='a1', exact=True)]
+
+
+def test_rebuild_maps_a_synced_copy_to_one_case(index, dataset):
+    _, df = dataset
+    row = df.iloc[3][neighbors.FEATURES].to_dict()
+    index.rebuild([decided('uuid-1', row), decided('65a0c0ffee', row, legacy_id='uuid-1'),
+                   decided(None, row)])
+    assert index.stats()['applications'] == 1
+    assert index.built_at is not None
+
+
+def test_outcomes_and_summary():
+    assert neighbors.outcome_of_decision({'status': 'applied'}) is None
+    assert neighbors.outcome_of_decision({'status': 'Approved'})[:2] == (1.0, 0.0)
+    assert neighbors.outcome_of_decision({'status': 'fraud'})[:2] == (0.0, 1.0)
+    summary = neighbors.summarize([
+        {'Officer_Approved': 1, 'Fraud_Label': 0, 'Eligible_Loan_Amount': None},
+        {'Officer_Approved': 0, 'Fraud_Label': 0, 'Eligible_Loan_Amount': 1000.0},
+    ])
+    assert summary == {'approval_rate': 0.5, 'fraud_rate': 0.0, 'mean_eligible_loan_amount': 1000.0}
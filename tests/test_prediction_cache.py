@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+import prediction_script
+
+FEATURES = list(prediction_script.INPUT_FIELDS)
+
+
+class CountingModel:
+    """Approves when the loan amount is below 100000; counts its predict_proba calls."""
+
+    model_version = 'counting-v1'
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        p = np.where(X['LoanAmount'].to_numpy() < 100000, 0.9, 0.1)
+        return np.column_stack([1 - p, p])
+
+
+class BankModel:
+    """Ranks the banks by the applicant's income, so every approved row gets its own top bank."""
+
+    model_version = 'bank-v1'
+
+    def predict_proba(self, X):
+        probs = np.full((len(X), len(prediction_script.HARDCODED_BANKS)), 0.01)
+        for row, income in enumerate(X['ApplicantIncome'].to_numpy()):
+            probs[row, int(income) % len(prediction_script.HARDCODED_BANKS)] = 0.9
+        return probs
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    prediction_script.prediction_cache.clear()
+
+
+def form(amount, income):
+    return {'loanAmount': amount, 'applicantIncome': income}
+
+
+def test_repeated_form_is_served_from_the_cache():
+    model = CountingModel()
+    first = prediction_script.predict(form(50000, 3), model, BankModel(), None, FEATURES)
+    second = prediction_script.predict(form(50000, 3), model, BankModel(), None, FEATURES)
+    assert model.calls == 1
+    assert first == second
+    second['application_id'] = 'x' # callers get copies
+    assert 'application_id' not in prediction_script.predict(form(50000, 3), model, BankModel(), None, FEATURES)
+
+
+def test_feature_list_is_part_of_the_key():
+    model = CountingModel()
+    prediction_script.predict(form(50000, 3), model, BankModel(), None, FEATURES)
+    prediction_script.predict(form(50000, 3), model, BankModel(), None, list(reversed(FEATURES)))
+    assert model.calls == 2
+
+
+def test_batch_maps_each_approved_row_to_its_own_bank_scores():
+    records = [form(500000, 1), form(50000, 2), form(500000, 3), form(50000, 7)]
+    results = prediction_script.predict_batch(records, CountingModel(), BankModel(), None, FEATURES)
+    assert [r['approved'] for r in results] == [False, True, False, True]
+    assert results[1]['bank'] == prediction_script.HARDCODED_BANKS[2]
+    assert results[3]['bank'] == prediction_script.HARDCODED_BANKS[7]
+    assert results[0]['bank_list'] == []
+
+
+def test_explanation_adds_up_to_the_model_margin():
+    joblib = pytest.importorskip('joblib')
+    pytest.importorskip('xgboost')
+    ml_dir = os.path.dirname(prediction_script.__file__)
+    model = joblib.load(os.path.join(ml_dir, "user_approval_model.pkl"))
+    features = joblib.load(os.path.join(ml_dir, "approval_features.pkl"))
+
+    result = prediction_script.predict(form(140000, 88000), model, BankModel(), None, features, explain=True)
+    explanation = result['explanation']
+    margin = sum(explanation['contributions'].values()) + explanation['base_value']
+    p = result['probability'] / 100
+    assert margin == pytest.approx(np.log(p / (1 - p)), abs=0.01)
+    assert len(explanation['top_factors']) <= prediction_script.TOP_FACTORS
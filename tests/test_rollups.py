@@ -0,0 +1,53 @@
+import rollups
+
+
+def application(**fields):
+    app = {'_id': 'a1', 'timestamp': '2026-01-05T10:00:00', 'status': 'approved',
+           'selected_bank': 'HDFC Bank', 'decided_at': '2026-01-06T09:00:00', 'officer_id': 'o1'}
+    app.update(fields)
+    return app
+
+
+def test_rebuild_counts_synced_record_once():
+    local = application(_id='6f1c0d7e-uuid')
+    synced = application(_id='65a0c0ffee', legacy_id='6f1c0d7e-uuid')
+
+    once = rollups.rebuild_counters([[local]])
+    assert rollups.rebuild_counters([[local], [synced]]) == once
+    assert rollups.rebuild_counters([[synced], [local]]) == once
+
+
+def test_rebuild_keeps_distinct_applications():
+    first, second = application(_id='a1'), application(_id='a2')
+
+    once = rollups.rebuild_counters([[first]])
+    both = rollups.rebuild_counters([[first], [second]])
+    assert both == {k: 2 * n for k, n in once.items()}
+
+
+def synced_pair():
+    # Applied while Mongo was down, synced, then decided in Mongo: the local copy is stale
+    local = application(_id='6f1c0d7e-uuid', status='applied', applied_at='2026-01-05T10:30:00',
+                        decided_at=None, officer_id=None, synced_at='2026-01-05T11:00:00',
+                        updated_at='2026-01-05T10:30:00')
+    remote = application(_id='65a0c0ffee0000000000000a', legacy_id='6f1c0d7e-uuid',
+                         applied_at='2026-01-05T10:30:00', updated_at='2026-01-06T09:00:00')
+    return local, remote
+
+
+def test_rebuild_from_app_sources_counts_the_mongo_decision(app_module, app_state, mongo_db):
+    local, remote = synced_pair()
+    app_state.write_applications([local, application(_id='pending-uuid', status='predicted')])
+    mongo_db.loan_applications.insert_one(dict(remote))
+
+    counters = rollups.rebuild_counters(app_module.db_application_sources())
+    assert counters[('2026-01-06', 'status', rollups.ALL, 'approved')] == 1
+    assert counters[('2026-01-05', 'status', rollups.ALL, 'applied')] == 1
+    assert counters[('2026-01-05', 'status', rollups.ALL, 'predicted')] == 2  # pending local one kept
+
+
+def test_synced_local_copies_are_used_while_mongo_is_down(app_module, app_state):
+    local, _ = synced_pair()
+    app_state.write_applications([local])
+    counters = rollups.rebuild_counters(app_module.db_application_sources())
+    assert counters[('2026-01-05', 'status', rollups.ALL, 'applied')] == 1
@@ -0,0 +1,53 @@
+import search_index
+
+
+def record(app_id, name, mobile, **fields):
+    app = {'_id': app_id, 'input': {'Name': name, 'Mobile': mobile}, 'status': 'predicted',
+           'timestamp': '2026-10-01T10:00:00'}
+    app.update(fields)
+    return app
+
+
+def test_index_prefix_search_by_words_and_mobile():
+    index = search_index.ApplicantIndex()
+    index.rebuild([record('1', 'Sai Kumar', '89893 23277'), record('2', 'Kumar Raj', '9876543210'),
+                   record('3', 'Saanvi', '9876500000')])
+    assert {d['application_id'] for d in index.search('sa')} == {'1', '3'}
+    assert [d['application_id'] for d in index.search('kum sai')] == ['1']
+    assert [d['application_id'] for d in index.search('98765 4')] == ['2']
+    index.upsert(record('4', 'Sai Baba', '1112223333'))
+    index.remove('1')
+    assert [d['application_id'] for d in index.search('sai')] == ['4']
+
+
+def test_mongo_query_anchors_every_word():
+    assert search_index.mongo_query('  ') is None
+    assert search_index.mongo_query('sai k') == {'$and': [
+        {'search.name_tokens': {'$regex': '^sai'}}, {'search.name_tokens': {'$regex': '^k'}}]}
+    assert search_index.mongo_query('+91 98') == {'search.mobile': {'$regex': '^9198'}}
+
+
+def test_sort_index_is_created(mongo_db):
+    search_index.ensure_mongo_indexes(mongo_db.loan_applications)
+    keys = [info['key'] for info in mongo_db.loan_applications.index_information().values()]
+    assert search_index.SORT in keys
+
+
+def test_pages_over_local_and_mongo_follow_one_order(app_module, app_state, mongo_db, monkeypatch):
+    from bson.objectid import ObjectId
+    monkeypatch.setattr(app_module, '_search_indexes_ready', False)
+    # Same name everywhere, so the order comes down to mobile; newer Mongo records have
+    # higher mobiles, so a Mongo page ordered any other way would skip the low ones
+    local = [record(f'local-{i}', 'Sai Kumar', f'90000000{i:02d}') for i in (0, 5)]
+    remote = [record(ObjectId(), 'sai  kumar', f'90000000{i:02d}', timestamp=f'2026-10-01T10:{i:02d}:00')
+              for i in range(12) if i not in (0, 5)]
+    for doc in remote:
+        doc['search'] = search_index.search_fields(doc['input'])
+    app_state.write_applications(local)
+    mongo_db.loan_applications.insert_many(remote)
+
+    client = app_module.app.test_client()
+    pages = [client.get(f'/admin/search?q=sai&page={p}&page_size=3').get_json() for p in (1, 2, 3, 4)]
+    mobiles = [item['mobile'] for page in pages for item in page['results']]
+    assert mobiles == [f'90000000{i:02d}' for i in range(12)]
+    assert pages[0]['total'] == 12
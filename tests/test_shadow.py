@@ -0,0 +1,82 @@
+import threading
+import time
+
+import numpy as np
+
+import shadow
+
+FEATURES = ['a', 'b']
+
+
+class Threshold:
+    """predict_proba = 1 where column `col` is above `cut`."""
+
+    def __init__(self, col, cut):
+        self.col, self.cut = col, cut
+
+    def predict_proba(self, X):
+        p = (X[self.col].to_numpy(dtype=float) > self.cut).astype(float)
+        return np.column_stack([1 - p, p])
+
+
+def wait_scored(scorer, n):
+    deadline = time.time() + 5
+    while scorer.stats()['scored'] < n and time.time() < deadline:
+        time.sleep(0.01)
+    return scorer.stats()
+
+
+def test_agreement_and_flips():
+    scorer = shadow.ShadowScorer('t', lambda: Threshold('a', 0), Threshold('a', 5), FEATURES, sample_rate=1)
+    rows = [{'a': 1, 'b': 0}, {'a': 10, 'b': 0}, {'a': -1, 'b': 0}, {'a': 3}]
+    assert all(scorer.submit(row) for row in rows)
+
+    stats = wait_scored(scorer, len(rows))
+    assert stats['scored'] == 4
+    assert stats['agreement_rate'] == 0.5  # rows a=1 and a=3 approve under the primary only
+    assert stats['flips'] == {'reject_to_approve': 0, 'approve_to_reject': 2}
+    assert stats['probability_delta']['max_abs'] == 1.0
+
+
+def test_sampling_and_dropping():
+    scorer = shadow.ShadowScorer('t', lambda: Threshold('a', 0), Threshold('a', 0), FEATURES, sample_rate=0)
+    assert not scorer.submit({'a': 1, 'b': 1})
+    assert scorer.stats()['sampled'] == 0
+
+    release = threading.Event()
+
+    def stuck_primary():
+        release.wait(5)
+        return Threshold('a', 0)
+
+    full = shadow.ShadowScorer('t', stuck_primary, Threshold('a', 0), FEATURES, sample_rate=1, max_queue=1)
+    assert full.submit({'a': 1, 'b': 1})
+    while full.stats()['pending']:  # taken by the scorer thread, which now blocks on the primary
+        time.sleep(0.01)
+    assert full.submit({'a': 1, 'b': 1})
+    assert not full.submit({'a': 1, 'b': 1})
+    assert full.stats()['dropped'] == 1
+    release.set()
+    assert wait_scored(full, 2)['scored'] == 2
+
+
+def test_scoring_errors_are_counted_not_raised():
+    class Broken:
+        def predict_proba(self, X):
+            raise ValueError("bad candidate")
+
+    scorer = shadow.ShadowScorer('t', lambda: Threshold('a', 0), Broken(), FEATURES, sample_rate=1)
+    scorer.submit({'a': 1, 'b': 1})
+    deadline = time.time() + 5
+    while scorer.stats()['errors'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert scorer.stats()['last_error'] == 'bad candidate'
+
+
+def test_reset_clears_the_comparison():
+    scorer = shadow.ShadowScorer('t', lambda: Threshold('a', 0), Threshold('a', 0), FEATURES, sample_rate=1)
+    scorer.submit({'a': 1, 'b': 1})
+    wait_scored(scorer, 1)
+    scorer.reset()
+    assert scorer.stats()['scored'] == 0
+    assert scorer.stats()['agreement_rate'] is None
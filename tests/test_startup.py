@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+import admission
+
+
+def test_requests_during_warmup_get_503_not_429(app_module, app_state, monkeypatch):
+    # Waiting for the models must not hold admission slots, or the overflow turns into 429s
+    monkeypatch.setattr(app_module, 'models_ready', threading.Event())
+    monkeypatch.setitem(app_module.app.config, 'MODEL_WAIT_TIMEOUT', 0.3)
+    limiter = admission.RouteLimiter('predict', 2, 2, 0.5)
+    monkeypatch.setitem(app_module.route_limiters, 'predict', limiter)
+    n = 2 + 2 + 3
+    statuses = []
+
+    def post():
+        res = app_module.app.test_client().post('/predict', json={'age': 30})
+        statuses.append(res.status_code)
+
+    threads = [threading.Thread(target=post) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert statuses == [503] * n
+    assert limiter.stats()['admitted'] == 0
+
+
+def test_failing_optional_step_does_not_skip_model_loading(app_module, monkeypatch):
+    pytest.importorskip('xgboost')
+
+    def broken():
+        raise RuntimeError("optional feature broke")
+
+    monkeypatch.setattr(app_module, 'models_ready', threading.Event())
+    monkeypatch.setattr(app_module, 'attach_shared_caches', broken)
+    monkeypatch.setattr(app_module, 'create_neighbor_index', broken)
+    monkeypatch.setattr(app_module, 'approval_model', None)
+    app_module.warm_up()
+    assert app_module.models_ready.is_set()
+    assert app_module.approval_model is not None
@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+
+import pytest
+
+import state_backend
+from conftest import file_backend
+
+
+def memory_backend():
+    return state_backend.open_backend('redis', 'memory://')
+
+
+@pytest.fixture(params=['file', 'redis'])
+def backend(request, tmp_path):
+    return file_backend(tmp_path) if request.param == 'file' else memory_backend()
+
+
+def append(record):
+    return lambda apps: (apps.append(record), True)
+
+
+def test_update_applications_keeps_order_and_skips_unchanged_writes(backend):
+    for i in range(3):
+        backend.update_applications(append({'_id': f'a{i}', 'status': 'predicted'}))
+    stamp = backend.applications_stamp()
+
+    def apply(apps):
+        apps[1]['status'] = 'applied'
+        return 'done', True
+    assert backend.update_applications(apply) == 'done'
+    assert [(a['_id'], a['status']) for a in backend.read_applications()] == \
+        [('a0', 'predicted'), ('a1', 'applied'), ('a2', 'predicted')]
+    assert backend.applications_stamp() != stamp
+
+    stamp = backend.applications_stamp()
+    assert backend.update_applications(lambda apps: (len(apps), False)) == 3
+    assert backend.applications_stamp() == stamp
+
+
+def test_removed_records_disappear(backend):
+    backend.write_applications([{'_id': 'a'}, {'_id': 'b'}, {'_id': 'c'}])
+
+    def drop_b(apps):
+        apps[:] = [a for a in apps if a['_id'] != 'b']
+        return None, True
+    backend.update_applications(drop_b)
+    backend.update_applications(append({'_id': 'd'}))
+    assert [a['_id'] for a in backend.read_applications()] == ['a', 'c', 'd']
+
+
+def test_on_commit_sees_exact_stamps(backend):
+    seen = []
+    before = backend.applications_stamp()
+    backend.update_applications(append({'_id': 'a'}), on_commit=lambda b, a: seen.append((b, a)))
+    assert seen == [(before, backend.applications_stamp())]
+    assert seen[0][0] != seen[0][1]
+
+
+def test_blocked_users(backend):
+    backend.add_blocked('sai|8989323277')
+    backend.add_blocked('sai|8989323277')
+    assert backend.blocked_users() == ['sai|8989323277']
+    assert backend.is_blocked('sai|8989323277')
+    backend.remove_blocked('sai|8989323277')
+    assert not backend.is_blocked('sai|8989323277')
+
+
+def test_redis_writes_only_the_changed_records():
+    backend = memory_backend()
+    backend.write_applications([{'_id': str(i), 'n': i} for i in range(100)])
+    writes = []
+    hset = backend.client.hset
+    backend.client.hset = lambda key, mapping=None, **kw: (writes.append(mapping), hset(key, mapping=mapping))[1]
+
+    def touch_one(apps):
+        apps[42]['n'] = -1
+        return None, True
+    backend.update_applications(touch_one)
+    assert writes == [{'42': json.dumps({'_id': '42', 'n': -1})}]
+
+
+def test_redis_migrates_the_single_blob_layout():
+    backend = memory_backend()
+    backend.client.set(backend.legacy_apps_key, json.dumps([{'_id': 'old1'}, {'_id': 'old2'}]))
+    assert [a['_id'] for a in backend.read_applications()] == ['old1', 'old2']
+    backend.update_applications(append({'_id': 'new'}))
+    assert backend.client.get(backend.legacy_apps_key) is None
+    assert [a['_id'] for a in backend.read_applications()] == ['old1', 'old2', 'new']
+
+
+def test_redis_unlock_leaves_a_lock_taken_by_someone_else():
+    backend = memory_backend()
+    with backend._locked(timeout=0.05):
+        time.sleep(0.1)  # our lock expired ...
+        assert backend.client.set(backend.lock_key, 'other', nx=True, px=10000)  # ... and was taken
+    assert backend.client.get(backend.lock_key) == 'other'
+
+
+def test_file_lock_is_reentrant_within_a_thread(tmp_path):
+    lock = state_backend.FileLock(str(tmp_path / 'db.json'))
+    with lock.hold(timeout=0.5):
+        with state_backend.FileLock(str(tmp_path / 'db.json')).hold(timeout=0.5):
+            pass
+        # still held after the nested release: another thread cannot get in
+        acquired = []
+        t = threading.Thread(target=lambda: acquired.append(_try_hold(lock)))
+        t.start()
+        t.join()
+        assert acquired == [False]
+    assert _try_hold(lock)
+
+
+def _try_hold(lock):
+    try:
+        with lock.hold(timeout=0.1):
+            return True
+    except TimeoutError:
+        return False
+
+
+def test_sqlite_cache_purges_expired_rows_on_insert(tmp_path):
+    cache = state_backend.SQLiteCache(str(tmp_path / 'cache.sqlite3'), 'ns', purge_interval=0)
+    cache.set('old', {'v': 1}, ttl=0.01)
+    time.sleep(0.05)
+    assert cache.get('old') is None
+    cache.set('new', {'v': 2})
+    rows = cache._conn().execute("SELECT key FROM cache").fetchall()
+    assert rows == [('ns:new',)]
+    assert cache.get('new') == {'v': 2}
@@ -0,0 +1,90 @@
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import search_index
+import sync
+from conftest import file_backend
+
+
+class Collection:
+    """mongomock collection whose bulk_write runs the ReplaceOne ops one by one (mongomock's
+    own bulk_write does not accept the operations of the installed pymongo)."""
+
+    def __init__(self):
+        self.coll = mongomock.MongoClient().loan_db.loan_applications
+
+    def __getattr__(self, attr):
+        return getattr(self.coll, attr)
+
+    def bulk_write(self, ops, ordered=True):
+        errors = []
+        for n, op in enumerate(ops):
+            try:
+                self.coll.replace_one(op._filter, op._doc, upsert=op._upsert)
+            except DuplicateKeyError:
+                errors.append({'index': n, 'code': 11000})
+        if errors:
+            raise BulkWriteError({'writeErrors': errors})
+
+
+def local_record(app_id, **fields):
+    record = {'_id': app_id, 'status': 'predicted', 'timestamp': '2026-10-01T10:00:00',
+              'input': {'Name': 'Sai Kumar', 'Mobile': '8989323277'}}
+    record.update(fields)
+    return record
+
+
+def test_ids_map_to_stable_mongo_keys():
+    oid = str(ObjectId())
+    assert sync.mongo_key(oid) == ObjectId(oid)
+    uid = '6f1c0d7e-3b8e-4c55-9a53-0d3f1f0b2a11'
+    assert sync.mongo_key(uid) == sync.mongo_key(uid)
+    doc = sync.to_mongo(local_record(uid, synced_at='x', mongo_id='y'))
+    assert doc['legacy_id'] == uid and 'synced_at' not in doc and 'mongo_id' not in doc
+    assert sync.id_query(uid) == {'legacy_id': uid}
+
+
+def test_sync_pushes_marks_and_prunes(tmp_path):
+    backend, coll = file_backend(tmp_path), Collection()
+    uid = '6f1c0d7e-3b8e-4c55-9a53-0d3f1f0b2a11'
+    backend.write_applications([local_record(uid)])
+
+    result = sync.sync_once(backend, coll, retention=3600)
+    assert (result['pending'], result['synced'], result['pruned']) == (1, 1, 0)
+    assert coll.find_one({'legacy_id': uid})['status'] == 'predicted'
+    assert backend.read_applications()[0]['synced_at']
+
+    again = sync.sync_once(backend, coll, retention=3600)
+    assert (again['pending'], again['synced']) == (0, 0)
+    assert coll.count_documents({}) == 1
+
+    assert sync.sync_once(backend, coll, retention=0)['pruned'] == 1
+    assert backend.read_applications() == []
+
+
+def test_newer_mongo_copy_is_not_overwritten(tmp_path):
+    backend, coll = file_backend(tmp_path), Collection()
+    uid = '6f1c0d7e-3b8e-4c55-9a53-0d3f1f0b2a11'
+    coll.insert_one(dict(sync.to_mongo(local_record(uid)), status='approved', updated_at='2026-10-03T09:00:00'))
+    backend.write_applications([local_record(uid, status='applied', updated_at='2026-10-02T09:00:00')])
+
+    result = sync.sync_once(backend, coll)
+    assert result['mongo_newer'] == 1
+    assert coll.find_one({'legacy_id': uid})['status'] == 'approved'
+
+
+def test_search_shows_the_mongo_copy_of_a_synced_record(app_module, app_state, mongo_db):
+    uid = '6f1c0d7e-3b8e-4c55-9a53-0d3f1f0b2a11'
+    stale = local_record(uid, status='applied', synced_at='2026-10-01T11:00:00')
+    current = dict(sync.to_mongo(local_record(uid)), status='approved',
+                   search=search_index.search_fields(stale['input']))
+    app_state.write_applications([stale, local_record('pending-uuid', status='applied')])
+    mongo_db.loan_applications.insert_one(current)
+
+    body = app_module.app.test_client().get('/admin/search?q=sai').get_json()
+    assert sorted(item['status'] for item in body['results']) == ['applied', 'approved']
+    assert body['total'] == 2
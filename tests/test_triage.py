@@ -0,0 +1,58 @@
+import pytest
+
+FORM = {
+    'age': 45, 'gender': 'Male', 'maritalStatus': 'Married', 'dependents': '1',
+    'education': 'Graduate', 'area': 'Urban', 'selfEmployed': 'Yes', 'experience': 7,
+    'applicantIncome': 88000, 'coApplicantIncome': 66000, 'salaryMode': 'Bank Transfer',
+    'existingEmi': 2000, 'assets': 'House + Land', 'loanPurpose': 'Asset Purchase',
+    'loanAmount': 140000, 'tenure': '36', 'Name': 'sai', 'Mobile': '8989323277'
+}
+
+# (id, selected bank, extra input, top-level CIBIL, what officer-review.ts getBankId() sends)
+APPLICATIONS = [
+    ('t1', 'Axis Bank', {'Hidden_CIBIL': 810}, None, 3),
+    ('t2', 'Kotak Mahindra Bank', {}, 590, 4),
+    ('t3', 'State Bank of India (SBI)', {'Hidden_CIBIL': 720}, None, 1),
+]
+
+COMPARED = ('Officer_Approved_Rule', 'Fraud_Label_Rule', 'Eligible_Loan_Amount_Rule',
+            'Officer_Approved_Model', 'Fraud_Label_Model', 'Eligible_Loan_Amount_Model')
+
+
+@pytest.fixture
+def client(warm_app, app_state):
+    apps = []
+    for app_id, bank, extra, top_level_cibil, _ in APPLICATIONS:
+        app = {'_id': app_id, 'input': dict(FORM, **extra), 'selected_bank': bank,
+               'status': 'applied', 'timestamp': '2026-10-01T10:00:00'}
+        if top_level_cibil is not None:
+            app['Hidden_CIBIL'] = top_level_cibil
+        apps.append(app)
+    app_state.write_applications(apps)
+    return warm_app.app.test_client()
+
+
+def test_triage_scores_match_officer_predict(client):
+    res = client.get('/officer/triage')
+    assert res.status_code == 200
+    queue = {item['application_id']: item['scores'] for item in res.get_json()['queue']}
+    assert set(queue) == {a[0] for a in APPLICATIONS}
+    res.close() # runs the after-response save of the scores
+
+    for app_id, _, extra, top_level_cibil, bank_id in APPLICATIONS:
+        # The payload the officer review screen posts for this application
+        payload = dict(FORM, **extra)
+        payload['Hidden_CIBIL'] = extra.get('Hidden_CIBIL') or top_level_cibil
+        payload['Approved_Bank'] = bank_id
+        predicted = client.post('/officer_predict', json=payload).get_json()
+        for field in COMPARED:
+            assert queue[app_id][field] == pytest.approx(predicted[field]), (app_id, field)
+
+    # Scores stored by the first call are reused, with the same key the bank and CIBIL feed into
+    again = client.get('/officer/triage').get_json()
+    assert again['reused'] == len(APPLICATIONS)
+
+
+def test_triage_filters_by_bank(client):
+    body = client.get('/officer/triage?bank=Axis Bank').get_json()
+    assert [item['application_id'] for item in body['queue']] == ['t1']
@@ -0,0 +1,86 @@
+import pytest
+
+import write_behind
+
+
+class FlakyStore:
+    def __init__(self):
+        self.written = []
+        self.fail = False
+
+    def write(self, records):
+        if self.fail:
+            raise ConnectionError("store unavailable")
+        self.written.extend(dict(r) for r in records)
+
+
+@pytest.fixture
+def store():
+    return FlakyStore()
+
+
+@pytest.fixture
+def buffer(store):
+    # A long interval keeps the background writer out of the way; the tests flush by hand
+    buf = write_behind.WriteBehindBuffer(store.write, max_batch=10, flush_interval=60, max_pending=100)
+    yield buf
+    buf.close(timeout=1)
+
+
+def test_pending_records_stay_readable_until_flushed(buffer, store):
+    buffer.add({'_id': 'a', 'status': 'predicted'})
+    assert buffer.get('a') == {'_id': 'a', 'status': 'predicted'}
+    assert [r['_id'] for r in buffer.list_pending()] == ['a']
+    assert buffer.flush() == 1
+    assert buffer.get('a') is None
+    assert store.written == [{'_id': 'a', 'status': 'predicted'}]
+
+
+def test_flush_writes_one_batch_in_insert_order(buffer, store):
+    for i in range(5):
+        buffer.add({'_id': str(i)})
+    assert buffer.flush(limit=3) == 3
+    assert buffer.flush(limit=3) == 2
+    assert [r['_id'] for r in store.written] == ['0', '1', '2', '3', '4']
+    assert buffer.stats()['batches'] == 2
+
+
+def test_update_applies_only_while_pending(buffer, store):
+    buffer.add({'_id': 'a', 'status': 'predicted'})
+    assert buffer.update('a', lambda rec: rec.update(status='applied'))
+    buffer.flush()
+    assert store.written[0]['status'] == 'applied'
+    assert not buffer.update('a', lambda rec: rec.update(status='approved'))
+
+
+def test_find_returns_newest_match(buffer):
+    buffer.add({'_id': 'a', 'input_hash': 'h'})
+    buffer.add({'_id': 'b', 'input_hash': 'h'})
+    buffer.add({'_id': 'c', 'input_hash': 'other'})
+    assert buffer.find(lambda rec: rec.get('input_hash') == 'h') == 'b'
+    assert buffer.find(lambda rec: rec.get('input_hash') == 'missing') is None
+
+
+def test_failed_flush_keeps_records_for_retry(buffer, store):
+    buffer.add({'_id': 'a'})
+    store.fail = True
+    assert buffer.flush() == 0
+    assert buffer.pending_count() == 1
+    assert buffer.stats()['failures'] == 1
+    store.fail = False
+    assert buffer.flush() == 1
+    assert buffer.pending_count() == 0
+
+
+def test_close_drains_everything(store):
+    buf = write_behind.WriteBehindBuffer(store.write, max_batch=2, flush_interval=60)
+    for i in range(5):
+        buf.add({'_id': str(i)})
+    assert buf.close(timeout=2) == 0
+    assert len(store.written) == 5
+
+
+def test_public_copies_do_not_alias_the_pending_record(buffer):
+    buffer.add({'_id': 'a', 'input': {'age': 30}})
+    buffer.get('a')['input']['age'] = 99
+    assert buffer.get('a')['input']['age'] == 30
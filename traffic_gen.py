@@ -0,0 +1,351 @@
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Synthetic traffic for capacity planning.
+# Payloads are drawn from the joint distribution of the training datasets: a whole row is
+# resampled (so correlations between columns are kept) and its continuous columns are
+# jittered by a few percent, which yields new, realistic applications instead of copies.
+# Rows are turned back into the camelCase payloads the Angular frontend sends.
+#
+#   python traffic_gen.py generate --count 1000000 --output apps.ndjson.gz
+#   python traffic_gen.py seed --count 200000 --target mongo
+#   python traffic_gen.py replay --qps 200 --duration 120 --mix predict=0.6,apply=0.2,applications=0.1,officer_predict=0.1
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, "ML model"))
+
+from prediction_script import INPUT_FIELDS, MAPPINGS  # noqa: E402
+import drift_monitor  # noqa: E402
+import idempotency  # noqa: E402
+
+USER_DATASET = drift_monitor.USER_DATASET
+OFFICER_DATASET = drift_monitor.OFFICER_DATASET
+MONGO_URI = "mongodb://localhost:27017/loan_db"
+DEFAULT_URL = "http://localhost:5000"
+DEFAULT_MIX = "predict=0.6,apply=0.2,applications=0.1,officer_predict=0.1"
+
+# Jittered multiplicatively (zeros stay zero, e.g. no co-applicant / no EMI)
+CONTINUOUS = ['Age', 'Work_Experience_Years', 'ApplicantIncome', 'CoapplicantIncome',
+              'Existing_EMI', 'LoanAmount', 'Hidden_CIBIL']
+INTEGER = ['Age', 'Work_Experience_Years', 'ApplicantIncome', 'CoapplicantIncome', 'Existing_EMI', 'LoanAmount']
+BANKS = ['SBI', 'HDFC Bank', 'ICICI Bank', 'Axis Bank', 'Kotak Mahindra Bank', 'Bank of Baroda']
+
+# Encoded value -> frontend label, per categorical feature
+INVERSE_MAPPINGS = {feat: {code: label for label, code in mapping.items()} for feat, mapping in MAPPINGS.items()}
+
+
+class PayloadGenerator:
+    def __init__(self, dataset=USER_DATASET, officer=False, jitter=0.05, seed=None):
+        self.officer = officer
+        self.jitter = jitter
+        self.rng = np.random.default_rng(seed)
+        df = pd.read_csv(dataset)
+        self.columns = list(INPUT_FIELDS) + (['Hidden_CIBIL', 'Approved_Bank'] if officer else [])
+        self.data = df[[c for c in self.columns if c in df.columns]]
+        self.lo = self.data.min()
+        self.hi = self.data.max()
+        self.counter = 0
+
+    def sample_frame(self, n):
+        """n encoded rows: bootstrap of whole rows plus multiplicative jitter on the continuous columns."""
+        rows = self.data.iloc[self.rng.integers(0, len(self.data), n)].reset_index(drop=True).astype(float)
+        for col in CONTINUOUS:
+            if col not in rows.columns:
+                continue
+            noise = 1 + self.rng.normal(0, self.jitter, n)
+            rows[col] = (rows[col] * noise).clip(self.lo[col], self.hi[col])
+        if 'Work_Experience_Years' in rows and 'Age' in rows:
+            rows['Work_Experience_Years'] = np.minimum(rows['Work_Experience_Years'], np.maximum(rows['Age'] - 18, 0))
+        for col in INTEGER:
+            if col in rows.columns:
+                rows[col] = rows[col].round()
+        if 'Hidden_CIBIL' in rows:
+            rows['Hidden_CIBIL'] = rows['Hidden_CIBIL'].round(2)
+        return rows
+
+    def to_payload(self, row):
+        payload = {}
+        for feature, (key, default) in INPUT_FIELDS.items():
+            val = row.get(feature)
+            if val is None:
+                payload[key] = default
+            elif feature in INVERSE_MAPPINGS:
+                payload[key] = INVERSE_MAPPINGS[feature].get(int(val), default)
+            else:
+                payload[key] = int(val)
+        if row.get('Hidden_CIBIL') is not None:
+            payload['Hidden_CIBIL'] = float(row['Hidden_CIBIL'])
+        if row.get('Approved_Bank') is not None:
+            payload['Approved_Bank'] = int(row['Approved_Bank'])
+        self.counter += 1
+        payload['Name'] = f"Synthetic Applicant {self.counter}"
+        payload['Mobile'] = str(int(self.rng.integers(6000000000, 9999999999)))
+        return payload
+
+    def payloads(self, count, chunk=10000):
+        """Yields `count` payloads, built chunk by chunk so memory stays flat."""
+        done = 0
+        while done < count:
+            n = min(chunk, count - done)
+            for row in self.sample_frame(n).to_dict('records'):
+                yield self.to_payload(row)
+            done += n
+
+
+def _open_output(path):
+    if path == '-':
+        return sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt')
+    return open(path, 'w')
+
+
+# --- generate ---
+
+def cmd_generate(args):
+    gen = PayloadGenerator(OFFICER_DATASET if args.officer else USER_DATASET, args.officer, args.jitter, args.seed)
+    start = time.perf_counter()
+    out = _open_output(args.output)
+    try:
+        for payload in gen.payloads(args.count):
+            out.write(json.dumps(payload) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Generated {args.count} payloads in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+# --- seed ---
+
+def application_record(payload, rng, now, days):
+    """A stored application as /predict + /apply would leave it (without a model prediction)."""
+    status = rng.choice(['predicted', 'applied', 'applied', 'approved', 'rejected'])
+    ts = now - timedelta(seconds=rng.randint(0, days * 86400))
+    record = {
+        'input': payload,
+        'prediction': {},
+        'status': status,
+        'selected_bank': rng.choice(BANKS) if status != 'predicted' else None,
+        'timestamp': ts.isoformat(),
+        'input_hash': idempotency.input_fingerprint(payload),
+        'synthetic': True
+    }
+    if status != 'predicted':
+        record['applied_at'] = (ts + timedelta(minutes=rng.randint(1, 600))).isoformat()
+    return record
+
+
+def cmd_seed(args):
+    gen = PayloadGenerator(USER_DATASET, False, args.jitter, args.seed)
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    records = (application_record(p, rng, now, args.days) for p in gen.payloads(args.count))
+    start = time.perf_counter()
+    written = 0
+
+    if args.target == 'mongo':
+        from pymongo import MongoClient
+        coll = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000).get_default_database().loan_applications
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= args.batch_size:
+                coll.insert_many(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        if batch:
+            coll.insert_many(batch, ordered=False)
+            written += len(batch)
+    else:
+        import uuid
+        import state_backend
+        store = state_backend.FileStateBackend()
+        batch = []
+        for record in records:
+            record['_id'] = str(uuid.uuid4())
+            batch.append(record)
+        store.update_applications(lambda apps: (apps.extend(batch), True))
+        written = len(batch)
+    print(f"Seeded {written} applications into {args.target} in {time.perf_counter() - start:.1f}s")
+
+
+# --- replay ---
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {'predict', 'apply', 'applications', 'officer_predict'}
+    if unknown:
+        raise ValueError(f"unknown endpoints in mix: {sorted(unknown)}")
+    total = sum(mix.values())
+    return {name: w / total for name, w in mix.items()}
+
+
+class Replayer:
+    def __init__(self, url, mix, user_gen, officer_gen, timeout=10.0):
+        import requests
+        self.requests = requests
+        self.url = url.rstrip('/')
+        self.mix = mix
+        self.user_gen = user_gen
+        self.officer_gen = officer_gen
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._gen_lock = threading.Lock()
+        self.app_ids = deque(maxlen=10000)
+        self.latency = {name: [] for name in mix}   # from scheduled time (includes queueing)
+        self.service = {name: [] for name in mix}   # from send time
+        self.status = {name: {} for name in mix}
+
+    def _session(self):
+        s = getattr(self._local, 'session', None)
+        if s is None:
+            s = self._local.session = self.requests.Session()
+        return s
+
+    def _payload(self, officer=False):
+        with self._gen_lock:
+            gen = self.officer_gen if officer else self.user_gen
+            return next(gen)
+
+    def call(self, name, scheduled):
+        sent = time.perf_counter()
+        try:
+            s = self._session()
+            if name == 'predict':
+                r = s.post(f"{self.url}/predict", json=self._payload(), timeout=self.timeout)
+                if r.ok and r.json().get('application_id'):
+                    self.app_ids.append(r.json()['application_id'])
+            elif name == 'apply':
+                try:
+                    app_id = self.app_ids.popleft()
+                except IndexError:
+                    # Nothing predicted yet to apply for
+                    with self._lock:
+                        self.status[name]['skipped'] = self.status[name].get('skipped', 0) + 1
+                    return
+                r = s.post(f"{self.url}/apply", json={'application_id': app_id, 'bank_name': random.choice(BANKS)},
+                           timeout=self.timeout)
+            elif name == 'applications':
+                params = {'bank': random.choice(BANKS)} if random.random() < 0.5 else {}
+                r = s.get(f"{self.url}/applications", params=params, timeout=self.timeout)
+            else:
+                r = s.post(f"{self.url}/officer_predict", json=self._payload(officer=True), timeout=self.timeout)
+            code = str(r.status_code)
+        except Exception as e:
+            code = type(e).__name__
+        done = time.perf_counter()
+        with self._lock:
+            self.latency[name].append((done - scheduled) * 1000)
+            self.service[name].append((done - sent) * 1000)
+            self.status[name][code] = self.status[name].get(code, 0) + 1
+
+    def run(self, qps, duration, concurrency, poisson=True):
+        """Open-loop: requests are issued on schedule whether or not earlier ones have finished."""
+        names = list(self.mix)
+        weights = [self.mix[n] for n in names]
+        start = time.perf_counter()
+        next_at = start
+        issued = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while next_at - start < duration:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.call, random.choices(names, weights)[0], next_at)
+                issued += 1
+                next_at += random.expovariate(qps) if poisson else 1.0 / qps
+        elapsed = time.perf_counter() - start
+        return self.report(issued, elapsed, qps)
+
+    def report(self, issued, elapsed, target_qps):
+        def pct(values):
+            if not values:
+                return {}
+            arr = np.asarray(values)
+            return {f"p{p}": round(float(np.percentile(arr, p)), 2) for p in (50, 90, 95, 99)} | \
+                {'max': round(float(arr.max()), 2)}
+
+        with self._lock:
+            return {
+                'target_qps': target_qps,
+                'issued': issued,
+                'achieved_qps': round(issued / elapsed, 1) if elapsed else 0,
+                'elapsed_s': round(elapsed, 1),
+                'endpoints': {
+                    name: {
+                        'requests': len(self.latency[name]),
+                        'status': self.status[name],
+                        'latency_ms': pct(self.latency[name]),
+                        'service_time_ms': pct(self.service[name])
+                    }
+                    for name in self.mix
+                }
+            }
+
+
+def cmd_replay(args):
+    mix = parse_mix(args.mix)
+    user_gen = PayloadGenerator(USER_DATASET, False, args.jitter, args.seed).payloads(10 ** 12)
+    officer_gen = PayloadGenerator(OFFICER_DATASET, True, args.jitter, args.seed).payloads(10 ** 12) \
+        if 'officer_predict' in mix else None
+    replayer = Replayer(args.url, mix, user_gen, officer_gen, args.timeout)
+    print(f"Replaying {args.mix} at {args.qps} QPS for {args.duration}s against {args.url} ...")
+    report = replayer.run(args.qps, args.duration, args.concurrency, poisson=not args.uniform)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic application traffic from the training datasets.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help="Write payloads as NDJSON (.gz supported, '-' for stdout)")
+    gen.add_argument('--count', type=int, default=100000)
+    gen.add_argument('--output', default='-')
+    gen.add_argument('--officer', action='store_true', help="Officer payloads (with Hidden_CIBIL / Approved_Bank)")
+
+    seed = sub.add_parser('seed', help="Bulk insert synthetic applications")
+    seed.add_argument('--count', type=int, default=10000)
+    seed.add_argument('--target', choices=['mongo', 'local'], default='mongo')
+    seed.add_argument('--days', type=int, default=90, help="Spread timestamps over the last N days")
+    seed.add_argument('--batch-size', type=int, default=1000)
+    seed.add_argument('--mongo-uri', default=MONGO_URI)
+
+    rep = sub.add_parser('replay', help="Drive the running app at a target QPS")
+    rep.add_argument('--url', default=DEFAULT_URL)
+    rep.add_argument('--qps', type=float, default=20)
+    rep.add_argument('--duration', type=float, default=30, help="Seconds")
+    rep.add_argument('--mix', default=DEFAULT_MIX)
+    rep.add_argument('--concurrency', type=int, default=64, help="Max requests in flight")
+    rep.add_argument('--timeout', type=float, default=10.0)
+    rep.add_argument('--uniform', action='store_true', help="Fixed inter-arrival time instead of Poisson")
+    rep.add_argument('--report', help="Also write the report to this JSON file")
+
+    for p in (gen, seed, rep):
+        p.add_argument('--jitter', type=float, default=0.05, help="Relative noise on continuous columns")
+        p.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    {'generate': cmd_generate, 'seed': cmd_seed, 'replay': cmd_replay}[args.command](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Reproducible retraining of the model artifacts app.py loads.
+# Every model is an independent job (same hyperparameters as the notebook that produced the
+# original pickles, fixed seed, fixed holdout), so the jobs run in parallel processes with
+# the cores split between them. The CSVs are parsed once into float matrices cached under
+# .train_cache/; when rows were appended to a CSV only the new tail is parsed. With
+# --warm-start the existing models keep their trees and are boosted --extra-rounds further
+# on the (grown) training split instead of being trained from scratch.
+#
+#   python train_models.py                              # retrain everything in place
+#   python train_models.py --only fraud_detection loan_amount --jobs 2
+#   python train_models.py --warm-start --extra-rounds 100
+#   python train_models.py --candidate                  # write <model>.candidate.pkl for shadow.py
+#
+# Re-run compact_model.py afterwards if the app uses USE_COMPACT_MODELS=1.
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+ml_dir = os.path.join(base_dir, "ML model")
+officer_dir = os.path.join(base_dir, "officer models")
+CACHE_DIR = os.path.join(base_dir, ".train_cache")
+REPORT_FILE = os.path.join(base_dir, "training_report.json")
+
+USER_DATA = os.path.join(ml_dir, "balanced_user_level_dataset_40k.csv")
+OFFICER_DATA = os.path.join(officer_dir, "officer_level_dataset.csv")
+
+USER_FEATURES = [
+    'Age', 'Gender', 'Marital_Status', 'Dependents', 'Education', 'Self_Employed',
+    'Work_Experience_Years', 'ApplicantIncome', 'CoapplicantIncome', 'Salary_Payment_Mode',
+    'Existing_EMI', 'Residential_Assets', 'Area', 'Loan_Purpose', 'LoanAmount', 'Loan_Amount_Term'
+]
+OFFICER_FEATURES = USER_FEATURES + ['Hidden_CIBIL', 'Approved_Bank']
+
+SEED = 42
+TEST_SIZE = 0.2
+
+# name -> how to train it. kind: 'binary' | 'multiclass' | 'regression'
+JOBS = {
+    'user_approval': {
+        'dataset': USER_DATA, 'label': 'Approved_Status', 'kind': 'binary',
+        'features': USER_FEATURES, 'directory': ml_dir,
+        'model_file': "user_approval_model.pkl", 'features_file': "approval_features.pkl",
+        'params': dict(n_estimators=400, max_depth=7, learning_rate=0.05, subsample=0.8, colsample_bytree=0.8)
+    },
+    'user_bank_recommendation': {
+        # Only approved applicants have a bank (Approved_Bank == -1 otherwise)
+        'dataset': USER_DATA, 'label': 'Approved_Bank', 'kind': 'multiclass',
+        'features': USER_FEATURES, 'directory': ml_dir, 'where': ('Approved_Status', 1),
+        'model_file': "user_bank_recommendation_model.pkl", 'encoder_file': "bank_label_encoder.pkl",
+        'params': dict(n_estimators=400, max_depth=6, learning_rate=0.05, subsample=0.8, colsample_bytree=0.8)
+    },
+    'officer_approval': {
+        'dataset': OFFICER_DATA, 'label': 'Officer_Approved', 'kind': 'binary',
+        'features': OFFICER_FEATURES, 'directory': officer_dir,
+        'model_file': "officer_approval_model.pkl", 'features_file': "officer_approval_features.pkl",
+        'params': dict(n_estimators=450, max_depth=7, learning_rate=0.05, subsample=0.85, colsample_bytree=0.85)
+    },
+    'fraud_detection': {
+        # scale_pos_weight = negatives / positives of the training split
+        'dataset': OFFICER_DATA, 'label': 'Fraud_Label', 'kind': 'binary', 'balance': True,
+        'features': OFFICER_FEATURES, 'directory': officer_dir,
+        'model_file': "fraud_detection_model.pkl", 'features_file': "fraud_features.pkl",
+        'params': dict(n_estimators=400, max_depth=6, learning_rate=0.05, subsample=0.8, colsample_bytree=0.8)
+    },
+    'loan_amount': {
+        'dataset': OFFICER_DATA, 'label': 'Eligible_Loan_Amount', 'kind': 'regression',
+        'features': OFFICER_FEATURES, 'directory': officer_dir,
+        'model_file': "loan_amount_model.pkl", 'features_file': "loan_amount_features.pkl",
+        'params': dict(n_estimators=500, max_depth=7, learning_rate=0.05, subsample=0.85, colsample_bytree=0.85)
+    }
+}
+
+
+# --- Preprocessed matrix cache ---
+
+def _cache_path(dataset):
+    return os.path.join(CACHE_DIR, os.path.splitext(os.path.basename(dataset))[0] + ".npz")
+
+
+def _sha1(path, size=None):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        remaining = size if size is not None else float('inf')
+        while remaining > 0:
+            chunk = f.read(int(min(1 << 20, remaining)))
+            if not chunk:
+                break
+            h.update(chunk)
+            remaining -= len(chunk)
+    return h.hexdigest()
+
+
+def _parse(data, columns=None):
+    import pandas as pd
+    if columns is None:
+        df = pd.read_csv(io.BytesIO(data))
+    else:
+        df = pd.read_csv(io.BytesIO(data), header=None, names=columns)
+    return list(df.columns), df.to_numpy(dtype=np.float64)
+
+
+def load_matrix(dataset, use_cache=True):
+    """
+    The CSV as (columns, float64 matrix, info). The matrix is cached next to the file's size
+    and hash; if the file only grew (same leading bytes) just the appended rows are parsed.
+    """
+    size = os.path.getsize(dataset)
+    digest = _sha1(dataset)
+    cache = _cache_path(dataset)
+    info = {'rows': 0, 'cached_rows': 0, 'parsed_rows': 0, 'sha1': digest}
+
+    if use_cache and os.path.exists(cache):
+        with np.load(cache, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            matrix = data['matrix']
+        columns = meta['columns']
+        if meta['sha1'] == digest:
+            info.update(rows=len(matrix), cached_rows=len(matrix))
+            return columns, matrix, info
+        if meta['size'] < size and _sha1(dataset, meta['size']) == meta['sha1']:
+            with open(dataset, 'rb') as f:
+                f.seek(meta['size'])
+                tail = f.read()
+            _, extra = _parse(tail, columns)
+            matrix = np.vstack([matrix, extra])
+            info.update(cached_rows=len(matrix) - len(extra), parsed_rows=len(extra))
+        else:
+            columns = None
+    else:
+        columns = None
+
+    if columns is None:
+        with open(dataset, 'rb') as f:
+            columns, matrix = _parse(f.read())
+        info['parsed_rows'] = len(matrix)
+    info['rows'] = len(matrix)
+
+    if use_cache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = cache + ".tmp.npz"
+        np.savez(tmp, matrix=matrix, meta=json.dumps({'columns': columns, 'size': size, 'sha1': digest}))
+        os.replace(tmp, cache)
+    return columns, matrix, info
+
+
+def holdout_mask(n, seed=SEED, test_size=TEST_SIZE):
+    """Test rows; the draw for a row does not depend on n, so appended rows never reshuffle the split."""
+    return np.random.RandomState(seed).rand(n) < test_size
+
+
+# --- Training ---
+
+def _metrics(kind, model, X, y):
+    from sklearn import metrics
+    if kind == 'regression':
+        pred = model.predict(X)
+        return {
+            'mae': round(float(metrics.mean_absolute_error(y, pred)), 4),
+            'rmse': round(float(np.sqrt(metrics.mean_squared_error(y, pred))), 4),
+            'r2': round(float(metrics.r2_score(y, pred)), 4)
+        }
+    proba = model.predict_proba(X)
+    pred = proba.argmax(axis=1)
+    out = {
+        'accuracy': round(float(metrics.accuracy_score(y, pred)), 4),
+        'logloss': round(float(metrics.log_loss(y, proba, labels=list(range(proba.shape[1])))), 4)
+    }
+    if kind == 'binary':
+        out['auc'] = round(float(metrics.roc_auc_score(y, proba[:, 1])), 4)
+    else:
+        top3 = np.argsort(proba, axis=1)[:, -3:]
+        out['top3_accuracy'] = round(float(np.mean([y[i] in top3[i] for i in range(len(y))])), 4)
+    return out
+
+
+def output_path(directory, filename, out_dir=None, candidate=False):
+    if candidate:
+        filename = filename.replace(".pkl", ".candidate.pkl")
+    return os.path.join(out_dir or directory, filename)
+
+
+def _dump(obj, path):
+    import joblib
+    tmp = path + ".tmp"
+    joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+
+
+def train_job(name, nthread=1, warm_start=False, extra_rounds=100, out_dir=None, candidate=False, use_cache=True):
+    """Trains one entry of JOBS and writes its artifacts. Runs in a worker process."""
+    import joblib
+    import xgboost as xgb
+    from sklearn.preprocessing import LabelEncoder
+
+    spec = JOBS[name]
+    started = time.perf_counter()
+    columns, matrix, data_info = load_matrix(spec['dataset'], use_cache)
+    col = {c: i for i, c in enumerate(columns)}
+    test = holdout_mask(len(matrix))
+    if 'where' in spec:
+        field, value = spec['where']
+        keep = matrix[:, col[field]] == value
+        matrix, test = matrix[keep], test[keep]
+    X = matrix[:, [col[f] for f in spec['features']]]
+    y = matrix[:, col[spec['label']]]
+    load_ms = (time.perf_counter() - started) * 1000
+
+    import pandas as pd
+    X = pd.DataFrame(X, columns=spec['features'])
+    encoder = None
+    if spec['kind'] == 'multiclass':
+        encoder = LabelEncoder().fit(y.astype(int))
+        y = encoder.transform(y.astype(int))
+    elif spec['kind'] == 'binary':
+        y = y.astype(int)
+    X_train, y_train, X_test, y_test = X[~test], y[~test], X[test], y[test]
+
+    params = dict(spec['params'], random_state=SEED, n_jobs=nthread, tree_method='hist')
+    if spec['kind'] == 'regression':
+        params['objective'] = 'reg:squarederror'
+    else:
+        params['eval_metric'] = 'logloss' if spec['kind'] == 'binary' else 'mlogloss'
+    if spec.get('balance'):
+        params['scale_pos_weight'] = float((y_train == 0).sum() / max((y_train == 1).sum(), 1))
+
+    mode = 'full'
+    init_model = None
+    live_path = os.path.join(spec['directory'], spec['model_file'])
+    if warm_start and os.path.exists(live_path):
+        previous = joblib.load(live_path)
+        same_classes = encoder is None or getattr(previous, 'n_classes_', None) == len(encoder.classes_)
+        if same_classes:
+            init_model = previous.get_booster()
+            params['n_estimators'] = extra_rounds
+            mode = 'warm_start'
+        else:
+            print(f"{name}: label classes changed, training from scratch")
+
+    model_cls = xgb.XGBRegressor if spec['kind'] == 'regression' else xgb.XGBClassifier
+    model = model_cls(**params)
+    fit_start = time.perf_counter()
+    model.fit(X_train, y_train, xgb_model=init_model)
+    fit_ms = (time.perf_counter() - fit_start) * 1000
+
+    written = []
+    path = output_path(spec['directory'], spec['model_file'], out_dir, candidate)
+    _dump(model, path)
+    written.append(path)
+    if not candidate:
+        if spec.get('features_file'):
+            path = output_path(spec['directory'], spec['features_file'], out_dir)
+            _dump(list(spec['features']), path)
+            written.append(path)
+        if encoder is not None and spec.get('encoder_file'):
+            path = output_path(spec['directory'], spec['encoder_file'], out_dir)
+            _dump(encoder, path)
+            written.append(path)
+
+    return {
+        'model': name,
+        'mode': mode,
+        'rows_train': int(len(y_train)),
+        'rows_test': int(len(y_test)),
+        'trees': int(model.get_booster().num_boosted_rounds()),
+        'data': data_info,
+        'metrics': _metrics(spec['kind'], model, X_test, y_test),
+        'load_ms': round(load_ms, 1),
+        'fit_ms': round(fit_ms, 1),
+        'wall_ms': round((time.perf_counter() - started) * 1000, 1),
+        'nthread': nthread,
+        'written': written
+    }
+
+
+def train_all(names, jobs=None, warm_start=False, extra_rounds=100, out_dir=None, candidate=False, use_cache=True):
+    cores = os.cpu_count() or 1
+    jobs = max(1, min(jobs or cores, len(names)))
+    nthread = max(1, cores // jobs)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    # Parse / refresh each dataset once up front so the workers only read the cache
+    started = time.perf_counter()
+    for dataset in sorted({JOBS[n]['dataset'] for n in names}):
+        _, _, info = load_matrix(dataset, use_cache)
+        print(f"{os.path.basename(dataset)}: {info['rows']} rows ({info['cached_rows']} cached, {info['parsed_rows']} parsed)")
+
+    results = {}
+    kwargs = dict(nthread=nthread, warm_start=warm_start, extra_rounds=extra_rounds,
+                  out_dir=out_dir, candidate=candidate, use_cache=use_cache)
+    if jobs == 1:
+        for name in names:
+            results[name] = train_job(name, **kwargs)
+            _print_result(results[name])
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(train_job, name, **kwargs): name for name in names}
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['model']] = result
+                _print_result(result)
+
+    return {
+        'jobs': jobs,
+        'nthread_per_job': nthread,
+        'warm_start': warm_start,
+        'wall_ms': round((time.perf_counter() - started) * 1000, 1),
+        'models': {name: results[name] for name in names}
+    }
+
+
+def _print_result(r):
+    metrics = ", ".join(f"{k} {v}" for k, v in r['metrics'].items())
+    print(f"  {r['model']:<26} {r['mode']:<10} {r['trees']:>4} trees  fit {r['fit_ms'] / 1000:.1f}s  "
+          f"wall {r['wall_ms'] / 1000:.1f}s  {metrics}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the user and officer models from the CSV datasets.")
+    parser.add_argument('--only', nargs='+', choices=list(JOBS), help="Models to train (default: all)")
+    parser.add_argument('--jobs', type=int, help="Models trained in parallel (default: one per core)")
+    parser.add_argument('--warm-start', action='store_true',
+                        help="Continue boosting the existing models instead of training from scratch")
+    parser.add_argument('--extra-rounds', type=int, default=100, help="Trees added per model with --warm-start")
+    parser.add_argument('--out', help="Write the artifacts to this directory instead of next to the live models")
+    parser.add_argument('--candidate', action='store_true',
+                        help="Write <model>.candidate.pkl (shadow evaluation) and leave feature lists / encoder alone")
+    parser.add_argument('--no-cache', action='store_true', help="Parse the CSVs again and do not write .train_cache/")
+    parser.add_argument('--report', default=REPORT_FILE)
+    args = parser.parse_args()
+
+    names = args.only or list(JOBS)
+    report = train_all(names, args.jobs, args.warm_start, args.extra_rounds, args.out, args.candidate,
+                       not args.no_cache)
+    print(f"Trained {len(names)} models in {report['wall_ms'] / 1000:.1f}s "
+          f"({report['jobs']} jobs x {report['nthread_per_job']} threads)")
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
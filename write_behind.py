@@ -0,0 +1,156 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from quantiles import P2Quantile
+
+# Write-behind buffer for application inserts.
+# /predict assigns the _id itself, parks the record here and returns; a background thread
+# hands records to flush_fn in bounded batches (as soon as max_batch are pending, or every
+# flush_interval seconds). Records stay visible through get()/list_pending() until the
+# batch containing them has been written, so reads never miss an acknowledged insert.
+
+
+class WriteBehindBuffer:
+    def __init__(self, flush_fn, max_batch=200, flush_interval=0.05, max_pending=20000):
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = OrderedDict()   # str(_id) -> (record, enqueued_at)
+        self._lock = threading.Lock()
+        # Held while a batch is being written, and by update() so an update never races a flush
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error = None
+        self._flush_ms = {p: P2Quantile(p) for p in (0.5, 0.95, 0.99)}
+        self._lag_ms = {p: P2Quantile(p) for p in (0.5, 0.95, 0.99)}
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def add(self, record):
+        """Queues a record that already has its '_id'."""
+        with self._lock:
+            self._pending[str(record['_id'])] = (record, time.time())
+            self.enqueued += 1
+            size = len(self._pending)
+        if size >= self.max_batch:
+            self._wake.set()
+        if size >= self.max_pending:
+            # Backpressure: the writer is not keeping up, flush on the caller's thread
+            self.flush()
+
+    def get(self, app_id):
+        with self._lock:
+            item = self._pending.get(str(app_id))
+            return self._public(item[0]) if item else None
+
+    def list_pending(self):
+        with self._lock:
+            return [self._public(record) for record, _ in self._pending.values()]
+
+    def find(self, predicate):
+        """Id of the newest unflushed record matching predicate(record), or None."""
+        with self._lock:
+            for key, (record, _) in reversed(self._pending.items()):
+                if predicate(record):
+                    return key
+        return None
+
+    def update(self, app_id, apply_fn):
+        """Applies apply_fn(record) if the record is still unflushed. Returns True if it was."""
+        with self._flush_lock:
+            with self._lock:
+                item = self._pending.get(str(app_id))
+                if item is None:
+                    return False
+                apply_fn(item[0])
+                return True
+
+    def flush(self, limit=None):
+        """Writes up to one batch. Returns the number of records written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending.items())[:limit or self.max_batch]
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            try:
+                self.flush_fn([record for _, (record, _) in batch])
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Write-behind flush failed ({len(batch)} records kept for retry): {e}")
+                return 0
+            elapsed = (time.perf_counter() - start) * 1000
+            now = time.time()
+            with self._lock:
+                for key, (_, enqueued_at) in batch:
+                    self._pending.pop(key, None)
+                    for est in self._lag_ms.values():
+                        est.add((now - enqueued_at) * 1000)
+                self.flushed += len(batch)
+                self.batches += 1
+                for est in self._flush_ms.values():
+                    est.add(elapsed)
+            return len(batch)
+
+    def _run(self):
+        backoff = self.flush_interval
+        while not self._stopped:
+            self._wake.wait(backoff)
+            self._wake.clear()
+            written = self.flush()
+            with self._lock:
+                remaining = len(self._pending)
+            if remaining and not written:
+                backoff = min(backoff * 2, 5.0)   # store unavailable, retry later
+            else:
+                backoff = self.flush_interval
+                if remaining >= self.max_batch:
+                    self._wake.set()
+
+    def close(self, timeout=10.0):
+        """Stops the writer and flushes everything still pending (durability on shutdown)."""
+        self._stopped = True
+        self._wake.set()
+        self._thread.join(timeout=1.0)
+        deadline = time.time() + timeout
+        while self.pending_count() and time.time() < deadline:
+            if not self.flush(limit=self.max_batch):
+                time.sleep(0.1)
+        left = self.pending_count()
+        if left:
+            print(f"WARNING: write-behind shutdown with {left} unflushed records")
+        return left
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self):
+        with self._lock:
+            oldest = next(iter(self._pending.values()), None)
+            return {
+                'pending': len(self._pending),
+                'oldest_pending_ms': round((time.time() - oldest[1]) * 1000, 1) if oldest else 0,
+                'enqueued': self.enqueued,
+                'flushed': self.flushed,
+                'batches': self.batches,
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'flush_ms': {f"p{int(p * 100)}": est.value() for p, est in self._flush_ms.items()},
+                'enqueue_to_flush_ms': {f"p{int(p * 100)}": est.value() for p, est in self._lag_ms.items()}
+            }
+
+    @staticmethod
+    def _public(record):
+        record = copy.deepcopy(record)
+        record['_id'] = str(record['_id'])
+        return record